@@ -0,0 +1,226 @@
+import asyncio
+import threading
+from collections import deque, namedtuple
+
+from framing import encode_frame, read_frame
+
+HOST = '127.0.0.1'
+PORT = 4000
+
+STREAM_PREFIX = b'206 '
+IDEMPOTENT_METHODS = {'/GET', '/PUT'} # Safe to resend after the connection dropped
+
+APIResponse = namedtuple('APIResponse', ['status', 'body'])
+
+
+def parse_reply(chunks, final):
+    """Builds an APIResponse from the '206' chunk frames and the final frame of a reply."""
+    status_line, _, body = final.decode('utf-8').partition('\n')
+    if chunks:
+        body = "\n".join([c.decode('utf-8').split('\n', 1)[1] for c in chunks] + [body])
+    return APIResponse(int(status_line.split(' ', 1)[0]), body)
+
+
+class PipelinedConnection:
+    """
+    One persistent connection with many requests in flight. The server answers
+    in request order, so replies are matched to a FIFO of waiting futures.
+    """
+
+    def __init__(self, host, port, max_in_flight):
+        self.host = host
+        self.port = port
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.waiting = deque()
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+        self.closed = False
+
+    @property
+    def in_flight(self):
+        return len(self.waiting)
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.reader_task = asyncio.create_task(self._read_replies())
+
+    async def _read_replies(self):
+        error = ConnectionError("server closed the connection")
+        try:
+            chunks = []
+            while True:
+                frame = await read_frame(self.reader)
+                if frame is None:
+                    break
+                if frame.startswith(STREAM_PREFIX):
+                    chunks.append(frame)
+                    continue
+                future = self.waiting.popleft()
+                if not future.done(): # The caller may have timed out already
+                    future.set_result(parse_reply(chunks, frame))
+                chunks = []
+        except (OSError, IndexError) as e:
+            error = ConnectionError(f"connection failed: {e}")
+        finally:
+            self._fail_all(error)
+
+    def _fail_all(self, error):
+        self.closed = True
+        while self.waiting:
+            future = self.waiting.popleft()
+            if not future.done():
+                future.set_exception(error)
+        if self.writer:
+            self.writer.close()
+
+    async def send(self, payload):
+        """Writes one framed request and returns the future of its reply."""
+        await self.slots.acquire()
+        if self.closed:
+            self.slots.release()
+            raise ConnectionError("connection is closed")
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda _: self.slots.release())
+        self.waiting.append(future)
+        self.writer.write(payload)
+        try:
+            await self.writer.drain()
+        except OSError as e:
+            self._fail_all(ConnectionError(f"connection failed: {e}"))
+        return future
+
+    async def close(self):
+        if self.reader_task:
+            self.reader_task.cancel()
+        self._fail_all(ConnectionError("client closed"))
+
+
+class AsyncAPIClient:
+    """
+    asyncio client for the EXP1 API. Keeps 'pool_size' persistent connections,
+    pipelines up to 'max_in_flight' requests on each, and reconnects on failure.
+
+        async with AsyncAPIClient() as api:
+            replies = await asyncio.gather(*(api.request('/GET', '/add', f'{i},1') for i in range(1000)))
+    """
+
+    def __init__(self, host=HOST, port=PORT, pool_size=4, max_in_flight=128, timeout=5.0, retries=2):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+        self.pool = [None] * pool_size
+        self.connect_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _connection(self):
+        """Least-loaded live connection, (re)opening dead slots on demand."""
+        live = [c for c in self.pool if c is not None and not c.closed]
+        if len(live) < self.pool_size:
+            async with self.connect_lock:
+                for i, conn in enumerate(self.pool):
+                    if conn is None or conn.closed:
+                        conn = PipelinedConnection(self.host, self.port, self.max_in_flight)
+                        await conn.open()
+                        self.pool[i] = conn
+            live = self.pool
+        return min(live, key=lambda c: c.in_flight)
+
+    async def request(self, method, route, values='', timeout=None):
+        """
+        Sends one request and returns its APIResponse(status, body). 'timeout'
+        bounds the whole call, retries included; on expiry asyncio.TimeoutError
+        is raised and the request is not resent.
+        """
+        payload = encode_frame(f"{method}\n{route}\n{values}\n")
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._send_with_retries(method, payload), timeout)
+
+    async def _send_with_retries(self, method, payload):
+        attempt = 0
+        while True:
+            sent = False
+            try:
+                conn = await self._connection()
+                future = await conn.send(payload)
+                sent = True
+                # A connection failure fails this future; a timeout cancels the whole call
+                return await future
+            except (ConnectionError, OSError):
+                # Resend only when the server cannot have applied the request twice
+                retryable = not sent or method.upper() in IDEMPOTENT_METHODS
+                if attempt >= self.retries or not retryable:
+                    raise
+                attempt += 1
+                await asyncio.sleep(0.05 * 2 ** attempt)
+
+    async def close(self):
+        for conn in self.pool:
+            if conn is not None:
+                await conn.close()
+        self.pool = [None] * self.pool_size
+
+
+class APIClient:
+    """
+    Synchronous facade over AsyncAPIClient. The event loop runs in a background
+    thread, so any number of caller threads can share one client:
+
+        with APIClient() as api:
+            futures = [api.submit('/GET', '/mul', f'{i},2') for i in range(1000)]
+            results = [f.result() for f in futures]
+    """
+
+    def __init__(self, host=HOST, port=PORT, **options):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="api-client-loop", daemon=True)
+        self.thread.start()
+        self.client = self._run(self._create(host, port, options))
+
+    async def _create(self, host, port, options):
+        return AsyncAPIClient(host, port, **options)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, method, route, values='', timeout=None):
+        """Starts a request and returns a concurrent.futures.Future of its APIResponse."""
+        return asyncio.run_coroutine_threadsafe(self.client.request(method, route, values, timeout), self.loop)
+
+    def request(self, method, route, values='', timeout=None):
+        """Sends a request and blocks for its APIResponse."""
+        return self.submit(method, route, values, timeout).result()
+
+    def close(self):
+        self._run(self.client.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+if __name__ == '__main__':
+    import time
+
+    with APIClient(pool_size=4) as api:
+        print(api.request('/GET', '/add', '15.5,4.5'))
+
+        t0 = time.time()
+        futures = [api.submit('/GET', '/mul', f'{i},2') for i in range(10000)]
+        results = [f.result() for f in futures]
+        elapsed = time.time() - t0
+        print(f"{len(results)} pipelined requests in {elapsed:.3f}s ({len(results) / elapsed:.0f} req/s)")
+        print(results[-1])
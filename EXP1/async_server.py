@@ -1,33 +1,83 @@
 import asyncio
+import multiprocessing
+import argparse
+import signal
+import socket
+import queue
+import time
+import os
 
 HOST = '127.0.0.1'
 PORT = 4002 # New Port
 
+STATS_INTERVAL = 2.0 # Seconds between worker stats reports
+SHUTDOWN_GRACE = 5.0 # Seconds a worker waits for open connections on shutdown
+
+
+class WorkerStats:
+    """Counters kept by one worker's event loop (no locking: single thread)."""
+
+    def __init__(self):
+        self.connections = 0
+        self.active = 0
+        self.messages = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def as_dict(self):
+        return {
+            'pid': os.getpid(),
+            'connections': self.connections,
+            'active': self.active,
+            'messages': self.messages,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+        }
+
+
+STATS = WorkerStats()
+WRITERS = set() # Open client connections, closed on shutdown once the grace period ends
+
 async def handle_client(reader, writer):
     """
     This coroutine handles the client connection.
     It uses 'await' instead of blocking calls.
     """
     addr = writer.get_extra_info('peername')
-    print(f"[Task] Accepted connection from {addr}")
-    
-    while True:
-        # CRITICAL STEP: 'await' tells the loop to switch tasks 
-        # while waiting for data (non-blocking).
-        data = await reader.read(1024) 
-        if not data: 
-            break
-        
-        message = data.decode('utf-8')
-        response = f"Async Task processed: {message.upper()}"
-        
-        # 'await' here also ensures non-blocking write
-        writer.write(response.encode('utf-8')) 
-        await writer.drain() # Wait until the buffer is flushed
-
-    print(f"[Task] Client {addr} closed.")
-    writer.close()
-    await writer.wait_closed()
+    print(f"[Task {os.getpid()}] Accepted connection from {addr}")
+    STATS.connections += 1
+    STATS.active += 1
+    WRITERS.add(writer)
+
+    try:
+        while True:
+            # CRITICAL STEP: 'await' tells the loop to switch tasks
+            # while waiting for data (non-blocking).
+            data = await reader.read(1024)
+            if not data:
+                break
+
+            message = data.decode('utf-8')
+            response = f"Async Task processed: {message.upper()}".encode('utf-8')
+
+            # 'await' here also ensures non-blocking write
+            writer.write(response)
+            await writer.drain() # Wait until the buffer is flushed
+
+            STATS.messages += 1
+            STATS.bytes_in += len(data)
+            STATS.bytes_out += len(response)
+    except (ConnectionResetError, BrokenPipeError):
+        pass
+    finally:
+        STATS.active -= 1
+        WRITERS.discard(writer)
+        print(f"[Task {os.getpid()}] Client {addr} closed.")
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
 
 
 async def main():
@@ -42,8 +92,129 @@ async def main():
         # Serve_forever keeps the event loop running
         await server.serve_forever()
 
-if __name__ == '__main__':
+
+# --- Multi-Core Mode: one event loop per worker process ---
+
+def create_reuseport_socket():
+    """Each worker binds its own socket to the shared port; the kernel balances accepts."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+async def report_stats(stats_queue):
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        stats_queue.put(STATS.as_dict())
+
+
+async def worker_main(stats_queue):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    server = await asyncio.start_server(handle_client, sock=create_reuseport_socket())
+    reporter = asyncio.create_task(report_stats(stats_queue))
+    print(f"[Worker {os.getpid()}] Event loop serving on {HOST}:{PORT}")
+
+    await stop.wait()
+
+    # Graceful shutdown: stop accepting, then give open clients time to finish
+    server.close()
+    deadline = loop.time() + SHUTDOWN_GRACE
+    while STATS.active and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+    lingering = STATS.active
+    # Idle persistent clients would hold wait_closed() open (Python 3.12.1+), so close them first
+    for writer in list(WRITERS):
+        writer.close()
+    try:
+        await asyncio.wait_for(server.wait_closed(), timeout=1.0)
+    except asyncio.TimeoutError:
+        pass
+    reporter.cancel()
+    stats_queue.put(STATS.as_dict())
+    print(f"[Worker {os.getpid()}] Stopped ({lingering} connections closed after the grace period).")
+
+
+def run_worker(stats_queue):
+    asyncio.run(worker_main(stats_queue))
+
+
+def print_totals(latest, previous, elapsed):
+    total_msgs = sum(s['messages'] for s in latest.values())
+    total_conns = sum(s['connections'] for s in latest.values())
+    active = sum(s['active'] for s in latest.values())
+    delta = total_msgs - sum(s['messages'] for s in previous.values())
+    print(f"[SUPERVISOR] workers={len(latest)} connections={total_conns} active={active} "
+          f"messages={total_msgs} throughput={delta / elapsed if elapsed else 0:.1f} msg/s")
+    for pid, s in sorted(latest.items()):
+        print(f"    pid {pid}: connections={s['connections']} active={s['active']} "
+              f"messages={s['messages']} in={s['bytes_in']}B out={s['bytes_out']}B")
+
+
+def start_supervisor(num_workers):
+    """Starts N single-threaded event-loop workers and aggregates their stats."""
+    stats_queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=run_worker, args=(stats_queue,)) for _ in range(num_workers)]
+    for w in workers:
+        w.start()
+    print(f"[SUPERVISOR {os.getpid()}] Started {num_workers} async workers on {HOST}:{PORT}.")
+
+    latest, previous = {}, {}
+    last_report = time.monotonic()
     try:
-        asyncio.run(main())
+        while any(w.is_alive() for w in workers):
+            try:
+                s = stats_queue.get(timeout=STATS_INTERVAL)
+                latest[s['pid']] = s
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            if now - last_report >= STATS_INTERVAL and latest:
+                print_totals(latest, previous, now - last_report)
+                previous, last_report = dict(latest), now
     except KeyboardInterrupt:
-        print("\nServer Shutting Down.")
\ No newline at end of file
+        print("\nServer Shutting Down.")
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for w in workers:
+            if w.is_alive():
+                os.kill(w.pid, signal.SIGTERM)
+        # Keep draining while the workers exit: a child blocked on a full queue pipe never finishes
+        while any(w.is_alive() for w in workers):
+            try:
+                s = stats_queue.get(timeout=0.2)
+                latest[s['pid']] = s
+            except queue.Empty:
+                pass
+        while True:
+            try:
+                s = stats_queue.get(timeout=0.2)
+                latest[s['pid']] = s
+            except queue.Empty:
+                break
+        for w in workers:
+            w.join()
+        if latest:
+            print_totals(latest, previous, time.monotonic() - last_report)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Async echo server.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of event-loop processes (1 = single loop in this process).")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        start_supervisor(args.workers)
+    else:
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            print("\nServer Shutting Down.")
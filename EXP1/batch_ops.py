@@ -0,0 +1,76 @@
+import base64
+import numpy as np
+
+# --- Vectorized Batch Arithmetic ---
+# A batch request carries many operand pairs in one frame, in one of two encodings:
+#   CSV rows:  "a,b" per line, e.g. "1,2\n3,4\n5,0"
+#   Binary:    "b64:" + base64 of little-endian float64 values a0,b0,a1,b1,...
+# The reply uses the same encoding as the request.
+
+BINARY_PREFIX = 'b64:'
+BINARY_DTYPE = np.dtype('<f8')
+
+BATCH_OPS = {
+    '/add_batch': np.add,
+    '/sub_batch': np.subtract,
+    '/mul_batch': np.multiply,
+    '/div_batch': np.divide,
+}
+
+
+def parse_pairs(values):
+    """Returns (left, right, is_binary) operand arrays from a batch payload."""
+    if values.startswith(BINARY_PREFIX):
+        raw = base64.b64decode(values[len(BINARY_PREFIX):], validate=True)
+        if len(raw) % (2 * BINARY_DTYPE.itemsize):
+            raise ValueError("binary payload must hold whole float64 pairs")
+        flat = np.frombuffer(raw, dtype=BINARY_DTYPE)
+        is_binary = True
+    else:
+        # One split over the whole payload instead of per-row parsing
+        flat = np.array(values.replace('\n', ',').split(','), dtype=np.float64)
+        if flat.size % 2:
+            raise ValueError("every row needs exactly two numbers")
+        is_binary = False
+    pairs = flat.reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1], is_binary
+
+
+def evaluate(route, left, right):
+    """
+    Applies the route's operation to all pairs in one NumPy pass.
+    Returns (results, error_indices); failed elements are NaN in 'results'.
+    """
+    op = BATCH_OPS[route]
+    if op is np.divide:
+        zero = right == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results = np.divide(left, right)
+        results[zero] = np.nan
+        return results, np.flatnonzero(zero)
+    return op(left, right), np.empty(0, dtype=np.intp)
+
+
+def format_results(results, errors, is_binary):
+    header = f"RESULTS: {results.size} values, {errors.size} errors"
+    if is_binary:
+        body = BINARY_PREFIX + base64.b64encode(results.astype(BINARY_DTYPE).tobytes()).decode('ascii')
+        if errors.size:
+            header += "\nERROR_INDEXES: " + ",".join(map(str, errors.tolist()))
+        return f"{header}\n{body}"
+
+    lines = [repr(v) for v in results.tolist()]
+    for i in errors.tolist():
+        lines[i] = "ERROR: Cannot divide by zero."
+    return header + "\n" + "\n".join(lines)
+
+
+def handle_batch_calculation(method, route, values):
+    """Handles /add_batch, /sub_batch, /mul_batch, /div_batch routes."""
+    try:
+        left, right, is_binary = parse_pairs(values)
+    except ValueError as e:
+        return 400, f"ERROR: Invalid batch payload ({e}). Send 'a,b' rows or 'b64:' float64 pairs."
+
+    results, errors = evaluate(route, left, right)
+    return 200, format_results(results, errors, is_binary)
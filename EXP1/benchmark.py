@@ -0,0 +1,325 @@
+import asyncio
+import argparse
+import itertools
+import json
+import math
+import random
+import sys
+import time
+
+from framing import encode_frame, read_frame
+
+# --- Server Variants ---
+# 'api' servers speak the framed 3-line protocol; the echo servers answer each
+# raw message with '<prefix> processed: <MESSAGE>' and no framing.
+TARGETS = {
+    'server': {'protocol': 'api', 'port': 4000},
+    'threadin': {'protocol': 'echo', 'port': 4000},
+    'pricess': {'protocol': 'echo', 'port': 4001},
+    'async': {'protocol': 'echo', 'port': 4002},
+}
+HOST = '127.0.0.1'
+
+# --- API Route Mix ---
+# name -> (method, route, values template); '{n}' is replaced by a request counter
+ROUTES = {
+    'add': ('/GET', '/add', '12.5,7.5'),
+    'sub': ('/GET', '/sub', '12.5,7.5'),
+    'mul': ('/GET', '/mul', '12.5,7.5'),
+    'div': ('/GET', '/div', '12.5,7.5'),
+    'add_name': ('/POST', '/add_name', 'bench-user-{n}'),
+    'update_name': ('/PUT', '/update_name', '1,Alice'),
+    'find_name': ('/GET', '/find_name', 'Alice'),
+    'get_all_names': ('/GET', '/get_all_names', 'limit=100'),
+}
+DEFAULT_MIX = 'add:4,mul:2,div:1,add_name:1,update_name:1,find_name:1'
+ECHO_MESSAGE = 'benchmark ping'
+STREAM_PREFIX = b'206 '
+
+
+def parse_mix(text):
+    """'add:4,add_name:1' -> ([route names], [weights])."""
+    names, weights = [], []
+    for part in text.split(','):
+        name, _, weight = part.partition(':')
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"unknown route '{name}' (choose from {', '.join(ROUTES)})")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+class Recorder:
+    """Latency samples per route type, shared by every connection task."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, kind, latency, ok):
+        self.latencies.setdefault(kind, []).append(latency)
+        if not ok:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def fail(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def report(self, elapsed):
+        all_latencies = list(itertools.chain.from_iterable(self.latencies.values()))
+        result = summarize(all_latencies, sum(self.errors.values()), elapsed)
+        kinds = set(self.latencies) | set(self.errors)
+        result['per_route'] = {kind: summarize(self.latencies.get(kind, []), self.errors.get(kind, 0), elapsed)
+                               for kind in sorted(kinds)}
+        return result
+
+
+# --- Protocol helpers ---
+
+async def read_api_reply(reader):
+    """Reads one API reply (all frames of a streamed one); returns True on a non-error status."""
+    while True:
+        frame = await read_frame(reader)
+        if frame is None:
+            raise ConnectionError("server closed the connection")
+        if not frame.startswith(STREAM_PREFIX):
+            return frame[:1] in (b'1', b'2', b'3')
+
+
+async def read_echo_reply(reader, expected_suffix):
+    """Echo servers send no length; the reply ends with the upper-cased message."""
+    buffer = b''
+    while not buffer.endswith(expected_suffix):
+        data = await reader.read(4096)
+        if not data:
+            raise ConnectionError("server closed the connection")
+        buffer += data
+        if buffer.startswith(b'503'):
+            return False
+    return True
+
+
+class Workload:
+    """Generates (kind, payload) requests for one target protocol."""
+
+    def __init__(self, protocol, mix, seed):
+        self.protocol = protocol
+        self.names, self.weights = parse_mix(mix)
+        self.rng = random.Random(seed)
+        self.counter = itertools.count()
+
+    def next_request(self):
+        if self.protocol == 'echo':
+            return 'echo', ECHO_MESSAGE.encode('utf-8')
+        kind = self.rng.choices(self.names, self.weights)[0]
+        method, route, values = ROUTES[kind]
+        values = values.replace('{n}', str(next(self.counter)))
+        return kind, encode_frame(f"{method}\n{route}\n{values}\n")
+
+
+# --- Load generators ---
+
+async def closed_loop_connection(host, port, workload, recorder, deadline):
+    """One connection sending the next request as soon as the previous reply arrives."""
+    reader, writer = await asyncio.open_connection(host, port)
+    suffix = ECHO_MESSAGE.upper().encode('utf-8')
+    try:
+        while time.perf_counter() < deadline:
+            kind, payload = workload.next_request()
+            started = time.perf_counter()
+            writer.write(payload)
+            await writer.drain()
+            if workload.protocol == 'api':
+                ok = await read_api_reply(reader)
+            else:
+                ok = await read_echo_reply(reader, suffix)
+            recorder.record(kind, time.perf_counter() - started, ok)
+    except (ConnectionError, OSError):
+        recorder.fail('connection')
+    finally:
+        writer.close()
+
+
+async def open_loop_connection(host, port, workload, recorder, deadline, rate):
+    """
+    One connection issuing requests on a fixed schedule (open loop). Latency is
+    measured from the scheduled send time, so a slow server cannot hide queueing
+    by slowing the client down. API requests are pipelined; echo requests cannot
+    be, because their replies carry no framing.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    suffix = ECHO_MESSAGE.upper().encode('utf-8')
+    interval = 1.0 / rate
+    in_flight = asyncio.Queue()
+    start = time.perf_counter() + random.random() * interval # Spread connections out
+
+    async def receive():
+        while True:
+            kind, scheduled = await in_flight.get()
+            if kind is None:
+                return
+            ok = await read_api_reply(reader)
+            recorder.record(kind, time.perf_counter() - scheduled, ok)
+
+    receiver = asyncio.create_task(receive()) if workload.protocol == 'api' else None
+    try:
+        for n in itertools.count():
+            scheduled = start + n * interval
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind, payload = workload.next_request()
+            writer.write(payload)
+            await writer.drain()
+            if receiver:
+                in_flight.put_nowait((kind, scheduled))
+            else:
+                ok = await read_echo_reply(reader, suffix)
+                recorder.record(kind, time.perf_counter() - scheduled, ok)
+        if receiver:
+            in_flight.put_nowait((None, None))
+            await receiver
+    except (ConnectionError, OSError):
+        recorder.fail('connection')
+    finally:
+        if receiver and not receiver.done():
+            receiver.cancel()
+        writer.close()
+
+
+async def run_target(name, host, port, connections, duration, rate, mix, seed):
+    protocol = TARGETS[name]['protocol']
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + duration
+    tasks = []
+    for i in range(connections):
+        workload = Workload(protocol, mix, seed + i)
+        if rate:
+            coro = open_loop_connection(host, port, workload, recorder, deadline, rate / connections)
+        else:
+            coro = closed_loop_connection(host, port, workload, recorder, deadline)
+        tasks.append(asyncio.create_task(coro))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    for result in results:
+        if isinstance(result, Exception):
+            recorder.fail('connection')
+
+    report = recorder.report(elapsed)
+    report.update({
+        'target': name,
+        'host': host,
+        'port': port,
+        'protocol': protocol,
+        'mode': f'open-loop @ {rate} req/s' if rate else 'closed-loop',
+        'connections': connections,
+        'duration_sec': round(elapsed, 3),
+    })
+    return report
+
+
+# --- Reporting and regression checks ---
+
+def print_report(report):
+    lat = report['latency_ms']
+    print(f"[{report['target']}] {report['mode']}, {report['connections']} connections, {report['duration_sec']}s")
+    print(f"    requests={report['requests']} errors={report['errors']} throughput={report['throughput_rps']} req/s")
+    print(f"    latency ms: p50={lat['p50']} p95={lat['p95']} p99={lat['p99']} max={lat['max']}")
+    for kind, stats in report['per_route'].items():
+        l = stats['latency_ms']
+        print(f"      {kind:<14} n={stats['requests']:<8} err={stats['errors']:<5} "
+              f"p50={l['p50']} p99={l['p99']} max={l['max']}")
+
+
+def find_regressions(results, baseline, tolerance):
+    """Compares throughput and p99 latency per target against a previous results file."""
+    previous = {r['target']: r for r in baseline['results']}
+    regressions = []
+    for report in results:
+        old = previous.get(report['target'])
+        if not old:
+            continue
+        if report['throughput_rps'] < old['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{report['target']}: throughput {old['throughput_rps']} -> {report['throughput_rps']} req/s")
+        if report['latency_ms']['p99'] > old['latency_ms']['p99'] * (1 + tolerance):
+            regressions.append(f"{report['target']}: p99 {old['latency_ms']['p99']} -> {report['latency_ms']['p99']} ms")
+    return regressions
+
+
+async def main(args):
+    results = []
+    for name in args.target:
+        port = args.port or TARGETS[name]['port']
+        report = await run_target(name, args.host, port, args.connections, args.duration,
+                                  args.rate, args.mix, args.seed)
+        print_report(report)
+        results.append(report)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load generator for the EXP1 server family.")
+    parser.add_argument("--target", action="append", choices=list(TARGETS),
+                        help="Server variant to benchmark (repeat to run several in sequence). Default: server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, help="Override the target's default port.")
+    parser.add_argument("--connections", type=int, default=50, help="Concurrent persistent connections.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run each target.")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="Total requests/second for a fixed-arrival-rate run (default: closed loop).")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted API route mix (default: {DEFAULT_MIX}).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Previous --output file to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed relative throughput drop / p99 increase vs the baseline.")
+    args = parser.parse_args()
+    args.target = args.target or ['server']
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = asyncio.run(main(args))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'timestamp': time.time(), 'config': vars(args), 'results': results}, f, indent=2)
+        print(f"[INFO] Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"[REGRESSION] {line}")
+        if regressions:
+            sys.exit(1)
+        print("[INFO] No regressions against the baseline.")
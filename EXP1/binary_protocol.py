@@ -0,0 +1,69 @@
+import struct
+
+# --- Binary Wire Protocol ---
+# Optional compact encoding carried inside the normal length-prefixed frames.
+# A connection starts in text mode; if its first frame is exactly BINARY_HELLO
+# the server echoes BINARY_HELLO and every later frame on it is binary:
+#
+#   request:  u8 opcode, then
+#               ADD/SUB/MUL/DIV -> two float64 operands
+#               TEXT            -> a UTF-8 3-line text request (any other route)
+#   reply:    u16 status, then
+#               float64 result for a successful arithmetic opcode,
+#               UTF-8 body otherwise (error message or text reply body)
+#
+# All integers and floats are network byte order, like the frame header.
+
+BINARY_HELLO = b'\x00BIN1'
+
+OP_ADD = 1
+OP_SUB = 2
+OP_MUL = 3
+OP_DIV = 4
+OP_TEXT = 16
+
+# Arithmetic opcodes and the text route each one stands for
+OPCODE_ROUTES = {
+    OP_ADD: '/add',
+    OP_SUB: '/sub',
+    OP_MUL: '/mul',
+    OP_DIV: '/div',
+}
+
+OPCODE = struct.Struct('!B')
+CALC_REQUEST = struct.Struct('!Bdd')
+STATUS = struct.Struct('!H')
+CALC_REPLY = struct.Struct('!Hd')
+
+
+def encode_calc(opcode, num1, num2):
+    return CALC_REQUEST.pack(opcode, num1, num2)
+
+
+def encode_text(request_message):
+    return OPCODE.pack(OP_TEXT) + request_message.encode('utf-8')
+
+
+def encode_result(result):
+    return CALC_REPLY.pack(200, result)
+
+
+def encode_status(status, body):
+    return STATUS.pack(status) + body.encode('utf-8')
+
+
+def text_reply_to_binary(reply):
+    """Converts a formatted text reply ('NNN OK\\nbody') into a binary reply."""
+    status_line, _, body = reply.partition('\n')
+    return encode_status(int(status_line.split(' ', 1)[0]), body)
+
+
+def decode_reply(payload, numeric):
+    """
+    Returns (status, value). 'numeric' says the request was an arithmetic opcode,
+    so a 200 reply carries a float64 instead of text.
+    """
+    (status,) = STATUS.unpack_from(payload)
+    if numeric and status == 200:
+        return status, CALC_REPLY.unpack(payload)[1]
+    return status, payload[STATUS.size:].decode('utf-8')
@@ -1,25 +1,55 @@
 import socket
+from collections import deque
+
+from framing import FrameReader, encode_frame, send_frame, recv_frame
+from binary_protocol import BINARY_HELLO, OP_ADD, OP_DIV, OP_MUL, encode_calc, encode_text, decode_reply
 
 # --- Configuration ---
 HOST = '127.0.0.1'
 PORT = 4000
 
+# Per-connection receive state (the server may answer pipelined requests in one packet)
+_READER = FrameReader()
+_BACKLOG = deque()
+
+STREAM_PREFIX = b"206 "
+
+def recv_response(client_socket):
+    """
+    Receives one complete reply. Streamed replies arrive as several '206' frames
+    followed by a final frame with the real status; their bodies are joined.
+    """
+    chunks = []
+    while True:
+        data = recv_frame(client_socket, _READER, _BACKLOG)
+        if data is None:
+            raise ConnectionError("Server closed the connection.")
+        if not data.startswith(STREAM_PREFIX):
+            break
+        chunks.append(data.decode('utf-8').split('\n', 1)[1])
+
+    status_line, _, body = data.decode('utf-8').partition('\n')
+    return "\n".join([status_line] + chunks + [body])
+
+def format_request(method, route, values):
+    """Builds the 3-line request message."""
+    return f"{method}\n{route}\n{values}\n"
+
 def send_request(client_socket, method, route, values):
     """
     Formats and sends the request to the server, then prints the reply.
     """
     # 1. Format the 3-line message
-    request_message = f"{method}\n{route}\n{values}\n"
+    request_message = format_request(method, route, values)
     
     print("-" * 20)
     print(f"SENDING: {method} {route} with values: '{values}'")
     
-    # 2. Send the message
-    client_socket.sendall(request_message.encode('utf-8'))
+    # 2. Send the message as one length-prefixed frame
+    send_frame(client_socket, request_message)
 
-    # 3. Receive the response (blocks until reply is received)
-    data = client_socket.recv(1024)
-    server_reply = data.decode('utf-8')
+    # 3. Receive the complete framed response (blocks until reply is received)
+    server_reply = recv_response(client_socket)
 
     # 4. Print the response
     print("\n--- SERVER RESPONSE ---")
@@ -27,6 +57,41 @@ def send_request(client_socket, method, route, values):
     print("-----------------------\n")
 
 
+def pipeline_requests(client_socket, requests):
+    """
+    Sends every (method, route, values) request back-to-back without waiting,
+    then collects the replies, which arrive in the same order as the requests.
+    """
+    payload = b''.join(encode_frame(format_request(*req)) for req in requests)
+    client_socket.sendall(payload)
+
+    return [recv_response(client_socket) for _ in requests]
+
+
+def run_binary_tests():
+    """Negotiates the binary protocol on a fresh connection and pipelines numeric requests."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client_socket:
+        client_socket.connect((HOST, PORT))
+        reader, backlog = FrameReader(), deque()
+
+        send_frame(client_socket, BINARY_HELLO)
+        if recv_frame(client_socket, reader, backlog) != BINARY_HELLO:
+            print("[ERROR] Server did not accept the binary protocol.")
+            return
+
+        requests = [encode_calc(OP_ADD, 15.5, 4.5), encode_calc(OP_MUL, 3, 7), encode_calc(OP_DIV, 1, 0)]
+        client_socket.sendall(b''.join(encode_frame(r) for r in requests))
+        print("-" * 20)
+        print(f"BINARY: {len(requests)} pipelined arithmetic requests")
+        for _ in requests:
+            print(decode_reply(recv_frame(client_socket, reader, backlog), numeric=True))
+
+        # Non-numeric routes still work on a binary connection through OP_TEXT
+        send_frame(client_socket, encode_text(format_request("/GET", "/find_name", "Alice")))
+        print(decode_reply(recv_frame(client_socket, reader, backlog), numeric=False))
+        print()
+
+
 def run_client_tests():
     """Connects to the server and runs a sequence of API tests."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client_socket:
@@ -48,8 +113,19 @@ def run_client_tests():
             # --- TEST 4: Get All Names (GET /get_all_names) ---
             send_request(client_socket, "/GET", "/get_all_names", "")
             
+            # --- TEST 4b: Paginated listing (one consistent snapshot across pages) ---
+            send_request(client_socket, "/GET", "/get_all_names", "limit=2")
+
             # --- TEST 5: Error Handling (GET /div by zero) ---
             send_request(client_socket, "/GET", "/div", "100,0")
+
+            # --- TEST 6: Pipelining (many requests, one round trip) ---
+            batch = [("/GET", "/mul", f"{i},2") for i in range(5)]
+            print("-" * 20)
+            print(f"PIPELINING: {len(batch)} requests in a single send")
+            for reply in pipeline_requests(client_socket, batch):
+                print(reply.replace("\n", " | "))
+            print()
             
         except ConnectionRefusedError:
             print(f"\n[ERROR] Connection refused. Is the server running on {HOST}:{PORT}?")
@@ -59,4 +135,5 @@ def run_client_tests():
     print("[INFO] Client connection closed.")
 
 if __name__ == '__main__':
-    run_client_tests()
\ No newline at end of file
+    run_client_tests()
+    run_binary_tests()
\ No newline at end of file
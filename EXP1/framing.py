@@ -0,0 +1,90 @@
+import asyncio
+import struct
+
+# --- Wire Framing ---
+# Every message on the wire is a 4-byte big-endian length header followed by
+# exactly that many payload bytes. TCP is a byte stream, so one recv() may hold
+# half a message or several of them; the header tells us where each one ends.
+
+HEADER = struct.Struct('!I')
+HEADER_SIZE = HEADER.size
+MAX_FRAME_SIZE = 16 * 1024 * 1024 # Reject absurd lengths instead of buffering them
+RECV_SIZE = 65536
+
+
+class FrameError(Exception):
+    """Raised when the peer sends a frame we refuse to buffer."""
+
+
+def encode_frame(payload):
+    """Prefixes the payload (bytes or str) with its length header."""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    return HEADER.pack(len(payload)) + payload
+
+
+def send_frame(sock, payload):
+    """Sends a single framed message over a blocking socket."""
+    sock.sendall(encode_frame(payload))
+
+
+class FrameReader:
+    """
+    Reusable receive buffer that turns a stream of recv() chunks into frames.
+    One reader is kept per connection, so partial frames survive between calls.
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.buffer = bytearray()
+        self.max_frame_size = max_frame_size
+
+    def feed(self, data):
+        """Appends raw bytes and returns every frame that is now complete."""
+        self.buffer += data
+        frames = []
+        offset = 0
+        end = len(self.buffer)
+
+        while end - offset >= HEADER_SIZE:
+            (length,) = HEADER.unpack_from(self.buffer, offset)
+            if length > self.max_frame_size:
+                raise FrameError(f"Frame of {length} bytes exceeds limit of {self.max_frame_size}.")
+            if end - offset - HEADER_SIZE < length:
+                break # Wait for the rest of this frame
+            start = offset + HEADER_SIZE
+            frames.append(bytes(self.buffer[start:start + length]))
+            offset = start + length
+
+        # Drop consumed bytes once per feed instead of once per frame
+        if offset:
+            del self.buffer[:offset]
+        return frames
+
+    def pending(self):
+        """Number of buffered bytes that do not yet form a full frame."""
+        return len(self.buffer)
+
+
+def recv_frame(sock, reader, backlog):
+    """
+    Blocks until one frame is available and returns it (None on EOF).
+    'backlog' is a deque holding frames that arrived in an earlier recv().
+    """
+    while not backlog:
+        data = sock.recv(RECV_SIZE)
+        if not data:
+            return None
+        backlog.extend(reader.feed(data))
+    return backlog.popleft()
+
+
+async def read_frame(reader):
+    """asyncio counterpart of recv_frame: returns one frame, or None on EOF."""
+    try:
+        header = await reader.readexactly(HEADER_SIZE)
+        (length,) = HEADER.unpack(header)
+        if length > MAX_FRAME_SIZE:
+            raise FrameError(f"Frame of {length} bytes exceeds limit of {MAX_FRAME_SIZE}.")
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
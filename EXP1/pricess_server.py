@@ -1,53 +1,176 @@
 import socket
 import multiprocessing
+import multiprocessing.connection
+import argparse
+import signal
 import os
+import sys
+import time
 
 HOST = '127.0.0.1'
 PORT = 4001 # New Port to avoid conflict
 
-def handle_client(conn, addr):
-    """Function executed by the dedicated child process."""
-    print(f"[Process {os.getpid()}] Connected by {addr}. Handling request...")
-    with conn:
-        data = conn.recv(1024)
-        if data:
-            message = data.decode('utf-8')
-            # Response includes PID to prove isolation
-            response = f"Process {os.getpid()} processed: {message.upper()}"
-            conn.sendall(response.encode('utf-8'))
-    # IMPORTANT: Child process must exit after handling to prevent resource leaks
-    sys.exit(0) 
-
-def start_server():
+RESPAWN_DELAY = 1.0 # Minimum seconds between two starts of the same worker slot
+
+def create_listener():
+    """
+    Called in each worker after the fork: every worker binds its own socket to
+    the same port with SO_REUSEPORT, and the kernel spreads incoming
+    connections across them, so workers do not contend on one accept queue.
+    A second server instance can join the same group during a rolling restart.
+    """
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     server_socket.bind((HOST, PORT))
-    server_socket.listen(10)
-    print(f"Listening on {HOST}:{PORT}. Server is ready (Multiprocess).")
+    server_socket.listen(128)
+    return server_socket
+
+def handle_client(conn, addr):
+    """Serves one persistent connection inside a long-lived worker process."""
+    print(f"[Process {os.getpid()}] Connected by {addr}. Handling request...")
+    with conn:
+        while True:
+            try:
+                data = conn.recv(1024)
+                if not data:
+                    break
+                message = data.decode('utf-8')
+                # Response includes PID to prove isolation
+                response = f"Process {os.getpid()} processed: {message.upper()}"
+                conn.sendall(response.encode('utf-8'))
+            except OSError:
+                break
 
+def drain(server_socket):
+    """
+    Serves the connections already queued on this worker's socket before it
+    closes. Closing a SO_REUSEPORT listener resets whatever is still in its
+    queue (unless net.ipv4.tcp_migrate_req=1 lets the kernel hand them to a
+    sibling), so a recycling worker empties its queue first.
+    """
+    server_socket.setblocking(False)
     while True:
         try:
             conn, addr = server_socket.accept()
-            
-            # CRITICAL STEP: Create a new Process instead of a Thread
-            client_process = multiprocessing.Process(target=handle_client, args=(conn, addr))
-            client_process.start()
-            
-            # Close the connection handle in the parent process immediately
-            conn.close() 
-            
-            print(f"[MAIN {os.getpid()}] Dispatched connection to {client_process.pid}. Awaiting next client...")
-        except KeyboardInterrupt:
-            print("\nServer Shutting Down.")
-            break
-        except Exception as e:
-            print(f"Error: {e}")
+        except BlockingIOError:
             break
+        conn.setblocking(True)
+        handle_client(conn, addr)
     server_socket.close()
 
-if __name__ == '__main__':
-    # Ensure processes are joined/cleaned up, though the OS handles much of this
+def worker_main(max_connections, control):
+    """
+    Worker loop: bind a SO_REUSEPORT socket and serve clients. After
+    'max_connections' connections (0 = never recycle) it tells the supervisor
+    it is retiring but keeps serving until the supervisor says its replacement
+    is listening, so the port is never left without a worker.
+    """
+    # The supervisor owns Ctrl+C; workers are stopped with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    server_socket = create_listener()
+    control.send('ready')
+    handled = 0
+    retiring = False
+    print(f"[Worker {os.getpid()}] Accepting on {HOST}:{PORT}")
+    while True:
+        if not retiring and max_connections and handled >= max_connections:
+            control.send('retiring')
+            retiring = True
+        ready = multiprocessing.connection.wait([server_socket, control])
+        if control in ready:
+            try:
+                control.recv() # 'drain': the replacement is listening
+            except EOFError:
+                pass # Supervisor is gone
+            break
+        conn, addr = server_socket.accept()
+        handle_client(conn, addr)
+        handled += 1
+    drain(server_socket)
+    print(f"[Worker {os.getpid()}] Recycling after {handled} connections.")
+    sys.exit(0)
+
+def spawn_worker(max_connections):
+    """Starts a worker and returns it with the supervisor's end of its control pipe."""
+    control, child_control = multiprocessing.Pipe()
+    worker = multiprocessing.Process(target=worker_main, args=(max_connections, child_control))
+    worker.start()
+    child_control.close()
+    return worker, control
+
+def start_server(num_workers, max_connections):
+    """
+    Pre-forks the pool and keeps one worker in every slot. A retiring worker
+    is replaced before it stops accepting. A worker that dies is respawned, but
+    a slot is restarted at most once per RESPAWN_DELAY, so a worker that
+    crashes on start-up (say, the port is taken) does not turn into a fork loop.
+    """
+    workers, controls = map(list, zip(*[spawn_worker(max_connections) for _ in range(num_workers)]))
+    spawned_at = [time.monotonic()] * num_workers
+    outgoing = [None] * num_workers # (worker, control) still serving until the slot's replacement is ready
+    print(f"Listening on {HOST}:{PORT}. Server is ready (Pre-forked pool of {num_workers} workers).")
+
     try:
-        start_server()
-    except:
-        pass
\ No newline at end of file
+        while True:
+            now = time.monotonic()
+            timeout = None
+            for i, worker in enumerate(workers):
+                if outgoing[i] and not outgoing[i][0].is_alive():
+                    outgoing[i][0].join()
+                    outgoing[i] = None
+                if worker.is_alive():
+                    continue
+                due = spawned_at[i] + RESPAWN_DELAY
+                if now < due:
+                    timeout = due - now if timeout is None else min(timeout, due - now)
+                    continue
+                worker.join()
+                workers[i], controls[i] = spawn_worker(max_connections)
+                spawned_at[i] = now
+                print(f"[MAIN {os.getpid()}] Worker {worker.pid} exited (code {worker.exitcode}). "
+                      f"Respawned as {workers[i].pid}.")
+
+            # Block until a worker exits (sentinel becomes ready), reports on its
+            # control pipe, or a delayed respawn is due
+            live = [w for w in workers if w.is_alive()] + [o[0] for o in outgoing if o]
+            live_controls = [c for w, c in zip(workers, controls) if w.is_alive()]
+            ready = multiprocessing.connection.wait([w.sentinel for w in live] + live_controls, timeout)
+            for i, control in enumerate(controls):
+                if control not in ready:
+                    continue
+                try:
+                    message = control.recv()
+                except EOFError:
+                    continue # The worker died; its sentinel is handled above
+                if message == 'retiring' and outgoing[i] is None:
+                    outgoing[i] = (workers[i], control)
+                    workers[i], controls[i] = spawn_worker(max_connections)
+                    spawned_at[i] = time.monotonic()
+                elif message == 'ready' and outgoing[i]:
+                    old, old_control = outgoing[i]
+                    try:
+                        old_control.send('drain')
+                    except OSError:
+                        pass
+                    print(f"[MAIN {os.getpid()}] Worker {old.pid} recycled; {workers[i].pid} took its place.")
+    except KeyboardInterrupt:
+        print("\nServer Shutting Down.")
+    finally:
+        # A second Ctrl+C must not interrupt the cleanup and orphan workers
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for worker in workers + [o[0] for o in outgoing if o]:
+            worker.terminate()
+        for worker in workers + [o[0] for o in outgoing if o]:
+            worker.join()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pre-forked multiprocess echo server.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Number of worker processes.")
+    parser.add_argument("--max-connections", type=int, default=0,
+                        help="Recycle a worker after this many client connections (0 = never).")
+    args = parser.parse_args()
+
+    start_server(args.workers, args.max_connections)
@@ -0,0 +1,445 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+
+from api_client import AsyncAPIClient, APIResponse
+
+# --- Leader-based Replication ---
+# Every replica runs the normal API server plus a Replicator thread. The
+# replica with the highest PID that is alive becomes primary (bully rule, as
+# in EXP9/node.py); a replica joining a running group follows the primary it
+# finds instead of taking over. Only the primary accepts writes.
+#
+# Each write the store applies is appended to an in-memory mutation log and
+# numbered by its LSN. The primary ships the log to every follower over one
+# pipelined connection per follower: up to WINDOW batches of BATCH_SIZE
+# records are in flight at once, each tagged with the LSN it starts from.
+# A follower that is not at that LSN answers 'NEED_LSN: n' and the primary
+# resends from n, or resends the whole table if n was already trimmed. The
+# table goes out as a 'reset_begin' batch, 'reset_chunk' batches of at most
+# RESET_CHUNK_BYTES and a 'reset_end' batch; the follower stages the chunks
+# and only replaces its table when the end marker arrives.
+#
+# Every election starts a new term, and every batch and ack carries it. A
+# follower rejects batches from an older term (so a deposed primary learns
+# it has been replaced), and a follower whose log came from another term is
+# reset to the new primary's table: an old primary rejoining with the same
+# LSN but a different history is replaced, not merged.
+#
+# Replication is asynchronous: a write acknowledged by a primary that dies
+# before shipping it is lost. Followers report how far behind they may be,
+# which is what the max_staleness read option checks.
+
+BATCH_SIZE = 500 # Records per /repl_apply request
+WINDOW = 8 # Batches in flight per follower
+HEARTBEAT_INTERVAL = 0.5 # Primary -> follower heartbeat (an empty batch)
+FAILOVER_TIMEOUT = 3.0 # Silence after which a follower starts an election
+ELECTION_WAIT = 2.0 # Time to wait for a higher replica's announcement
+LOG_RETAIN = 100000 # Log records kept for followers that fall behind
+RESET_CHUNK_BYTES = 1 << 20 # Encoded records per full-table batch, well under framing.MAX_FRAME_SIZE
+
+NOT_PRIMARY = 421
+
+
+def load_replicas(path):
+    """Reads [{"pid": 1, "host": "127.0.0.1", "port": 4300}, ...] into {pid: (host, port)}."""
+    with open(path, 'r') as f:
+        return {node['pid']: (node['host'], node['port']) for node in json.load(f)}
+
+
+def parse_status(body):
+    """'REPLICA: pid=3 role=primary ...' -> {'pid': '3', 'role': 'primary', ...}."""
+    return dict(part.split('=', 1) for part in body.split(': ', 1)[1].split())
+
+
+class Replicator:
+    def __init__(self, store, pid, replicas):
+        self.store = store
+        self.pid = pid
+        self.replicas = replicas
+        self.peers = sorted(p for p in replicas if p != pid)
+        self.lock = threading.Lock()
+        self.primary_id = -1
+        self.term = 0 # Highest election term seen
+        self.log_term = 0 # Term of the primary whose log this replica's data follows
+        self.log = [] # [(user_id, name), ...] for LSNs log_base+1 .. lsn
+        self.log_base = 0
+        self.reset_records = None # Full-table records staged between reset_begin and reset_end
+        self.last_heard = time.monotonic() # Last message from the primary
+        self.caught_up_at = None # When this follower last matched the primary's LSN
+        self.loop = None
+        self.wakeups = set() # One asyncio.Event per shipping task
+        self.wake_pending = False
+        store.on_write = self._record
+
+    def log_event(self, message):
+        print(f"[REPL {self.pid}] {message}")
+
+    @property
+    def lsn(self):
+        return self.log_base + len(self.log)
+
+    def is_primary(self):
+        return self.primary_id == self.pid
+
+    # --- Called from the server thread ---
+
+    def _record(self, user_id, name):
+        """Store listener: runs under the store lock for every applied write."""
+        self.log.append((user_id, name))
+        if len(self.log) > 2 * LOG_RETAIN:
+            del self.log[:LOG_RETAIN]
+            self.log_base += LOG_RETAIN
+        if self.loop is not None and self.is_primary() and not self.wake_pending:
+            self.wake_pending = True
+            self.loop.call_soon_threadsafe(self._wake_shippers)
+
+    def staleness(self):
+        """Upper bound, in seconds, on how far this replica's data is behind the primary."""
+        if self.is_primary():
+            return 0.0
+        if self.caught_up_at is None:
+            return float('inf')
+        return time.monotonic() - self.caught_up_at
+
+    def not_primary(self):
+        if self.primary_id in self.replicas:
+            host, port = self.replicas[self.primary_id]
+            return NOT_PRIMARY, f"NOT_PRIMARY: Writes go to replica {self.primary_id} at {host}:{port}."
+        return NOT_PRIMARY, "NOT_PRIMARY: No primary elected yet; retry shortly."
+
+    def status(self):
+        role = 'primary' if self.is_primary() else 'follower'
+        return 200, (f"REPLICA: pid={self.pid} role={role} primary={self.primary_id} term={self.term} "
+                     f"lsn={self.lsn} staleness={self.staleness():.3f}")
+
+    def _accept_primary(self, sender, term):
+        """Checks a primary's claim (lock held); returns an error reply or None after following it."""
+        if term < self.term:
+            return 409, f"STALE_TERM: {self.term}"
+        if self.is_primary() and term == self.term and sender < self.pid:
+            return 409, f"REJECTED: replica {self.pid} is primary."
+        if sender != self.primary_id or term != self.term:
+            self.log_event(f"Following primary {sender} (term {term})")
+        self.primary_id = sender
+        self.term = term
+        self.last_heard = time.monotonic()
+        return None
+
+    def handle_coordinator(self, values):
+        """A replica announces itself as the new primary: 'pid,term'."""
+        new_primary, term = (int(v) for v in values.split(','))
+        with self.lock:
+            error = self._accept_primary(new_primary, term)
+        return error or (200, f"OK: following {new_primary} in term {term}")
+
+    def handle_apply(self, values):
+        """Applies one batch of the primary's log (an empty batch is a heartbeat)."""
+        batch = json.loads(values)
+        term = batch['term']
+        with self.lock:
+            error = self._accept_primary(batch['primary'], term)
+            if error:
+                return error
+
+        with self.store.lock:
+            if 'reset_begin' in batch:
+                self.reset_records = []
+            elif 'reset_chunk' in batch or 'reset_end' in batch:
+                if self.reset_records is None:
+                    return 409, "NEED_RESET: missed the start of the table"
+                if 'reset_chunk' in batch:
+                    self.reset_records.extend(tuple(record) for record in batch['reset_chunk'])
+                else:
+                    # Full resync: the primary's whole table replaces ours, then continue from its LSN
+                    self.store.replace(self.reset_records)
+                    self.reset_records = None
+                    self.log = []
+                    self.log_base = batch['reset_end']
+                    self.log_term = term
+            elif self.log_term != term:
+                return 409, f"NEED_RESET: log from term {self.log_term}"
+            elif batch['from'] != self.lsn:
+                return 409, f"NEED_LSN: {self.lsn}"
+            else:
+                for user_id, name in batch['records']:
+                    self.store.apply(user_id, name)
+            if self.reset_records is None and self.lsn >= batch['lsn']:
+                self.caught_up_at = time.monotonic()
+        return 200, f"APPLIED: lsn {self.lsn} term {term}"
+
+    # --- Replicator thread ---
+
+    def start(self):
+        thread = threading.Thread(target=asyncio.run, args=(self._main(),), name="replicator", daemon=True)
+        thread.start()
+
+    def _wake_shippers(self):
+        self.wake_pending = False
+        for event in self.wakeups:
+            event.set()
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.clients = {pid: AsyncAPIClient(*self.replicas[pid], pool_size=1, max_in_flight=WINDOW + 1,
+                                            timeout=2.0, retries=0)
+                        for pid in self.peers}
+        await asyncio.sleep(1) # Let the server start listening first
+        await self._join()
+
+        shippers = {}
+        while True:
+            if self.is_primary():
+                for pid in self.peers:
+                    if pid not in shippers or shippers[pid].done():
+                        shippers[pid] = asyncio.create_task(self._ship(pid))
+            elif time.monotonic() - self.last_heard > FAILOVER_TIMEOUT:
+                self.log_event(f"Primary {self.primary_id} not responding -> starting election")
+                await self._elect()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def _peer_status(self, pid):
+        try:
+            reply = await self.clients[pid].request('/GET', '/repl_status', timeout=0.5)
+            return parse_status(reply.body) if reply.status == 200 else None
+        except (ConnectionError, OSError, asyncio.TimeoutError):
+            return None
+
+    async def _join(self):
+        """Follows a running primary if there is one, otherwise holds an election."""
+        statuses = await asyncio.gather(*(self._peer_status(pid) for pid in self.peers))
+        primaries = [int(s['pid']) for s in statuses if s and s['role'] == 'primary']
+        if primaries:
+            with self.lock:
+                self.primary_id = max(primaries)
+                self.last_heard = time.monotonic()
+            self.log_event(f"Joining as follower of primary {self.primary_id}")
+        else:
+            await self._elect()
+
+    async def _elect(self):
+        higher = [pid for pid in self.peers if pid > self.pid]
+        statuses = await asyncio.gather(*(self._peer_status(pid) for pid in higher))
+        alive = [pid for pid, s in zip(higher, statuses) if s]
+        if alive:
+            # A higher replica will win; retry if it has not announced itself by then
+            self.log_event(f"Higher replicas {alive} are alive. Waiting for COORDINATOR announcement.")
+            self.last_heard = time.monotonic() - FAILOVER_TIMEOUT + ELECTION_WAIT
+            return
+        # The new term is above every term a reachable replica has seen
+        statuses = await asyncio.gather(*(self._peer_status(pid) for pid in self.peers))
+        with self.lock:
+            self.term = max([self.term, *(int(s.get('term', 0)) for s in statuses if s)]) + 1
+            self.log_term = self.term # Our log is the reference from now on; followers get reset
+            self.primary_id = self.pid
+        self.log_event(f"I am the new PRIMARY (term {self.term}, lsn {self.lsn})")
+        await asyncio.gather(*(self._announce(pid) for pid in self.peers))
+
+    async def _announce(self, pid):
+        try:
+            reply = await self.clients[pid].request('/POST', '/repl_coordinator', f"{self.pid},{self.term}",
+                                                    timeout=0.5)
+        except (ConnectionError, OSError, asyncio.TimeoutError):
+            return
+        if reply.body.startswith('STALE_TERM'):
+            self._step_down(int(reply.body.split(': ', 1)[1]))
+
+    def _step_down(self, term):
+        """Another replica has seen a newer term: stop acting as primary and wait for it."""
+        with self.lock:
+            if term > self.term:
+                self.log_event(f"Term {term} is newer than ours ({self.term}); stepping down")
+                self.term = max(self.term, term)
+                self.primary_id = -1
+                self.last_heard = time.monotonic()
+
+    def _next_batches(self, acked):
+        """Up to WINDOW batches starting at LSN 'acked' (a heartbeat if there is nothing new)."""
+        with self.store.lock:
+            lsn = self.lsn
+            if acked < self.log_base or acked > lsn:
+                # The follower needs trimmed records or has diverged: send the whole table
+                records = list(self.store.items())
+            else:
+                records = None
+                batches = []
+                start = acked
+                while start < lsn and len(batches) < WINDOW:
+                    end = min(start + BATCH_SIZE, lsn)
+                    log_records = self.log[start - self.log_base:end - self.log_base]
+                    batches.append((end, {'from': start, 'records': log_records}))
+                    start = end
+        if records is None:
+            return lsn, batches or [(acked, {'from': acked, 'records': []})]
+
+        # Only the end marker moves the follower to 'lsn'; the other parts leave 'acked' as it is
+        batches, chunk, size = [(acked, {'reset_begin': lsn})], [], 0
+        for user_id, name in records:
+            if size >= RESET_CHUNK_BYTES:
+                batches.append((acked, {'reset_chunk': chunk}))
+                chunk, size = [], 0
+            chunk.append([user_id, name])
+            size += len(json.dumps(name)) + len(user_id) + 6
+        if chunk:
+            batches.append((acked, {'reset_chunk': chunk}))
+        batches.append((lsn, {'reset_end': lsn}))
+        return lsn, batches
+
+    async def _ship(self, pid):
+        """Streams the log to one follower for as long as this replica is primary."""
+        client = self.clients[pid]
+        wake = asyncio.Event()
+        self.wakeups.add(wake)
+        acked = self.lsn # Corrected by the follower's NEED_LSN reply if it is elsewhere
+        try:
+            while self.is_primary():
+                wake.clear()
+                lsn, batches = self._next_batches(acked)
+                requests = []
+                for _, batch in batches:
+                    batch.update(primary=self.pid, term=self.term, lsn=lsn)
+                    requests.append(client.request('/POST', '/repl_apply', json.dumps(batch)))
+                replies = await asyncio.gather(*requests, return_exceptions=True)
+
+                for (end, _), reply in zip(batches, replies):
+                    if isinstance(reply, Exception):
+                        await asyncio.sleep(HEARTBEAT_INTERVAL) # Follower down; keep retrying
+                        break
+                    if reply.status == 200:
+                        if reply.body.endswith(f"term {self.term}"): # Not an ack from before a new election
+                            acked = end
+                    elif reply.body.startswith('NEED_LSN'):
+                        acked = int(reply.body.split(': ', 1)[1])
+                        break
+                    elif reply.body.startswith('NEED_RESET'):
+                        acked = -1 # Below any LSN: the next round sends the whole table
+                        break
+                    elif reply.body.startswith('STALE_TERM'):
+                        self._step_down(int(reply.body.split(': ', 1)[1]))
+                        break
+                    else:
+                        self.log_event(f"Replica {pid} refused the log: {reply.body}")
+                        await asyncio.sleep(HEARTBEAT_INTERVAL)
+                        break
+                else:
+                    if acked == lsn:
+                        # Caught up: wait for new writes, or send the next heartbeat
+                        try:
+                            await asyncio.wait_for(wake.wait(), HEARTBEAT_INTERVAL)
+                        except asyncio.TimeoutError:
+                            pass
+        finally:
+            self.wakeups.discard(wake)
+
+
+# --- Read-Spreading Client ---
+
+class ReplicatedClient:
+    """
+    Client for a replica group, in the style of sharding.ShardedClient:
+      /add_name, /update_name     -> the primary (found via /repl_status, NOT_PRIMARY followed)
+      /get_all_names, /find_name  -> the follower with the fewest requests in flight
+                                     (round-robin among ties), then the primary
+      anything else               -> any replica, spread the same way
+    'max_staleness' is added to every /get_all_names. A follower that is down or
+    may be staler than that (503) is skipped. Paging cursors are
+    '<pid>/<that replica's cursor>', so a listing stays on one replica's snapshot.
+    """
+
+    WRITE_ROUTES = ('/add_name', '/update_name')
+
+    def __init__(self, replicas, max_staleness=None, **client_options):
+        self.clients = {pid: AsyncAPIClient(host, port, **client_options) for pid, (host, port) in replicas.items()}
+        self.max_staleness = max_staleness
+        self.primary_id = None
+        self.in_flight = {pid: 0 for pid in replicas}
+        self.round_robin = itertools.count()
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.close()
+
+    async def request(self, method, route, values=''):
+        """Generic entry point; returns an APIResponse."""
+        if route in self.WRITE_ROUTES:
+            return await self.write(method, route, values)
+        return await self.read(method, route, values)
+
+    async def find_primary(self):
+        async def status(pid):
+            try:
+                reply = await self.clients[pid].request('/GET', '/repl_status', timeout=0.5)
+                return parse_status(reply.body) if reply.status == 200 else None
+            except (ConnectionError, OSError, asyncio.TimeoutError):
+                return None
+        statuses = await asyncio.gather(*(status(pid) for pid in self.clients))
+        primaries = [int(s['pid']) for s in statuses if s and s['role'] == 'primary']
+        self.primary_id = max(primaries) if primaries else None
+        return self.primary_id
+
+    async def write(self, method, route, values):
+        for _ in range(4):
+            if self.primary_id is None and await self.find_primary() is None:
+                await asyncio.sleep(HEARTBEAT_INTERVAL) # Election in progress
+                continue
+            try:
+                reply = await self.clients[self.primary_id].request(method, route, values)
+            except (ConnectionError, OSError, asyncio.TimeoutError):
+                self.primary_id = None # Primary down; look again after the failover
+                await asyncio.sleep(FAILOVER_TIMEOUT)
+                continue
+            if reply.status != NOT_PRIMARY:
+                return reply
+            # 'NOT_PRIMARY: Writes go to replica N at host:port.' or no primary yet
+            words = reply.body.split()
+            self.primary_id = int(words[words.index('replica') + 1]) if 'replica' in words else None
+        return APIResponse(NOT_PRIMARY, "NOT_PRIMARY: No primary elected yet; retry shortly.")
+
+    def _read_order(self):
+        followers = [pid for pid in self.clients if pid != self.primary_id]
+        if followers:
+            offset = next(self.round_robin) % len(followers)
+            followers = followers[offset:] + followers[:offset]
+        followers.sort(key=lambda pid: self.in_flight[pid]) # Stable: ties keep the rotation
+        return followers + ([self.primary_id] if self.primary_id is not None else [])
+
+    async def read(self, method, route, values):
+        if self.primary_id is None:
+            await self.find_primary() # So reads can prefer the followers
+        order = self._read_order()
+        pinned = None
+        if route == '/get_all_names':
+            options = [part.strip() for part in values.split(',') if part.strip()]
+            for i, part in enumerate(options):
+                if part.startswith('cursor='):
+                    pid, sep, inner = part[len('cursor='):].partition('/')
+                    if not sep or not pid.isdigit() or int(pid) not in self.clients:
+                        return APIResponse(400, "ERROR: Invalid options or cursor (expected <replica>/<cursor>).")
+                    pinned, options[i] = int(pid), f"cursor={inner}"
+            if self.max_staleness is not None and not any(p.startswith('max_staleness=') for p in options):
+                options.append(f"max_staleness={self.max_staleness}")
+            values = ','.join(options)
+            if pinned is not None:
+                order = [pinned] # The cursor's snapshot only exists on that replica
+
+        reply = None
+        for pid in order:
+            self.in_flight[pid] += 1
+            try:
+                reply = await self.clients[pid].request(method, route, values)
+            except (ConnectionError, OSError, asyncio.TimeoutError):
+                continue
+            finally:
+                self.in_flight[pid] -= 1
+            if reply.status == 503 and pinned is None:
+                continue # Too stale for this read; try the next replica
+            if route == '/get_all_names' and reply.status == 200 and reply.body.startswith('USER PAGE'):
+                head, _, next_cursor = reply.body.rpartition('NEXT_CURSOR: ')
+                if next_cursor != 'END':
+                    reply = APIResponse(200, f"{head}NEXT_CURSOR: {pid}/{next_cursor}")
+            return reply
+        if reply is not None:
+            return reply
+        raise ConnectionError("no replica could serve the read")
@@ -0,0 +1,76 @@
+import time
+
+ANY_METHOD = '*'
+
+
+class RouteStats:
+    """Call counter and latency totals for one registered route."""
+    __slots__ = ('calls', 'errors', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def as_dict(self):
+        avg_us = self.total_ns / self.calls / 1000 if self.calls else 0.0
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_us': round(avg_us, 2),
+            'max_us': round(self.max_ns / 1000, 2),
+        }
+
+
+class Router:
+    """
+    Table-driven request router.
+    Handlers are registered once per (method, route) key, so dispatch is a
+    dict lookup no matter how many routes exist. ANY_METHOD registers a
+    handler for every method of a route.
+    """
+
+    def __init__(self):
+        self.table = {} # (method, route) -> (handler, RouteStats)
+        self.methods = {} # route -> registered methods, for error messages only
+
+    def add_route(self, method, route, handler):
+        key = (method, route)
+        if key in self.table:
+            raise ValueError(f"Route {method} {route} is already registered.")
+        self.table[key] = (handler, RouteStats())
+        self.methods.setdefault(route, []).append(method)
+
+    def route(self, method, *routes):
+        """Decorator: @ROUTER.route('/GET', '/get_all_names')."""
+        def register(handler):
+            for route in routes:
+                self.add_route(method, route, handler)
+            return handler
+        return register
+
+    def dispatch(self, method, route, values):
+        """Runs the handler for (method, route) and returns (status, response)."""
+        entry = self.table.get((method, route)) or self.table.get((ANY_METHOD, route))
+        if entry is None:
+            if route in self.methods:
+                allowed = ', '.join(self.methods[route])
+                return 404, f"ERROR: Method {method} not supported for route '{route}' (use {allowed})."
+            return 404, f"ERROR: API route '{route}' not found."
+
+        handler, stats = entry
+        started = time.perf_counter_ns()
+        status, response = handler(method, route, values)
+        elapsed = time.perf_counter_ns() - started
+
+        stats.calls += 1
+        stats.total_ns += elapsed
+        if elapsed > stats.max_ns:
+            stats.max_ns = elapsed
+        if status >= 400:
+            stats.errors += 1
+        return status, response
+
+    def stats(self):
+        return {f"{method} {route}": stats.as_dict() for (method, route), (_, stats) in self.table.items()}
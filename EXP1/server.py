@@ -1,4 +1,18 @@
 import socket
+import selectors
+import argparse
+import json
+import operator
+from collections import deque
+
+from framing import FrameReader, FrameError, encode_frame, RECV_SIZE
+from batch_ops import BATCH_OPS, handle_batch_calculation
+from router import Router, ANY_METHOD
+from storage import MemoryStore, LogStore
+from sharding import HashRing, load_shards
+from replication import Replicator, load_replicas
+from binary_protocol import (BINARY_HELLO, OPCODE_ROUTES, OP_TEXT, CALC_REQUEST,
+                             encode_result, encode_status, text_reply_to_binary)
 
 HOST = '127.0.0.1' 
 PORT = 4000
@@ -7,8 +21,22 @@ USER_DATABASE = {
     '1': 'Alice',
     '2': 'Bob',
 }
-next_user_id = 3
 
+# Storage backend behind the name handlers (swapped for a LogStore with --data-dir)
+STORE = MemoryStore(USER_DATABASE, next_id=3)
+REPLICA = None # Replicator when running as part of a replica group
+
+ROUTER = Router()
+
+# Arithmetic routes resolve to their operator in one lookup instead of an elif chain
+CALCULATIONS = {
+    '/add': operator.add,
+    '/sub': operator.sub,
+    '/mul': operator.mul,
+    '/div': operator.truediv,
+}
+
+@ROUTER.route(ANY_METHOD, *CALCULATIONS)
 def handle_calculation(method, route, values):
     """Handles /add, /sub, /mul, /div routes."""
     try:
@@ -16,54 +44,201 @@ def handle_calculation(method, route, values):
     except ValueError:
         return 400, "ERROR: Invalid number format. Use two numbers separated by a comma (e.g., 10,5)."
 
-    if route == '/add':
-        result = num1 + num2
-    elif route == '/sub':
-        result = num1 - num2
-    elif route == '/mul':
-        result = num1 * num2
-    elif route == '/div':
-        if num2 == 0:
-            return 400, "ERROR: Cannot divide by zero."
-        result = num1 / num2
-    else:
-        return 404, f"ERROR: Unknown route for method {method}."
+    if num2 == 0 and route == '/div':
+        return 400, "ERROR: Cannot divide by zero."
     
-    return 200, f"RESULT: {result}"
+    return 200, f"RESULT: {CALCULATIONS[route](num1, num2)}"
 
-def handle_name_operation(method, route, values):
-    """Handles /add_name, /update_name routes."""
-    global next_user_id
-    
-    if method == '/GET' and route == '/get_all_names':
-        names_list = [f"ID {uid}: {name}" for uid, name in USER_DATABASE.items()]
-        return 200, f"USER LIST:\n" + "\n".join(names_list)
-    
-    elif method == '/POST' and route == '/add_name':
-        new_name = values.strip()
-        if not new_name:
-            return 400, "ERROR: Name cannot be empty."
-        
-        user_id = str(next_user_id)
-        USER_DATABASE[user_id] = new_name
-        next_user_id += 1
-        return 201, f"CREATED: User '{new_name}' added with ID {user_id}"
-
-    elif method == '/PUT' and route == '/update_name':
+for batch_route in BATCH_OPS:
+    ROUTER.add_route(ANY_METHOD, batch_route, handle_batch_calculation)
+
+STREAM_STATUS = 206 # Status of every frame of a streamed reply except the last
+SNAPSHOT_GONE = "410 GONE\nERROR: The listing's snapshot was dropped because the table was replaced. Start again."
+STREAM_CHUNK = 1000 # Users per streamed frame / default page size
+
+def parse_options(values):
+    """Parses 'key=value' pairs separated by commas (e.g. 'cursor=9f2c41d07ab3e655:100,limit=50')."""
+    options = {}
+    for part in values.split(','):
+        if part.strip():
+            key, sep, value = part.partition('=')
+            if not sep:
+                raise ValueError(f"expected key=value, got '{part.strip()}'")
+            options[key.strip().lower()] = value.strip()
+    return options
+
+@ROUTER.route('/GET', '/get_all_names')
+def handle_get_all_names(method, route, values):
+    """
+    Handles /get_all_names. Both modes read one consistent snapshot of the users:
+    'limit=N[,cursor=TOKEN]' returns a single page and the cursor for the next one,
+    anything else streams the whole list in frames of 'chunk=N' users.
+    On a follower, 'max_staleness=SECONDS' bounds how old the data may be.
+    """
+    try:
+        options = parse_options(values)
+        limit = int(options['limit']) if 'limit' in options else None
+        chunk = int(options.get('chunk', STREAM_CHUNK))
+        max_staleness = float(options.get('max_staleness', 'inf'))
+        if (limit is not None and limit <= 0) or chunk <= 0:
+            raise ValueError("limit and chunk must be positive")
+    except ValueError as e:
+        return 400, f"ERROR: Invalid options ({e}). Use limit=N[,cursor=TOKEN] or chunk=N."
+
+    # Bounded-staleness read: refuse rather than serve data older than asked for
+    if REPLICA is not None and REPLICA.staleness() > max_staleness:
+        return 503, (f"ERROR: Replica may be {REPLICA.staleness():.3f}s behind the primary "
+                     f"(max_staleness={max_staleness}). Retry on replica {REPLICA.primary_id}.")
+
+    if 'cursor' in options or limit is not None:
+        return get_names_page(options.get('cursor'), limit or STREAM_CHUNK)
+    return 200, stream_names(chunk)
+
+def get_names_page(cursor, limit):
+    """One page of the user list; the cursor names the snapshot and the position in it."""
+    if cursor:
         try:
-            # Expects format: ID, NewName
-            user_id, new_name = map(str.strip, values.split(',', 1))
+            snapshot_id, _, start = cursor.partition(':')
+            start = int(start)
         except ValueError:
-            return 400, "ERROR: Invalid format. Expected ID,NewName (e.g., 1,Jane Doe)."
+            return 400, f"ERROR: Invalid cursor '{cursor}'."
+    else:
+        snapshot_id, start = STORE.open_snapshot(), 0
 
-        if user_id in USER_DATABASE:
-            old_name = USER_DATABASE[user_id]
-            USER_DATABASE[user_id] = new_name
-            return 200, f"UPDATED: ID {user_id} changed from '{old_name}' to '{new_name}'"
-        else:
-            return 404, f"ERROR: User ID {user_id} not found."
+    try:
+        rows, next_start = STORE.read_snapshot(snapshot_id, start, limit)
+    except KeyError:
+        return 410, "ERROR: Cursor expired. Start again without a cursor."
+
+    if next_start is None:
+        STORE.close_snapshot(snapshot_id)
+        next_cursor = "END"
+    else:
+        next_cursor = f"{snapshot_id}:{next_start}"
+
+    lines = [f"USER PAGE: {len(rows)} users"]
+    lines.extend(f"ID {uid}: {name}" for uid, name in rows)
+    lines.append(f"NEXT_CURSOR: {next_cursor}")
+    return 200, "\n".join(lines)
+
+def stream_names(chunk_size):
+    """Returns a generator that pins a snapshot when it starts and formats it chunk by chunk."""
+    def generate():
+        total = 0
+        for rows in STORE.iter_snapshot(chunk_size):
+            if rows:
+                total += len(rows)
+                yield "\n".join(f"ID {uid}: {name}" for uid, name in rows)
+        yield f"END OF USER LIST: {total} users"
+
+    return generate()
+
+@ROUTER.route('/POST', '/add_name')
+def handle_add_name(method, route, values):
+    """Handles /add_name."""
+    new_name = values.strip()
+    if not new_name:
+        return 400, "ERROR: Name cannot be empty."
+    if REPLICA is not None and not REPLICA.is_primary():
+        return REPLICA.not_primary()
     
-    return 404, f"ERROR: Unknown route or unsupported method for resource management."
+    user_id = STORE.add(new_name)
+    return 201, f"CREATED: User '{new_name}' added with ID {user_id}"
+
+@ROUTER.route('/PUT', '/update_name')
+def handle_update_name(method, route, values):
+    """Handles /update_name."""
+    try:
+        # Expects format: ID, NewName
+        user_id, new_name = map(str.strip, values.split(',', 1))
+    except ValueError:
+        return 400, "ERROR: Invalid format. Expected ID,NewName (e.g., 1,Jane Doe)."
+    if REPLICA is not None and not REPLICA.is_primary():
+        return REPLICA.not_primary()
+
+    old_name = STORE.update(user_id, new_name)
+    if old_name is not None:
+        return 200, f"UPDATED: ID {user_id} changed from '{old_name}' to '{new_name}'"
+    else:
+        return 404, f"ERROR: User ID {user_id} not found."
+
+@ROUTER.route('/GET', '/find_name')
+def handle_find_name(method, route, values):
+    """Handles /find_name: exact-name lookup through the secondary index."""
+    name = values.strip()
+    if not name:
+        return 400, "ERROR: Name cannot be empty."
+    user_ids = STORE.find(name)
+    if not user_ids:
+        return 404, f"ERROR: No user named '{name}'."
+    return 200, f"FOUND: '{name}' has ID(s) {', '.join(user_ids)}"
+
+# --- Replication routes (used between replicas) ---
+
+@ROUTER.route('/GET', '/repl_status')
+def handle_repl_status(method, route, values):
+    if REPLICA is None:
+        return 404, "ERROR: Replication is not enabled on this server."
+    return REPLICA.status()
+
+@ROUTER.route('/POST', '/repl_apply')
+def handle_repl_apply(method, route, values):
+    if REPLICA is None:
+        return 404, "ERROR: Replication is not enabled on this server."
+    try:
+        return REPLICA.handle_apply(values)
+    except (ValueError, KeyError, TypeError) as e:
+        return 400, f"ERROR: Invalid log batch ({e})."
+
+@ROUTER.route('/POST', '/repl_coordinator')
+def handle_repl_coordinator(method, route, values):
+    if REPLICA is None:
+        return 404, "ERROR: Replication is not enabled on this server."
+    try:
+        return REPLICA.handle_coordinator(values)
+    except ValueError:
+        return 400, "ERROR: Expected the PID of the new primary."
+
+@ROUTER.route('/GET', '/stats')
+def handle_stats(method, route, values):
+    """Handles /stats: per-route call counts and latency collected by the router."""
+    return 200, "ROUTE STATS:\n" + json.dumps(ROUTER.stats())
+
+
+@ROUTER.route(ANY_METHOD, '/batch')
+def handle_batch(method, route, values):
+    """
+    Handles /batch: runs a JSON list of [method, route, values] sub-requests
+    from a single frame and returns their results in the same order.
+    """
+    try:
+        sub_requests = json.loads(values)
+        if not isinstance(sub_requests, list):
+            raise ValueError("expected a list")
+    except ValueError as e:
+        return 400, f"ERROR: Invalid batch ({e}). Expected a JSON list of [method, route, values]."
+
+    results = []
+    for sub in sub_requests:
+        if not (isinstance(sub, list) and len(sub) == 3 and all(isinstance(x, str) for x in sub)):
+            results.append({'status': 400, 'response': "ERROR: Sub-request must be [method, route, values]."})
+            continue
+        sub_method, sub_route, sub_values = sub
+        sub_route = sub_route.strip().lower()
+        if sub_route == '/batch':
+            status, response = 400, "ERROR: Nested /batch is not allowed."
+        else:
+            status, response = route_request(sub_method.strip().upper(), sub_route, sub_values.strip())
+            if not isinstance(response, str):
+                status, response = 400, "ERROR: Streamed replies are not allowed inside /batch (use limit=N)."
+        results.append({'status': status, 'response': response})
+
+    return 200, f"BATCH RESULTS: {len(results)}\n" + json.dumps(results)
+
+
+def route_request(method, route, values):
+    """Dispatches an already-parsed request and returns (status, response)."""
+    return ROUTER.dispatch(method, route, values)
 
 
 def process_request(request_data):
@@ -71,26 +246,152 @@ def process_request(request_data):
     lines = request_data.split('\n', 2)
     
     if len(lines) != 3:
-        return 400, "ERROR: Message format must be exactly 3 lines: [Method], [Route], [Values]."
+        return "400 OK\nERROR: Message format must be exactly 3 lines: [Method], [Route], [Values]."
 
     method = lines[0].strip().upper()
     route = lines[1].strip().lower()
     values = lines[2].strip()
 
-    # Routing based on the API functionality
-    if route in ['/add', '/sub', '/mul', '/div']:
-        status, response = handle_calculation(method, route, values)
-    elif route in ['/add_name', '/update_name', '/get_all_names']:
-        status, response = handle_name_operation(method, route, values)
-    else:
-        status, response = 404, f"ERROR: API route '{route}' not found."
+    status, response = route_request(method, route, values)
 
     # Return the formatted API response
-    return f"{status} OK\n{response}"
+    if isinstance(response, str):
+        return f"{status} OK\n{response}"
+    return stream_frames(status, response)
+
+
+def stream_frames(status, chunks):
+    """
+    Formats a streamed reply one frame at a time: every chunk goes out as a
+    '206 OK' frame and the last one carries the real status.
+    """
+    chunks = iter(chunks)
+    previous = next(chunks)
+    for chunk in chunks:
+        yield f"{STREAM_STATUS} OK\n{previous}"
+        previous = chunk
+    yield f"{status} OK\n{previous}"
+
+
+# --- Binary Protocol ---
+
+BINARY_OPS = {opcode: (route, CALCULATIONS[route]) for opcode, route in OPCODE_ROUTES.items()}
+
+def process_binary_request(payload):
+    """
+    Serves one binary frame. Arithmetic opcodes skip text parsing and formatting
+    entirely; OP_TEXT carries any other request through the normal text path.
+    """
+    opcode = payload[0] if payload else None
+    if opcode in BINARY_OPS:
+        if len(payload) != CALC_REQUEST.size:
+            return encode_status(400, "ERROR: Arithmetic opcodes take exactly two float64 operands.")
+        _, num1, num2 = CALC_REQUEST.unpack(payload)
+        route, op = BINARY_OPS[opcode]
+        if num2 == 0 and route == '/div':
+            return encode_status(400, "ERROR: Cannot divide by zero.")
+        return encode_result(op(num1, num2))
+
+    if opcode == OP_TEXT:
+        reply = process_request(payload[1:].decode('utf-8'))
+        if isinstance(reply, str):
+            return text_reply_to_binary(reply)
+        return (text_reply_to_binary(chunk) for chunk in reply)
+
+    return encode_status(400, f"ERROR: Unknown opcode {opcode}.")
 
 
 # --- Socket Server Setup and Loop ---
 
+class ClientState:
+    """Per-connection state: receive buffer, negotiated protocol and pending output."""
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.reader = FrameReader()
+        self.binary = False # Switched on by a BINARY_HELLO first frame
+        self.requests = 0 # Frames dispatched so far
+        self.outbuf = bytearray()
+        self.pending = deque() # Replies queued behind a streamed one (bytes or frame generators)
+
+
+def dispatch_frame(frame, state):
+    """
+    Routes one received frame according to the connection's protocol.
+    Returns a reply payload (str or bytes) or a generator of them for streamed replies.
+    """
+    state.requests += 1
+    if state.binary:
+        return process_binary_request(frame)
+    if frame == BINARY_HELLO and state.requests == 1:
+        state.binary = True
+        return BINARY_HELLO
+    return process_request(frame.decode('utf-8'))
+
+
+def serve_connection(conn, addr):
+    """
+    Runs the persistent request/response loop for one client.
+    Requests are length-prefixed frames; a client may pipeline several of them
+    and the replies are written back in the same order in a single send.
+    """
+    state = ClientState(addr)
+    while True:
+        try:
+            # Receive whatever is available (blocks until data arrives)
+            data = conn.recv(RECV_SIZE)
+            if not data:
+                print(f"[INFO] Client {addr} disconnected gracefully.")
+                break # Break the loop to close the connection
+
+            frames = state.reader.feed(data)
+            if not frames:
+                continue # Partial frame, keep reading
+
+            replies = []
+            for frame in frames:
+                if not state.binary:
+                    print(f"[RECV] Raw Message:\n---\n{frame.decode('utf-8', 'replace')}\n---")
+
+                # Process the request and generate the response
+                response_message = dispatch_frame(frame, state)
+                if isinstance(response_message, (str, bytes)):
+                    replies.append(encode_frame(response_message))
+                    if isinstance(response_message, str):
+                        print(f"[SENT] Response Status: {response_message.splitlines()[0]}")
+                    continue
+
+                # Streamed reply: send the earlier replies, then each chunk as it is produced
+                STORE.commit()
+                conn.sendall(b''.join(replies))
+                replies = []
+                frames_sent = 0
+                try:
+                    for chunk in response_message:
+                        conn.sendall(encode_frame(chunk))
+                        frames_sent += 1
+                except KeyError:
+                    conn.sendall(encode_frame(SNAPSHOT_GONE))
+                print(f"[SENT] Streamed response in {frames_sent} frames")
+
+            # One fsync covers every write in this batch, then reply
+            STORE.commit()
+            conn.sendall(b''.join(replies))
+
+        except ConnectionResetError:
+            print(f"[INFO] Client {addr} closed connection abruptly.")
+            break
+        except FrameError as e:
+            conn.sendall(encode_frame(f"400 BAD_FRAME\n{e}"))
+            print(f"[ERROR] Dropping client {addr}: {e}")
+            break
+        except Exception as e:
+            error_response = f"500 INTERNAL_ERROR\nServer processing failed: {e}"
+            conn.sendall(encode_frame(error_response))
+            print(f"[ERROR] Exception during connection handling: {e}")
+            break
+
+
 def start_server():
     """Initializes and runs the main socket server loop."""
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -109,32 +410,7 @@ def start_server():
             
             # Inner loop for persistent communication with this client
             with conn:
-                while True:
-                    try:
-                        # Receive up to 1024 bytes (blocks until data arrives)
-                        data = conn.recv(1024)
-                        if not data:
-                            print(f"[INFO] Client {addr} disconnected gracefully.")
-                            break # Break the inner while loop to close the connection
-
-                        client_message = data.decode('utf-8')
-                        print(f"[RECV] Raw Message:\n---\n{client_message}\n---")
-
-                        # Process the request and generate the response
-                        response_message = process_request(client_message)
-
-                        # Send the API response back
-                        conn.sendall(response_message.encode('utf-8'))
-                        print(f"[SENT] Response Status: {response_message.splitlines()[0]}")
-                        
-                    except ConnectionResetError:
-                        print(f"[INFO] Client {addr} closed connection abruptly.")
-                        break
-                    except Exception as e:
-                        error_response = f"500 INTERNAL_ERROR\nServer processing failed: {e}"
-                        conn.sendall(error_response.encode('utf-8'))
-                        print(f"[ERROR] Exception during connection handling: {e}")
-                        break
+                serve_connection(conn, addr)
 
     except socket.error as e:
         print(f"[CRITICAL ERROR] Could not start server: {e}")
@@ -142,5 +418,203 @@ def start_server():
     finally:
         server_socket.close()
 
+
+# --- Event-Loop Server (selectors) ---
+
+OUTBUF_HIGH_WATER = 256 * 1024 # Stop pulling streamed chunks once this much is unsent
+
+
+def _fill_outbuf(state):
+    """Moves queued replies into the send buffer, pulling streamed chunks lazily."""
+    while state.pending and len(state.outbuf) < OUTBUF_HIGH_WATER:
+        head = state.pending[0]
+        if isinstance(head, bytes):
+            state.outbuf += head
+            state.pending.popleft()
+            continue
+        try:
+            state.outbuf += encode_frame(next(head))
+        except StopIteration:
+            state.pending.popleft()
+        except KeyError:
+            state.pending.popleft()
+            state.outbuf += encode_frame(SNAPSHOT_GONE)
+        except Exception as e:
+            state.pending.popleft()
+            state.outbuf += encode_frame(f"500 INTERNAL_ERROR\nStreaming failed: {e}")
+
+
+def _close_client(selector, conn, state, reason):
+    selector.unregister(conn)
+    conn.close()
+    # Release the read snapshots held by unfinished streams
+    for item in state.pending:
+        if not isinstance(item, bytes):
+            item.close()
+    state.pending.clear()
+    print(f"[INFO] Client {state.addr} {reason}.")
+
+
+def _flush_client(selector, conn, state):
+    """Writes as much buffered output as the socket accepts without blocking."""
+    _fill_outbuf(state)
+    if state.outbuf:
+        sent = conn.send(state.outbuf)
+        del state.outbuf[:sent]
+        _fill_outbuf(state)
+    # Only ask for write readiness while there is something left to send
+    waiting = state.outbuf or state.pending
+    events = selectors.EVENT_READ | (selectors.EVENT_WRITE if waiting else 0)
+    selector.modify(conn, events, state)
+
+
+def _read_client(selector, conn, state):
+    """Processes every complete frame received; returns True if replies were queued."""
+    data = conn.recv(RECV_SIZE)
+    if not data:
+        _close_client(selector, conn, state, "disconnected gracefully")
+        return False
+
+    try:
+        frames = state.reader.feed(data)
+    except FrameError as e:
+        conn.send(encode_frame(f"400 BAD_FRAME\n{e}"))
+        _close_client(selector, conn, state, f"dropped: {e}")
+        return False
+
+    for frame in frames:
+        try:
+            response_message = dispatch_frame(frame, state)
+        except Exception as e:
+            response_message = f"500 INTERNAL_ERROR\nServer processing failed: {e}"
+            if state.binary:
+                response_message = text_reply_to_binary(response_message)
+        if isinstance(response_message, (str, bytes)):
+            reply = encode_frame(response_message)
+            if state.pending:
+                state.pending.append(reply) # Keep order behind an unfinished stream
+            else:
+                state.outbuf += reply
+        else:
+            state.pending.append(response_message)
+
+    return bool(frames)
+
+
+def start_event_loop_server(backlog=1024):
+    """
+    Serves every client from one thread with non-blocking sockets.
+    A single idle persistent client no longer blocks accept(), and all
+    connections still share the one USER_DATABASE held by this process.
+    """
+    selector = selectors.DefaultSelector()
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        server_socket.bind((HOST, PORT))
+        server_socket.listen(backlog)
+        server_socket.setblocking(False)
+        selector.register(server_socket, selectors.EVENT_READ, None)
+        print(f"--- Custom API Server Initialized (Event Loop) ---")
+        print(f"Server is listening on {HOST}:{PORT}")
+        print(f"Current User DB: {USER_DATABASE}")
+        print("-------------------------------------")
+
+        while True:
+            replied = []
+            for key, mask in selector.select():
+                if key.data is None:
+                    # Listening socket: accept everything that is queued
+                    while True:
+                        try:
+                            conn, addr = server_socket.accept()
+                        except BlockingIOError:
+                            break
+                        conn.setblocking(False)
+                        selector.register(conn, selectors.EVENT_READ, ClientState(addr))
+                    continue
+
+                conn, state = key.fileobj, key.data
+                try:
+                    if mask & selectors.EVENT_READ and _read_client(selector, conn, state):
+                        replied.append((conn, state))
+                    elif mask & selectors.EVENT_WRITE and conn.fileno() != -1:
+                        _flush_client(selector, conn, state)
+                except (BlockingIOError, InterruptedError):
+                    pass
+                except OSError as e:
+                    _close_client(selector, conn, state, f"closed connection abruptly ({e})")
+
+            # Group commit: one fsync for every write made by every client this round,
+            # and no reply leaves the server before its write is durable
+            if replied:
+                STORE.commit()
+            for conn, state in replied:
+                try:
+                    _flush_client(selector, conn, state)
+                except (BlockingIOError, InterruptedError):
+                    pass
+                except OSError as e:
+                    _close_client(selector, conn, state, f"closed connection abruptly ({e})")
+
+    except socket.error as e:
+        print(f"[CRITICAL ERROR] Could not start server: {e}")
+        print("Check if the IP is correct or if the port is already in use.")
+    except KeyboardInterrupt:
+        print("\nServer Shutting Down.")
+    finally:
+        selector.close()
+        server_socket.close()
+
+
 if __name__ == '__main__':
-    start_server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Custom stateful API server.")
+    parser.add_argument("--mode", choices=["blocking", "eventloop"], default="blocking",
+                        help="'blocking' serves one client at a time; 'eventloop' multiplexes all clients.")
+    parser.add_argument("--data-dir", help="Persist users in this directory (WAL + snapshots). Default: memory only.")
+    parser.add_argument("--snapshot-every", type=int, default=10000,
+                        help="Compact the WAL into a snapshot after this many writes.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--shard-config", help="JSON shard list; run as one shard of a sharded user store.")
+    parser.add_argument("--shard-name", help="This server's entry in --shard-config (its host/port are used).")
+    parser.add_argument("--replica-config", help="JSON replica list; run as one replica of a replicated store.")
+    parser.add_argument("--replica-id", type=int, help="This server's PID in --replica-config (its host/port are used).")
+    args = parser.parse_args()
+    HOST, PORT = args.host, args.port
+
+    if args.replica_config:
+        replicas = load_replicas(args.replica_config)
+        if args.replica_id not in replicas:
+            parser.error(f"--replica-id must be one of: {', '.join(map(str, replicas))}")
+        if args.mode != "eventloop" or args.shard_config:
+            parser.error("--replica-config needs --mode eventloop and cannot be combined with --shard-config")
+        HOST, PORT = replicas[args.replica_id]
+
+    owns_id = None
+    if args.shard_config:
+        shards = {s['name']: s for s in load_shards(args.shard_config)}
+        if args.shard_name not in shards:
+            parser.error(f"--shard-name must be one of: {', '.join(shards)}")
+        HOST, PORT = shards[args.shard_name]['host'], shards[args.shard_name]['port']
+        owns_id = HashRing(list(shards)).owner_filter(args.shard_name)
+        # Keep only the seed users this shard owns, so each user lives on exactly one shard
+        for uid in [uid for uid in USER_DATABASE if not owns_id(uid)]:
+            del USER_DATABASE[uid]
+        STORE = MemoryStore(USER_DATABASE, next_id=STORE.next_id)
+        print(f"[SHARD] {args.shard_name}: owns {len(USER_DATABASE)} seed user(s)")
+
+    if args.data_dir:
+        STORE = LogStore(USER_DATABASE, args.data_dir, next_id=STORE.next_id, snapshot_every=args.snapshot_every)
+    STORE.owns_id = owns_id
+    if args.replica_config:
+        REPLICA = Replicator(STORE, args.replica_id, replicas)
+        REPLICA.start()
+
+    try:
+        if args.mode == "eventloop":
+            start_event_loop_server()
+        else:
+            start_server()
+    finally:
+        STORE.close()
\ No newline at end of file
@@ -0,0 +1,139 @@
+import asyncio
+import argparse
+
+from framing import encode_frame, read_frame
+from api_client import APIResponse
+from sharding import ShardedClient, load_shards
+from server import parse_options, STREAM_STATUS, STREAM_CHUNK
+
+HOST = '127.0.0.1'
+PORT = 4000
+MAX_PIPELINE = 256 # Requests per connection being answered at once
+
+# --- Shard Router ---
+# Speaks the normal framed text protocol, so client.py, api_client.py and
+# benchmark.py work unchanged against a sharded deployment. Each request is
+# forwarded through a ShardedClient; replies go back in request order.
+
+
+def reply_frame(status, body):
+    return encode_frame(f"{status} OK\n{body}")
+
+
+async def stream_all_names(api, chunk):
+    """Streams every shard's users as '206' frames, then the end-of-list frame."""
+    total = 0
+    try:
+        async for _, rows in api.iter_all_names(chunk):
+            total += len(rows)
+            yield reply_frame(STREAM_STATUS, "\n".join(rows))
+    except ConnectionError as e:
+        yield reply_frame(502, f"ERROR: {e}")
+        return
+    yield reply_frame(200, f"END OF USER LIST: {total} users")
+
+
+async def route_one(api, method, route, values, in_batch=False):
+    """Serves one non-streamed request through the ShardedClient; returns an APIResponse."""
+    if route == '/get_all_names':
+        if method != '/GET':
+            return APIResponse(404, f"ERROR: Method {method} not supported for route '{route}' (use /GET).")
+        try:
+            options = parse_options(values)
+            if in_batch and 'limit' not in options and 'cursor' not in options:
+                return APIResponse(400, "ERROR: Streamed replies are not allowed inside /batch (use limit=N).")
+            limit = int(options.get('limit') or STREAM_CHUNK)
+            if limit <= 0 or int(options.get('chunk', STREAM_CHUNK)) <= 0:
+                raise ValueError("limit and chunk must be positive")
+            return await api.get_names_page(limit, options.get('cursor'))
+        except ValueError as e:
+            return APIResponse(400, f"ERROR: Invalid options or cursor ({e}).")
+    if route == '/batch':
+        return await api.batch(method, values, lambda *sub: route_one(api, *sub, in_batch=True))
+    return await api.request(method, route, values)
+
+
+async def forward(api, method, route, values):
+    try:
+        reply = await route_one(api, method, route, values)
+    except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+        return reply_frame(502, f"ERROR: Shard unavailable ({e or type(e).__name__}).")
+    return reply_frame(reply.status, reply.body)
+
+
+def start_request(frame, api):
+    """Starts serving one request; returns a task (single frame) or an async generator (stream)."""
+    lines = frame.decode('utf-8', errors='replace').split('\n', 2)
+    if len(lines) != 3:
+        reply = reply_frame(400, "ERROR: Message format must be exactly 3 lines: [Method], [Route], [Values].")
+        return asyncio.create_task(asyncio.sleep(0, reply))
+    method, route, values = lines[0].strip().upper(), lines[1].strip().lower(), lines[2].strip()
+    if route == '/get_all_names' and method == '/GET':
+        try:
+            options = parse_options(values)
+            chunk = int(options.get('chunk', STREAM_CHUNK))
+        except ValueError:
+            options, chunk = {'limit': ''}, 0 # Let forward() report the bad options
+        if chunk > 0 and 'limit' not in options and 'cursor' not in options:
+            return stream_all_names(api, chunk)
+    return asyncio.create_task(forward(api, method, route, values))
+
+
+async def send_replies(writer, replies):
+    while True:
+        reply = await replies.get()
+        if reply is None:
+            return
+        if isinstance(reply, asyncio.Task):
+            writer.write(await reply)
+        else:
+            async for frame in reply:
+                writer.write(frame)
+                await writer.drain()
+        await writer.drain()
+
+
+async def handle_client(reader, writer, api):
+    addr = writer.get_extra_info('peername')
+    print(f"[ROUTER] Connected by {addr}")
+    replies = asyncio.Queue(MAX_PIPELINE)
+    sender = asyncio.create_task(send_replies(writer, replies))
+    try:
+        while not sender.done():
+            frame = await read_frame(reader)
+            if frame is None:
+                break
+            await replies.put(start_request(frame, api))
+        await replies.put(None)
+        await sender
+    except (ConnectionError, OSError) as e:
+        print(f"[ROUTER] Connection with {addr} failed: {e}")
+    finally:
+        sender.cancel()
+        writer.close()
+        print(f"[ROUTER] Connection with {addr} closed.")
+
+
+async def main(shards, host, port):
+    api = ShardedClient(shards)
+    server = await asyncio.start_server(lambda r, w: handle_client(r, w, api), host, port)
+    print(f"Shard router listening on {host}:{port} for {len(shards)} shards: "
+          f"{', '.join(s['name'] for s in shards)}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await api.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Routes EXP1 API requests across sharded servers.")
+    parser.add_argument("--shard-config", required=True, help="JSON shard list shared with the shard servers.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(load_shards(args.shard_config), args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nShard router shutting down.")
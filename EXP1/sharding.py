@@ -0,0 +1,200 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+
+from api_client import AsyncAPIClient, APIResponse
+
+# --- Consistent Hashing ---
+# Each shard owns many points ("virtual nodes") on a 64-bit ring; a user ID
+# belongs to the first shard point clockwise from the ID's hash. Adding or
+# removing a shard only moves the IDs next to its points.
+
+VIRTUAL_NODES = 64
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, shard_names, virtual_nodes=VIRTUAL_NODES):
+        points = sorted((ring_hash(f"{name}#{i}"), name)
+                        for name in shard_names for i in range(virtual_nodes))
+        self.hashes = [h for h, _ in points]
+        self.names = [name for _, name in points]
+
+    def lookup(self, user_id):
+        """Name of the shard that owns this user ID."""
+        i = bisect.bisect(self.hashes, ring_hash(str(user_id))) % len(self.hashes)
+        return self.names[i]
+
+    def owner_filter(self, shard_name):
+        """Predicate for a shard's ID allocator: True for IDs this shard owns."""
+        return lambda user_id: self.lookup(user_id) == shard_name
+
+
+def load_shards(path):
+    """Reads a shard list like [{"name": "shard-a", "host": "127.0.0.1", "port": 4100}, ...]."""
+    with open(path, 'r') as f:
+        shards = json.load(f)
+    for shard in shards:
+        if not {'name', 'host', 'port'} <= shard.keys():
+            raise ValueError(f"Shard entry {shard} needs 'name', 'host' and 'port'.")
+    return shards
+
+
+# --- Smart Client ---
+
+class ShardedClient:
+    """
+    Routes API calls to the shard servers directly:
+      /add_name            -> next shard in round-robin order (it allocates an ID it owns)
+      /update_name         -> the shard owning the ID on the hash ring
+      /get_all_names, /find_name -> every shard (scatter-gather)
+      /batch               -> split by shard, in order (see batch())
+      anything else        -> any shard
+    A shard only allocates IDs that hash to itself, so no global counter is needed.
+    """
+
+    def __init__(self, shards, **client_options):
+        self.ring = HashRing([s['name'] for s in shards])
+        self.clients = {s['name']: AsyncAPIClient(s['host'], s['port'], **client_options) for s in shards}
+        self.order = [s['name'] for s in shards]
+        self.round_robin = itertools.cycle(self.order)
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.close()
+
+    def shard_for(self, route, values, preferred=None):
+        """Name of the one shard that should serve this request, or None if it needs every shard."""
+        if route == '/update_name':
+            return self.ring.lookup(values.split(',', 1)[0].strip())
+        if route in ('/find_name', '/get_all_names'):
+            return None
+        if route == '/add_name' or preferred is None:
+            return next(self.round_robin)
+        return preferred
+
+    async def request(self, method, route, values=''):
+        """Generic entry point used by the router; returns an APIResponse."""
+        if route == '/find_name':
+            return await self.find_name(method, values)
+        if route == '/batch':
+            return await self.batch(method, values)
+        return await self.clients[self.shard_for(route, values)].request(method, route, values)
+
+    async def batch(self, method, values, run_one=None):
+        """
+        /batch across shards. Sub-requests run in order; each run of consecutive
+        sub-requests for the same shard goes to that shard as one /batch, and
+        scatter-gather ones go through 'run_one' (default: request()).
+        """
+        try:
+            sub_requests = json.loads(values)
+            if not isinstance(sub_requests, list):
+                raise ValueError("expected a list")
+        except ValueError as e:
+            return APIResponse(400, f"ERROR: Invalid batch ({e}). Expected a JSON list of [method, route, values].")
+
+        run_one = run_one or self.request
+        results = [None] * len(sub_requests)
+        group, group_shard = [], None # Pending (index, sub-request) pairs for one shard
+        for i, sub in enumerate(sub_requests):
+            if not (isinstance(sub, list) and len(sub) == 3 and all(isinstance(x, str) for x in sub)):
+                results[i] = {'status': 400, 'response': "ERROR: Sub-request must be [method, route, values]."}
+                continue
+            sub_method, sub_route, sub_values = sub[0].strip().upper(), sub[1].strip().lower(), sub[2].strip()
+            if sub_route == '/batch':
+                results[i] = {'status': 400, 'response': "ERROR: Nested /batch is not allowed."}
+                continue
+            shard = self.shard_for(sub_route, sub_values, group_shard)
+            if shard != group_shard:
+                await self._send_batch(method, group_shard, group, results)
+                group, group_shard = [], shard
+            if shard is not None:
+                group.append((i, [sub_method, sub_route, sub_values]))
+                continue
+            try:
+                reply = await run_one(sub_method, sub_route, sub_values)
+                results[i] = {'status': reply.status, 'response': reply.body}
+            except (ConnectionError, OSError) as e:
+                results[i] = {'status': 502, 'response': f"ERROR: Shard unavailable ({e or type(e).__name__})."}
+        await self._send_batch(method, group_shard, group, results)
+        return APIResponse(200, f"BATCH RESULTS: {len(results)}\n" + json.dumps(results))
+
+    async def _send_batch(self, method, shard, group, results):
+        """Sends [(index, sub-request), ...] to one shard as a single /batch and fills in their results."""
+        if not group:
+            return
+        try:
+            reply = await self.clients[shard].request(method, '/batch', json.dumps([sub for _, sub in group]))
+            if reply.status == 200:
+                replies = json.loads(reply.body.split('\n', 1)[1])
+            else:
+                replies = [{'status': reply.status, 'response': reply.body}] * len(group)
+        except (ConnectionError, OSError) as e:
+            replies = [{'status': 502, 'response': f"ERROR: Shard {shard} unavailable ({e or type(e).__name__})."}] * len(group)
+        for (i, _), result in zip(group, replies):
+            results[i] = result
+
+    async def find_name(self, method, name):
+        replies = await asyncio.gather(*(c.request(method, '/find_name', name) for c in self.clients.values()))
+        user_ids = []
+        for reply in replies:
+            if reply.status == 200:
+                user_ids.extend(reply.body.rpartition('has ID(s) ')[2].split(', '))
+        if not user_ids:
+            return next((r for r in replies if r.status != 404), replies[0])
+        user_ids.sort(key=int)
+        return APIResponse(200, f"FOUND: '{name}' has ID(s) {', '.join(user_ids)}")
+
+    async def iter_all_names(self, page_size=1000):
+        """
+        Scatter-gather listing: asks every shard for its next page concurrently and
+        yields each page body as it comes, following every shard's own cursor.
+        Only one page per shard is held in memory at a time.
+        """
+        cursors = {name: None for name in self.order}
+        while cursors:
+            names = list(cursors)
+            pages = await asyncio.gather(*(
+                self.clients[name].request('/GET', '/get_all_names',
+                                           f"limit={page_size}" + (f",cursor={cursors[name]}" if cursors[name] else ""))
+                for name in names))
+            for name, page in zip(names, pages):
+                if page.status != 200:
+                    raise ConnectionError(f"shard {name} failed to list users: {page.body}")
+                lines = page.body.split('\n')
+                next_cursor = lines[-1].split(': ', 1)[1]
+                rows = lines[1:-1]
+                if rows:
+                    yield name, rows
+                if next_cursor == 'END':
+                    del cursors[name]
+                else:
+                    cursors[name] = next_cursor
+
+    async def get_names_page(self, limit, cursor=None):
+        """
+        One page of the sharded user list. Shards are walked in config order and
+        the cursor is '<shard index>/<that shard's cursor>'; each shard pages
+        through its own snapshot, so the listing is per-shard consistent.
+        """
+        index, _, inner = (cursor or '0/').partition('/')
+        index = int(index)
+        rows = []
+        while index < len(self.order) and len(rows) < limit:
+            values = f"limit={limit - len(rows)}" + (f",cursor={inner}" if inner else "")
+            page = await self.clients[self.order[index]].request('/GET', '/get_all_names', values)
+            if page.status != 200:
+                return page
+            lines = page.body.split('\n')
+            rows.extend(lines[1:-1])
+            inner = lines[-1].split(': ', 1)[1]
+            if inner == 'END':
+                index, inner = index + 1, ''
+        next_cursor = f"{index}/{inner}" if index < len(self.order) else 'END'
+        return APIResponse(200, "\n".join([f"USER PAGE: {len(rows)} users", *rows, f"NEXT_CURSOR: {next_cursor}"]))
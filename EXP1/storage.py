@@ -0,0 +1,495 @@
+import os
+import bisect
+import glob
+import mmap
+import secrets
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+
+SNAPSHOT_TTL = 60.0 # Seconds an idle read snapshot (pagination cursor) is kept
+MAX_SNAPSHOTS = 1000 # Open snapshots at most; opening another evicts the least recently read one
+
+# --- User Storage Backends ---
+# MemoryStore keeps USER_DATABASE in memory only (the original behaviour).
+# LogStore adds durability on top of the same dict:
+#   * every mutation is appended to a write-ahead log (WAL) before it is acknowledged,
+#   * commit() fsyncs once for all records appended since the last fsync (group commit),
+#   * the WAL is periodically compacted into a snapshot that recovery mmap-loads
+#     before replaying only the WAL tail written after it.
+
+
+class MemoryStore:
+    """
+    In-memory user table with a secondary name -> IDs index.
+
+    Readers can open a snapshot: a consistent view of the table as of one
+    version, read in chunks while writers keep going. Users created later sit
+    past the snapshot's end of 'order' and are invisible; names overwritten
+    later are served from 'history', which is only kept while snapshots are open.
+    """
+
+    def __init__(self, data, next_id=1):
+        self.data = data # The shared USER_DATABASE dict
+        self.next_id = next_id
+        self.lock = threading.RLock()
+        self.name_index = {}
+        self.order = [] # User IDs in creation order (append-only)
+        self.version = 0 # Bumped by every mutation
+        self.history = {} # uid -> ([versions that overwrote it, ascending], [old names])
+        self.history_log = deque() # (version, uid) of every history entry, oldest first
+        self.snapshots = OrderedDict() # snapshot id -> [version, end of order, expires at], least recently read first
+        self.pinned = {} # snapshot id -> [version, end of order], exempt from the TTL and MAX_SNAPSHOTS (streams)
+        self.opened = OrderedDict() # snapshot id -> version, oldest version first
+        self.snapshot_ttl = SNAPSHOT_TTL
+        self.max_snapshots = MAX_SNAPSHOTS
+        self.owns_id = None # Optional predicate; a shard only hands out IDs it owns
+        self.on_write = None # Optional listener called with (user_id, name) under the lock
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        self.name_index = {}
+        for uid, name in self.data.items():
+            self.name_index.setdefault(name, set()).add(uid)
+        self.order = sorted(self.data, key=int)
+
+    def _allocate_id(self):
+        while True:
+            user_id = str(self.next_id)
+            self.next_id += 1
+            if self.owns_id is None or self.owns_id(user_id):
+                return user_id
+
+    def _set(self, user_id, name):
+        """Applies 'user_id := name' to the table and index; returns the old name."""
+        old_name = self.data.get(user_id)
+        self.version += 1
+        if old_name is None:
+            self.order.append(user_id)
+        else:
+            ids = self.name_index[old_name]
+            ids.discard(user_id)
+            if not ids:
+                del self.name_index[old_name]
+            if self.opened:
+                versions, names = self.history.setdefault(user_id, ([], []))
+                versions.append(self.version)
+                names.append(old_name)
+                self.history_log.append((self.version, user_id))
+        self.data[user_id] = name
+        self.name_index.setdefault(name, set()).add(user_id)
+        if user_id.isdigit() and int(user_id) >= self.next_id:
+            self.next_id = int(user_id) + 1
+        return old_name
+
+    def _log(self, user_id, name):
+        """Hook for durable backends; the in-memory store has nothing to write."""
+
+    def _after_write(self):
+        """Hook run once a logged change has been applied to the table."""
+
+    def _write(self, user_id, name):
+        self._log(user_id, name)
+        old_name = self._set(user_id, name)
+        self._after_write()
+        if self.on_write:
+            self.on_write(user_id, name)
+        return old_name
+
+    def add(self, name):
+        """Creates a user and returns its new ID."""
+        with self.lock:
+            user_id = self._allocate_id()
+            self._write(user_id, name)
+            return user_id
+
+    def update(self, user_id, name):
+        """Renames an existing user; returns the old name, or None if the ID is unknown."""
+        with self.lock:
+            if user_id not in self.data:
+                return None
+            return self._write(user_id, name)
+
+    def apply(self, user_id, name):
+        """Writes 'user_id := name' exactly as given, creating the user if needed (replication)."""
+        with self.lock:
+            return self._write(user_id, name)
+
+    def replace(self, records):
+        """Replaces the whole table with [(user_id, name), ...] (replication resync)."""
+        with self.lock:
+            self.data.clear()
+            self.data.update(records)
+            self.version += 1
+            # Open snapshots index the old table; their readers must start again
+            for snapshot_id in list(self.opened):
+                self._drop_snapshot(snapshot_id)
+            self._rebuild_index()
+            self.next_id = max([self.next_id, *(int(uid) + 1 for uid in self.data if uid.isdigit())])
+
+    def get(self, user_id):
+        return self.data.get(user_id)
+
+    def find(self, name):
+        """Secondary-index lookup: IDs of every user with exactly this name."""
+        with self.lock:
+            return sorted(self.name_index.get(name, ()), key=int)
+
+    def items(self):
+        return self.data.items()
+
+    def __len__(self):
+        return len(self.data)
+
+    # --- Snapshot reads ---
+
+    def open_snapshot(self, pinned=False):
+        """
+        Pins the current version for consistent reads; returns a snapshot ID.
+        A pinned snapshot is never expired or evicted, so it must be closed.
+        """
+        with self.lock:
+            self._expire_snapshots()
+            snapshot_id = secrets.token_hex(8)
+            if pinned:
+                self.pinned[snapshot_id] = [self.version, len(self.order)]
+            else:
+                while len(self.snapshots) >= self.max_snapshots:
+                    self._drop_snapshot(next(iter(self.snapshots)))
+                self.snapshots[snapshot_id] = [self.version, len(self.order), time.monotonic() + self.snapshot_ttl]
+            self.opened[snapshot_id] = self.version
+            return snapshot_id
+
+    def read_snapshot(self, snapshot_id, start, count):
+        """
+        Returns ([(uid, name), ...], next_start) for up to 'count' users from
+        position 'start' of the snapshot; next_start is None at the end.
+        Raises KeyError if the snapshot was closed, evicted or expired, or the
+        table was replaced.
+        """
+        with self.lock:
+            self._expire_snapshots()
+            if snapshot_id in self.pinned:
+                version, end = self.pinned[snapshot_id]
+            else:
+                snapshot = self.snapshots[snapshot_id]
+                version, end, _ = snapshot
+                snapshot[2] = time.monotonic() + self.snapshot_ttl
+                self.snapshots.move_to_end(snapshot_id)
+            stop = min(start + count, end)
+            rows = []
+            for uid in self.order[start:stop]:
+                name = self.data[uid]
+                entry = self.history.get(uid)
+                if entry:
+                    # First overwrite after the snapshot holds the value it saw
+                    i = bisect.bisect_right(entry[0], version)
+                    if i < len(entry[0]):
+                        name = entry[1][i]
+                rows.append((uid, name))
+            return rows, (stop if stop < end else None)
+
+    def close_snapshot(self, snapshot_id):
+        with self.lock:
+            if snapshot_id in self.opened:
+                self._drop_snapshot(snapshot_id)
+
+    def snapshot_size(self, snapshot_id):
+        with self.lock:
+            return (self.pinned.get(snapshot_id) or self.snapshots[snapshot_id])[1]
+
+    def iter_snapshot(self, chunk_size):
+        """
+        Iterates over a snapshot in chunks of users. The snapshot is opened when
+        iteration starts, so an iterator that is never started holds nothing,
+        and it is pinned until the iterator finishes or is closed, so a slow
+        stream is not cut off by the TTL or by MAX_SNAPSHOTS.
+        The lock is only held while each chunk is read, so writers are not blocked.
+        """
+        snapshot_id = self.open_snapshot(pinned=True)
+        try:
+            start = 0
+            while start is not None:
+                rows, start = self.read_snapshot(snapshot_id, start, chunk_size)
+                yield rows
+        finally:
+            self.close_snapshot(snapshot_id)
+
+    def _expire_snapshots(self):
+        # The TTL is the same for every snapshot, so the least recently read expires first
+        now = time.monotonic()
+        while self.snapshots:
+            snapshot_id, (_, _, expires_at) = next(iter(self.snapshots.items()))
+            if expires_at >= now:
+                break
+            self._drop_snapshot(snapshot_id)
+
+    def _drop_snapshot(self, snapshot_id):
+        if self.pinned.pop(snapshot_id, None) is None:
+            del self.snapshots[snapshot_id]
+        del self.opened[snapshot_id]
+        self._prune_history()
+
+    def _prune_history(self):
+        """Drops overwritten names that no open snapshot can still see."""
+        if not self.opened:
+            self.history.clear()
+            self.history_log.clear()
+            return
+        oldest = next(iter(self.opened.values())) # Snapshots are opened in version order
+        while self.history_log and self.history_log[0][0] <= oldest:
+            _, uid = self.history_log.popleft()
+            versions, names = self.history[uid]
+            del versions[0], names[0] # Each uid's entries are logged in version order
+            if not versions:
+                del self.history[uid]
+
+    def commit(self):
+        """Makes every mutation so far durable. No-op for the in-memory store."""
+
+    def close(self):
+        pass
+
+
+# --- On-disk formats ---
+# WAL record:      [u32 body length][u32 crc32(body)][body = u64 user id + UTF-8 name]
+# WAL file header: magic + u64 LSN of the last record *before* this file
+# Snapshot:        magic + u64 LSN covered + u64 next_id + u64 count,
+#                  then per user: u64 user id, u32 name length, UTF-8 name
+
+WAL_MAGIC = b'UDBWAL01'
+SNAP_MAGIC = b'UDBSNAP1'
+WAL_HEADER = struct.Struct('<8sQ')
+RECORD_HEADER = struct.Struct('<II')
+RECORD_ID = struct.Struct('<Q')
+SNAP_HEADER = struct.Struct('<8sQQQ')
+SNAP_ENTRY = struct.Struct('<QI')
+
+
+class LogStore(MemoryStore):
+    """
+    Durable store: WAL with group-commit fsync, compacted snapshots and
+    mmap-based fast restart. Recovery replaces the contents of 'data'.
+    """
+
+    def __init__(self, data, data_dir, next_id=1, snapshot_every=10000, fsync=True):
+        self.data_dir = data_dir
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.lsn = 0 # Number of mutations ever logged
+        self.wal = None
+        self.wal_records = 0 # Records in the current WAL file
+        self.compacting = False
+
+        # Group commit state: one thread fsyncs while the others wait for it
+        self.sync_cond = threading.Condition()
+        self.synced_lsn = 0
+        self.syncing = False
+
+        os.makedirs(data_dir, exist_ok=True)
+        fresh = not os.path.exists(self._snapshot_path()) and not self._wal_files()
+        super().__init__(data, next_id)
+        if fresh:
+            # First start: persist the seed data as the initial snapshot
+            self._write_snapshot(dict(self.data), self.lsn, self.next_id)
+        else:
+            self._recover()
+        self.synced_lsn = self.lsn
+        self._open_wal()
+
+    # --- Paths ---
+
+    def _snapshot_path(self):
+        return os.path.join(self.data_dir, 'users.snapshot')
+
+    def _wal_path(self, base_lsn):
+        return os.path.join(self.data_dir, f'wal-{base_lsn:020d}.log')
+
+    def _wal_files(self):
+        return sorted(glob.glob(os.path.join(self.data_dir, 'wal-*.log')))
+
+    # --- Recovery ---
+
+    def _recover(self):
+        self.data.clear()
+        if os.path.exists(self._snapshot_path()):
+            self._load_snapshot()
+        replayed = 0
+        for path in self._wal_files():
+            replayed += self._replay_wal(path)
+        self._rebuild_index()
+        print(f"[STORAGE] Recovered {len(self.data)} users (LSN {self.lsn}, {replayed} from WAL tail).")
+
+    def _load_snapshot(self):
+        with open(self._snapshot_path(), 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            magic, lsn, next_id, count = SNAP_HEADER.unpack_from(view, 0)
+            if magic != SNAP_MAGIC:
+                raise ValueError(f"{self._snapshot_path()} is not a user snapshot.")
+            offset = SNAP_HEADER.size
+            data = self.data
+            for _ in range(count):
+                uid, length = SNAP_ENTRY.unpack_from(view, offset)
+                offset += SNAP_ENTRY.size
+                data[str(uid)] = view[offset:offset + length].decode('utf-8')
+                offset += length
+        self.lsn = lsn
+        self.next_id = max(self.next_id, next_id)
+
+    def _replay_wal(self, path):
+        """Applies the records newer than the snapshot; truncates a torn tail."""
+        replayed = 0
+        with open(path, 'r+b') as f:
+            header = f.read(WAL_HEADER.size)
+            if len(header) < WAL_HEADER.size:
+                f.truncate(0) # Crashed while creating the file
+                return 0
+            magic, base_lsn = WAL_HEADER.unpack(header)
+            if magic != WAL_MAGIC:
+                raise ValueError(f"{path} is not a WAL file.")
+            lsn = base_lsn
+            good_offset = f.tell()
+            while True:
+                record_header = f.read(RECORD_HEADER.size)
+                if len(record_header) < RECORD_HEADER.size:
+                    break
+                length, crc = RECORD_HEADER.unpack(record_header)
+                body = f.read(length)
+                if len(body) < length or zlib.crc32(body) != crc:
+                    break # Crash in the middle of an append
+                lsn += 1
+                good_offset = f.tell()
+                if lsn > self.lsn:
+                    (uid,) = RECORD_ID.unpack_from(body)
+                    self.data[str(uid)] = body[RECORD_ID.size:].decode('utf-8')
+                    if uid >= self.next_id:
+                        self.next_id = uid + 1
+                    self.lsn = lsn
+                    replayed += 1
+            if good_offset < os.fstat(f.fileno()).st_size:
+                print(f"[STORAGE] Truncating torn WAL tail in {os.path.basename(path)}.")
+                f.truncate(good_offset)
+        return replayed
+
+    # --- Logging and group commit ---
+
+    def _open_wal(self):
+        path = self._wal_path(self.lsn)
+        self.wal = open(path, 'ab')
+        if self.wal.tell() == 0:
+            self.wal.write(WAL_HEADER.pack(WAL_MAGIC, self.lsn))
+        self.wal_records = 0
+
+    def _log(self, user_id, name):
+        # Called with self.lock held, before the in-memory change is applied
+        body = RECORD_ID.pack(int(user_id)) + name.encode('utf-8')
+        self.wal.write(RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body)
+        self.lsn += 1
+        self.wal_records += 1
+
+    def _after_write(self):
+        # Compact only after the change is in self.data, so the snapshot includes it
+        if self.wal_records >= self.snapshot_every and not self.compacting:
+            self._start_compaction()
+
+    def commit(self):
+        """
+        Blocks until every record logged so far is on disk. Concurrent callers
+        share a single fsync: the first becomes the leader, the rest wait for it.
+        """
+        with self.lock:
+            target = self.lsn
+        with self.sync_cond:
+            while self.synced_lsn < target:
+                if self.syncing:
+                    self.sync_cond.wait()
+                    continue
+                self.syncing = True
+                self.sync_cond.release()
+                try:
+                    with self.lock:
+                        self.wal.flush()
+                        flushed = self.lsn
+                        # dup() keeps the fd valid even if compaction swaps the WAL meanwhile
+                        fd = os.dup(self.wal.fileno())
+                    try:
+                        if self.fsync:
+                            os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                finally:
+                    self.sync_cond.acquire()
+                    self.syncing = False
+                self.synced_lsn = max(self.synced_lsn, flushed)
+                self.sync_cond.notify_all()
+
+    def replace(self, records):
+        # The WAL has no delete record: persist the new table as a snapshot instead
+        with self.lock:
+            super().replace(records)
+            while self.compacting:
+                time.sleep(0.01) # A background snapshot of the old table must not land after ours
+            self.wal.close()
+            self._write_snapshot(dict(self.data), self.lsn, self.next_id)
+            for path in self._wal_files():
+                os.remove(path) # Every record in them is covered by the snapshot
+            with self.sync_cond:
+                self.synced_lsn = max(self.synced_lsn, self.lsn)
+            self._open_wal()
+
+    # --- Snapshots / compaction ---
+
+    def _start_compaction(self):
+        """Rotates the WAL and writes a snapshot of the current table in the background."""
+        self.compacting = True
+        # Everything in the old WAL must be durable before we stop appending to it
+        self.wal.flush()
+        if self.fsync:
+            os.fsync(self.wal.fileno())
+        self.wal.close()
+        with self.sync_cond:
+            self.synced_lsn = max(self.synced_lsn, self.lsn)
+        snapshot, lsn, next_id = dict(self.data), self.lsn, self.next_id
+        self._open_wal()
+        threading.Thread(target=self._compact, args=(snapshot, lsn, next_id), daemon=True).start()
+
+    def _compact(self, snapshot, lsn, next_id):
+        try:
+            self._write_snapshot(snapshot, lsn, next_id)
+            # WAL files that start before the snapshot LSN are fully covered by it
+            for path in self._wal_files():
+                with open(path, 'rb') as f:
+                    _, base_lsn = WAL_HEADER.unpack(f.read(WAL_HEADER.size))
+                if base_lsn < lsn:
+                    os.remove(path)
+            print(f"[STORAGE] Snapshot written at LSN {lsn} ({len(snapshot)} users).")
+        except Exception as e:
+            print(f"[STORAGE] Compaction failed: {e}")
+        finally:
+            self.compacting = False
+
+    def _write_snapshot(self, snapshot, lsn, next_id):
+        tmp_path = self._snapshot_path() + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(SNAP_HEADER.pack(SNAP_MAGIC, lsn, next_id, len(snapshot)))
+            for uid, name in snapshot.items():
+                encoded = name.encode('utf-8')
+                f.write(SNAP_ENTRY.pack(int(uid), len(encoded)) + encoded)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        # Atomic swap: a crash leaves either the old or the new snapshot, never half of one
+        os.replace(tmp_path, self._snapshot_path())
+        if self.fsync:
+            dir_fd = os.open(self.data_dir, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def close(self):
+        self.commit()
+        with self.lock:
+            self.wal.close()
@@ -1,19 +1,55 @@
 import socket
 import threading
-import sys
+import argparse
+import queue
+import time
 
 HOST = '127.0.0.1'
 PORT = 4000
 
+BUSY_RESPONSE = b"503 BUSY: Server overloaded, try again later."
+
+
+class ServerStats:
+    """Thread-safe admission-control counters shared by the acceptor and workers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.served = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait):
+        with self.lock:
+            self.served += 1
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+
+    def snapshot(self, backlog):
+        with self.lock:
+            avg_wait = self.total_wait / self.served if self.served else 0.0
+            return {
+                'queue_depth': backlog.qsize(),
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'served': self.served,
+                'avg_wait_ms': round(avg_wait * 1000, 3),
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
 def handle_client(conn, addr):
-    """Function executed by the dedicated thread."""
+    """Serves one connection on a pool thread."""
     print(f"[Thread {threading.current_thread().name}] Connected by {addr}")
     with conn:
         while True:
             try:
                 data = conn.recv(1024)
                 if not data: break
-                
+
                 message = data.decode('utf-8')
                 response = f"Thread {threading.current_thread().name} processed: {message.upper()}"
                 conn.sendall(response.encode('utf-8'))
@@ -21,24 +57,68 @@ def handle_client(conn, addr):
                 break
     print(f"[Thread {threading.current_thread().name}] Disconnected.")
 
-def start_server():
+def worker_loop(backlog, stats):
+    """Pool thread: pull queued connections forever and record how long they waited."""
+    while True:
+        conn, addr, enqueued_at = backlog.get()
+        stats.record_wait(time.monotonic() - enqueued_at)
+        handle_client(conn, addr)
+
+def reject(conn):
+    """Fail fast so an overloaded server answers in microseconds instead of timing out."""
+    try:
+        conn.sendall(BUSY_RESPONSE)
+    except OSError:
+        pass
+    conn.close()
+
+def stats_loop(backlog, stats, interval):
+    while True:
+        time.sleep(interval)
+        print(f"[STATS] {stats.snapshot(backlog)}")
+
+def start_server(num_workers, queue_size, policy, admit_timeout, stats_interval):
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server_socket.bind((HOST, PORT))
     server_socket.listen(10)
-    print(f"Listening on {HOST}:{PORT}. Server is ready.")
+    print(f"Listening on {HOST}:{PORT}. Server is ready "
+          f"({num_workers} workers, queue {queue_size}, policy '{policy}').")
+
+    # Bounded hand-off queue between the acceptor and the fixed pool
+    backlog = queue.Queue(maxsize=queue_size)
+    stats = ServerStats()
+    workers = [threading.Thread(target=worker_loop, args=(backlog, stats), name=f"Worker-{i}", daemon=True)
+               for i in range(num_workers)]
+    for t in workers:
+        t.start()
+    if stats_interval > 0:
+        threading.Thread(target=stats_loop, args=(backlog, stats, stats_interval), daemon=True).start()
 
     while True:
         try:
             # CRITICAL STEP 1: Main thread blocks, waiting for connection.
             conn, addr = server_socket.accept()
-            
-            # CRITICAL STEP 2: Hand off connection to a new thread.
-            client_thread = threading.Thread(target=handle_client, args=(conn, addr))
-            client_thread.start()
-            print(f"[MAIN] Dispatched connection to {client_thread.name}. Awaiting next client...")
+
+            # CRITICAL STEP 2: Admission control instead of an unbounded new thread.
+            try:
+                if policy == 'reject':
+                    backlog.put_nowait((conn, addr, time.monotonic()))
+                else:
+                    # Backpressure: stop accepting while the queue is full,
+                    # so excess clients wait in the kernel's listen backlog.
+                    backlog.put((conn, addr, time.monotonic()), timeout=admit_timeout)
+            except queue.Full:
+                with stats.lock:
+                    stats.rejected += 1
+                reject(conn)
+                continue
+
+            with stats.lock:
+                stats.accepted += 1
         except KeyboardInterrupt:
             print("\nServer Shutting Down.")
+            print(f"[STATS] {stats.snapshot(backlog)}")
             break
         except Exception as e:
             print(f"Error: {e}")
@@ -46,4 +126,19 @@ def start_server():
     server_socket.close()
 
 if __name__ == '__main__':
-    start_server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Thread-pool echo server with admission control.")
+    parser.add_argument("--workers", type=int, default=16, help="Fixed number of pool threads.")
+    parser.add_argument("--queue-size", type=int, default=64, help="Max connections waiting for a worker (at least 1).")
+    parser.add_argument("--policy", choices=["reject", "backpressure"], default="reject",
+                        help="'reject' answers 503 when the queue is full; 'backpressure' pauses accept().")
+    parser.add_argument("--admit-timeout", type=float, default=None,
+                        help="With backpressure, reject after waiting this many seconds (default: wait forever).")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="Seconds between stats lines (0 = off).")
+    args = parser.parse_args()
+    # queue.Queue treats maxsize <= 0 as unbounded, which would disable admission control
+    if args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    start_server(args.workers, args.queue_size, args.policy, args.admit_timeout, args.stats_interval)
@@ -1,8 +1,21 @@
-from flask import Flask, jsonify
-import multiprocessing as mp
+from flask import Flask, Response, jsonify, request
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import itertools
+import threading
+import collections
+import zlib
 import time
 import os
-import sys
+
+import prime_engine
+import prime_cache
+import prime_bitmap
+import jobs
+
+try:
+    import distributed_primes # Needs pika and the EXP5 RabbitMQ broker
+except ImportError:
+    distributed_primes = None
 
 app = Flask(__name__)
 
@@ -16,65 +29,272 @@ def is_prime(n):
         i += 1
     return True
 
-def count_primes_worker(start, end, result_queue):
-    """Worker function executed by a separate process."""
-    count = 0
-    # Simulate slightly longer run to show core utilization
-    search_limit = end 
-    for n in range(start, search_limit):
-        if is_prime(n):
-            count += 1
-    # IPC: Send the partial result back to the main process
-    result_queue.put(count)
-    # The child process should exit cleanly
-    sys.exit(0) 
-
-def run_heavy_task(N_max=1000000, num_processes=4):
-    """Divides the heavy task across multiple independent processes."""
-    
-    result_queue = mp.Queue() # IPC queue for results
-    procs = []
-    chunk_size = N_max // num_processes
-    
-    for i in range(num_processes):
-        start = i * chunk_size
-        end = N_max if i == num_processes - 1 else (i + 1) * chunk_size
-        
-        # Create a new, independent process (bypassing the GIL)
-        p = mp.Process(target=count_primes_worker, args=(start, end, result_queue))
-        procs.append(p)
-        p.start()
-        
+def count_primes_chunk(start, end, engine):
+    """One work unit, executed in a pool process; returns (count, started_at, finished_at)."""
+    started_at = time.time()
+    if engine in prime_engine.KERNELS:
+        count = prime_engine.KERNELS[engine](start, end)
+    else:
+        # Baseline: trial division of every integer in the chunk
+        count = 0
+        for n in range(start, end):
+            if is_prime(n):
+                count += 1
+    return count, started_at, time.time()
+
+# --- Persistent Worker Pool ---
+# Created once when the app starts; the pool processes outlive requests, so a
+# request only pays for queueing its work units, not for forking processes.
+POOL_SIZE = int(os.environ.get('PRIME_POOL_SIZE', os.cpu_count() or 4))
+POOL = ProcessPoolExecutor(max_workers=POOL_SIZE)
+MIN_TRIAL_CHUNK = 2000
+
+def guided_chunks(start, end, num_workers, min_chunk):
+    """
+    Guided scheduling: each unit is a fixed share of the work still left, so units
+    shrink towards the end and idle workers keep pulling small ones until the
+    range is done. Balances the load even when high numbers cost more.
+    """
+    pos = start
+    while pos < end:
+        size = max(min_chunk, (end - pos) // (2 * num_workers))
+        yield pos, min(pos + size, end)
+        pos += size
+
+def iter_units(units, engine, max_in_flight, job=None):
+    """
+    Submits the units to the shared pool, keeping at most 'max_in_flight' of them
+    queued or running, and yields (unit index, future, submitted_at) as each one completes.
+    '?workers=' is that cap, so one request cannot take the whole pool. With a
+    job, it is checked between waits; on exit, unstarted units are cancelled.
+    """
+    units = enumerate(units)
+    pending = {} # future -> (unit index, submitted_at)
+    try:
+        while True:
+            for i, (start, end) in itertools.islice(units, max_in_flight - len(pending)):
+                pending[POOL.submit(count_primes_chunk, start, end, engine)] = i, time.time()
+            if not pending:
+                return
+            if job is not None:
+                job.check()
+            done, _ = wait(pending, timeout=jobs.POLL_INTERVAL if job else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, submitted_at = pending.pop(future)
+                yield i, future, submitted_at
+    finally:
+        for future in pending:
+            future.cancel()
+
+def count_units(units, engine, max_in_flight):
+    """Counts each (start, end) unit on the shared pool; returns (counts in unit order, timing breakdown)."""
+    counts = [0] * len(units)
+    if not units:
+        return counts, {"units": 0} # Empty range (start == N_max)
+    submitted_at = time.time()
+
+    waits, compute, first_start, last_finish = [], 0.0, None, submitted_at
+    for i, future, unit_submitted_at in iter_units(units, engine, max_in_flight):
+        counts[i], started_at, finished_at = future.result()
+        waits.append(started_at - unit_submitted_at)
+        compute += finished_at - started_at
+        first_start = started_at if first_start is None else min(first_start, started_at)
+        last_finish = max(last_finish, finished_at)
+    merged_at = time.time()
+
+    timing = {
+        "units": len(units),
+        "queue_wait_avg_sec": round(sum(waits) / len(waits), 4),
+        "queue_wait_max_sec": round(max(waits), 4),
+        "compute_wall_sec": round(last_finish - first_start, 4),
+        "compute_cpu_sec": round(compute, 4), # Summed over all units
+        "merge_sec": round(max(0.0, merged_at - last_finish), 4),
+    }
+    return counts, timing
+
+def run_heavy_task(N_max=1000000, num_processes=4, engine='sieve', start=0):
+    """Counts the primes in [start, N_max) on the shared pool; returns (count, timing breakdown)."""
+    min_chunk = MIN_TRIAL_CHUNK if engine == 'trial' else 2 * prime_engine.SEGMENT_ODDS
+    counts, timing = count_units(list(guided_chunks(start, N_max, num_processes, min_chunk)), engine, num_processes)
+    return sum(counts), timing
+
+# --- Prime-Count Cache ---
+# Sieve results are memoized as prefix counts at fixed checkpoints, so a
+# repeated or overlapping query only sieves the part not covered yet.
+CACHE = prime_cache.PrimeCountCache(
+    max_checkpoints=int(os.environ.get('PRIME_CACHE_CHECKPOINTS', prime_cache.MAX_CHECKPOINTS)),
+    path=os.environ.get('PRIME_CACHE_FILE')) # Optional on-disk copy that survives restarts
+
+def parse_job_params(args):
+    """?start=, ?n=, ?workers=, ?engine=, ?mode= (and ?shard_size=) shared by /cpu-task and /jobs."""
+    N, workers, engine = prime_engine.parse_task_args(args, 1000000, 4)
+    start = args.get('start', 0, type=int)
+    if not 0 <= start <= N:
+        raise ValueError("start must be between 0 and n")
+    params = {"start": start, "n": N, "workers": workers, "engine": engine, "mode": args.get('mode', 'local')}
+    if params['mode'] == 'distributed':
+        if distributed_primes is None:
+            raise ValueError("mode=distributed needs the pika package")
+        if engine not in prime_engine.KERNELS:
+            raise ValueError(f"mode=distributed supports engine {' or '.join(prime_engine.KERNELS)}")
+        params['shard_size'] = args.get('shard_size', distributed_primes.SHARD_SIZE, type=int)
+        if params['shard_size'] < 1:
+            raise ValueError("shard_size must be positive")
+    elif params['mode'] != 'local':
+        raise ValueError("mode must be local or distributed")
+    return params
+
+# --- Job API ---
+# POST /jobs?n=... returns a job ID at once; the count runs on the same pool
+# in the background, so large-N requests no longer hold an HTTP worker.
+
+def run_prime_job(job):
+    params = job.params
+    if params['mode'] == 'distributed':
+        def on_progress(done, total):
+            job.report(done, total)
+            job.check()
+        count, stats = distributed_primes.count_primes_distributed(
+            params['start'], params['n'], params['shard_size'], params['engine'], on_progress=on_progress)
+        return {"primes_found": count, "distributed": stats}
+    min_chunk = MIN_TRIAL_CHUNK if params['engine'] == 'trial' else 2 * prime_engine.SEGMENT_ODDS
+    units = list(guided_chunks(params['start'], params['n'], params['workers'], min_chunk))
     total_count = 0
-    
-    # Synchronization: Wait for all processes to finish
-    for p in procs:
-        p.join()
-        
-    # Communication: Collect results
-    while not result_queue.empty():
-        total_count += result_queue.get()
-        
-    return total_count
+    job.report(0, len(units))
+    for done, (_, future, _) in enumerate(iter_units(units, params['engine'], params['workers'], job), 1):
+        total_count += future.result()[0]
+        job.report(done, len(units))
+    return {"primes_found": total_count}
+
+JOBS = jobs.JobManager(run_prime_job, max_running=int(os.environ.get('PRIME_MAX_JOBS', 2)))
+jobs.register_job_routes(app, JOBS, parse_job_params)
 
 @app.route("/cpu-task")
 def cpu_endpoint():
-    N = 1000000 
+    try:
+        params = parse_job_params(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    start, N, workers, engine = params['start'], params['n'], params['workers'], params['engine']
+    distributed = params['mode'] == 'distributed'
+    # ?cache=0 forces a full recount; the trial-division baseline never uses the cache
+    use_cache = engine == 'sieve' and not distributed and request.args.get('cache', '1') != '0'
     t0 = time.time()
     
-    # Run the heavy work in parallel processes (4 processes = 4 CPU cores working simultaneously)
-    prime_count = run_heavy_task(N_max=N, num_processes=4)
+    if distributed:
+        # Shards go to the RabbitMQ work queue; workers on any host count them
+        try:
+            prime_count, timing = distributed_primes.count_primes_distributed(
+                start, N, params['shard_size'], engine, timeout=request.args.get('timeout', None, type=float))
+        except (ValueError, TimeoutError, distributed_primes.ShardFailed) as e:
+            return jsonify({"status": "error", "error": str(e)}), 400 if isinstance(e, ValueError) else 504
+        except distributed_primes.pika.exceptions.AMQPError as e:
+            return jsonify({"status": "error", "error": f"RabbitMQ unavailable: {e!r}"}), 503
+    elif use_cache:
+        # Uncached gaps are work units on the pool, under the same ?workers= cap
+        timing = {"units": 0}
+        def count_gaps(ranges):
+            counts, gap_timing = count_units(ranges, 'sieve', workers)
+            timing.update(gap_timing)
+            return counts
+        prime_count, computed = CACHE.count_range(start, N, count_gaps)
+        timing.update(computed_numbers=computed, cache=CACHE.stats())
+    else:
+        # Run the heavy work on the pool processes (one per CPU core, working simultaneously)
+        prime_count, timing = run_heavy_task(N_max=N, num_processes=workers, engine=engine, start=start)
     
     t1 = time.time()
     
     return jsonify({
         "status": "ok",
-        "method": "Multiprocessing (CPU-Bound)",
+        "method": "RabbitMQ work queue (distributed)" if distributed else "Multiprocessing pool (CPU-Bound)",
+        "engine": engine,
+        "start": start,
+        "n": N,
+        "workers": workers,
+        "pool_size": POOL_SIZE,
+        "cached": use_cache,
         "execution_time_sec": round(t1 - t0, 4),
+        "timing": timing,
         "primes_found": prime_count,
         "process_id": os.getpid()
     })
 
+# Each /primes stream holds a shared-memory bitmap until the client has read it
+# all, so only a few may run at once; the rest get 429
+PRIMES_STREAMS = threading.BoundedSemaphore(int(os.environ.get('PRIME_MAX_STREAMS', 2)))
+
+@app.route("/primes")
+def primes_endpoint():
+    """
+    Streams the primes in [start, n) as text lines (format=list) or as the
+    zlib-compressed odd-only bitmap (format=bitmap, layout in prime_bitmap.py).
+    Pool workers sieve into one shared-memory bitmap, at most '?workers=' units
+    at a time, and each unit is streamed as soon as it and the units before it are done.
+    """
+    start = request.args.get('start', 0, type=int)
+    end = request.args.get('n', 1000, type=int)
+    workers = request.args.get('workers', 4, type=int)
+    fmt = request.args.get('format', 'list')
+    if (not 0 <= start <= end or end - start > prime_bitmap.MAX_SPAN or fmt not in ('list', 'bitmap')
+            or not 0 < workers <= prime_engine.MAX_WORKERS):
+        return jsonify({"status": "error",
+                        "error": f"Expected 0 <= start <= n, n - start <= {prime_bitmap.MAX_SPAN}, "
+                                 f"1 <= workers <= {prime_engine.MAX_WORKERS}, format list or bitmap"}), 400
+    if not PRIMES_STREAMS.acquire(blocking=False):
+        return jsonify({"status": "error", "error": "Too many /primes streams in progress; retry later"}), 429
+
+    try:
+        bitmap = prime_bitmap.PrimeBitmap(start, end)
+    except Exception:
+        PRIMES_STREAMS.release()
+        raise
+    queued = iter(bitmap.units())
+    pending = collections.deque() # (unit, future) in unit order, at most 'workers' of them
+
+    def submit_next():
+        for unit in itertools.islice(queued, workers - len(pending)):
+            pending.append((unit, POOL.submit(prime_bitmap.fill_unit, *bitmap.unit_args(unit))))
+
+    def generate():
+        compressor = zlib.compressobj()
+        if fmt == 'list' and bitmap.has_two:
+            yield "2\n"
+        submit_next()
+        while pending:
+            unit, future = pending.popleft()
+            future.result()
+            submit_next()
+            if fmt == 'list':
+                for primes in bitmap.iter_primes(*unit):
+                    if len(primes):
+                        yield "\n".join(map(str, primes.tolist())) + "\n"
+            else:
+                yield from bitmap.iter_compressed(*unit, compressor)
+        if fmt == 'bitmap':
+            yield compressor.flush()
+
+    def cleanup():
+        # Workers may still be writing if the client went away early
+        futures = [future for _, future in pending]
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        bitmap.close()
+        PRIMES_STREAMS.release()
+
+    if fmt == 'list':
+        response = Response(generate(), mimetype='text/plain')
+    else:
+        response = Response(generate(), mimetype='application/octet-stream', headers={
+            "X-Bitmap-Encoding": "zlib",
+            "X-Bitmap-First": str(bitmap.first), # Bit i <-> first + 2*i, little-endian bit order
+            "X-Bitmap-Bits": str(bitmap.bits),
+            "X-Includes-Two": str(bitmap.has_two).lower(),
+        })
+    response.call_on_close(cleanup)
+    return response
+
 @app.route("/")
 def index():
     return "CPU-Bound Multiprocessing API"
\ No newline at end of file
@@ -1,8 +1,12 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 import threading
 import time
 import os
 
+import prime_engine
+import jobs
+from concurrent.futures import ThreadPoolExecutor
+
 app = Flask(__name__)
 
 # NOTE: This function is copied from app_cpu_bound.py
@@ -18,18 +22,25 @@ def is_prime(n):
 # --- Multithreading Implementation ---
 # NOTE: This setup is deliberately inefficient for CPU work due to the GIL.
 
-def count_primes_worker_thread(start, end, result_list, index):
-    """Worker function executed by a separate thread."""
+def count_primes_chunk(start, end, engine='sieve'):
+    if engine in prime_engine.KERNELS:
+        # NumPy kernels release the GIL inside each array operation
+        return prime_engine.KERNELS[engine](start, end)
     count = 0
     # This loop holds the GIL almost constantly, preventing other threads from running.
     for n in range(start, end):
         if is_prime(n):
             count += 1
+    return count
+
+def count_primes_worker_thread(start, end, result_list, index, engine='sieve'):
+    """Worker function executed by a separate thread."""
+    count = count_primes_chunk(start, end, engine)
     # Simple IPC: Use a list (must be carefully protected in a real app)
     # Since this is a simple append, we assume it's atomic enough for this demo.
     result_list[index] = count 
 
-def run_heavy_task_threaded(N_max=1000000, num_threads=4):
+def run_heavy_task_threaded(N_max=1000000, num_threads=4, engine='sieve'):
     """Attempts to run heavy task in parallel using threads."""
     
     threads = []
@@ -43,7 +54,7 @@ def run_heavy_task_threaded(N_max=1000000, num_threads=4):
         end = N_max if i == num_threads - 1 else (i + 1) * chunk_size
         
         # Create a new thread (GIL is NOT released during computation)
-        t = threading.Thread(target=count_primes_worker_thread, args=(start, end, result_list, i))
+        t = threading.Thread(target=count_primes_worker_thread, args=(start, end, result_list, i, engine))
         threads.append(t)
         t.start()
         
@@ -54,24 +65,83 @@ def run_heavy_task_threaded(N_max=1000000, num_threads=4):
     total_count = sum(result_list)
     return total_count
 
+# --- Job API ---
+# Jobs fan their chunks out to a fixed set of compute threads, separate from
+# the threads serving HTTP, so the API stays responsive while they are busy.
+COMPUTE = ThreadPoolExecutor(max_workers=int(os.environ.get('COMPUTE_THREADS', 4)), thread_name_prefix="compute")
+UNITS_PER_WORKER = 4 # Finer units give finer progress reports and cancellation
+
+def parse_job_params(args):
+    N, workers, engine = prime_engine.parse_task_args(args, 500000, 4)
+    return {"n": N, "workers": workers, "engine": engine}
+
+def run_prime_job(job):
+    params = job.params
+    num_units = params['workers'] * UNITS_PER_WORKER
+    bounds = [params['n'] * i // num_units for i in range(num_units + 1)]
+    futures = [COMPUTE.submit(count_primes_chunk, bounds[i], bounds[i + 1], params['engine'])
+               for i in range(num_units)]
+    total_count = 0
+    job.report(0, num_units)
+    for done, future in enumerate(jobs.iter_completed(job, futures), 1):
+        total_count += future.result()
+        job.report(done, num_units)
+    return {"primes_found": total_count}
+
+JOBS = jobs.JobManager(run_prime_job, max_running=2)
+jobs.register_job_routes(app, JOBS, parse_job_params)
+
+BASELINES = ('serial', 'python', 'none')
+GIL_EFFECT = {
+    'trial': "True Parallelism Prevented",
+    'vector': "GIL released inside NumPy array operations",
+    'sieve': "GIL released inside NumPy array operations",
+}
+
 @app.route("/cpu-thread-task")
 def cpu_thread_endpoint():
-    N = 500000 # Use the smaller N for faster comparison
+    try:
+        # Use the smaller N for faster comparison
+        N, workers, engine = prime_engine.parse_task_args(request.args, 500000, 4)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    # ?baseline=serial reruns the same engine on one thread and ?baseline=python reruns
+    # the pure-Python is_prime loop on one thread. Off by default (none): the rerun
+    # doubles the work, which would skew load tests.
+    baseline = request.args.get('baseline', 'none')
+    if baseline not in BASELINES:
+        return jsonify({"status": "error", "error": f"baseline must be one of {', '.join(BASELINES)}"}), 400
     t0 = time.time()
     
-    # This task will run sequentially due to the GIL, even though 4 threads were created.
-    prime_count = run_heavy_task_threaded(N_max=N, num_threads=4)
+    # With engine=trial this runs sequentially due to the GIL, even though 4 threads were created.
+    prime_count = run_heavy_task_threaded(N_max=N, num_threads=workers, engine=engine)
     
     t1 = time.time()
     
-    return jsonify({
+    result = {
         "status": "ok",
         "method": "Multithreading (CPU-Bound)",
-        "gil_effect": "True Parallelism Prevented",
+        "gil_effect": GIL_EFFECT[engine],
+        "engine": engine,
+        "n": N,
+        "workers": workers,
         "execution_time_sec": round(t1 - t0, 4),
         "primes_found": prime_count,
         "process_id": os.getpid()
-    })
+    }
+
+    if baseline != 'none':
+        b0 = time.time()
+        baseline_count = run_heavy_task_threaded(N_max=N, num_threads=1,
+                                                 engine='trial' if baseline == 'python' else engine)
+        baseline_time = time.time() - b0
+        result.update({
+            "baseline": f"1 thread, {'trial' if baseline == 'python' else engine}",
+            "baseline_time_sec": round(baseline_time, 4),
+            "speedup": round(baseline_time / max(t1 - t0, 1e-9), 2),
+            "matches_baseline": baseline_count == prime_count,
+        })
+    return jsonify(result)
 
 @app.route("/")
 def index():
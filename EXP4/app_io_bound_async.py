@@ -0,0 +1,179 @@
+import asyncio
+import argparse
+import json
+import os
+import resource
+import time
+from urllib.parse import urlsplit, parse_qs
+
+HOST = '127.0.0.1'
+PORT = 8005
+
+DEFAULT_DELAY = 0.5 # Same 500ms delay as the threading and process apps
+DEFAULT_FANOUT = 4 # Concurrent waits per request, like the 4 processes of run_io_parallel
+MAX_DELAY = 60.0
+MAX_FANOUT = 1000
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+# --- Asyncio I/O-Bound Server ---
+# Every request and each of its K simulated I/O waits is a coroutine on one
+# event loop: a waiting request costs a few KB of memory instead of a thread
+# or a process, so one process holds tens of thousands of requests in flight.
+# Speaks just enough HTTP/1.1 (GET, keep-alive) for ab and curl.
+
+STATS = {'in_flight': 0, 'peak_in_flight': 0, 'served': 0, 'connections': 0}
+
+
+async def simulate_io_task(delay_seconds):
+    """Simulates a network or disk I/O operation without blocking the event loop."""
+    await asyncio.sleep(delay_seconds)
+    return "IO Task completed"
+
+
+def float_param(params, name, default, low, high):
+    value = float(params.get(name, [default])[0])
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+
+async def io_async_endpoint(params):
+    try:
+        delay = float_param(params, 'delay', DEFAULT_DELAY, 0.0, MAX_DELAY)
+        fanout = int(float_param(params, 'fanout', DEFAULT_FANOUT, 1, MAX_FANOUT))
+    except ValueError as e:
+        return 400, {"status": "error", "error": str(e)}
+
+    STATS['in_flight'] += 1
+    STATS['peak_in_flight'] = max(STATS['peak_in_flight'], STATS['in_flight'])
+    in_flight = STATS['in_flight']
+    t0 = time.time()
+    try:
+        # K concurrent waits: the request takes ~delay, not K * delay
+        results = await asyncio.gather(*(simulate_io_task(delay) for _ in range(fanout)))
+    finally:
+        STATS['in_flight'] -= 1
+        STATS['served'] += 1
+    t1 = time.time()
+
+    return 200, {
+        "status": "ok",
+        "method": "Asyncio (I/O-Bound)",
+        "fanout": fanout,
+        "execution_time_sec": round(t1 - t0, 4),
+        "in_flight_at_start": in_flight,
+        "process_id": os.getpid(),
+        "result": results[0]
+    }
+
+
+async def stats_endpoint(params):
+    return 200, dict(STATS)
+
+
+async def index(params):
+    return 200, "I/O-Bound Asyncio API"
+
+
+ROUTES = {
+    '/io-async-task': io_async_endpoint,
+    '/stats': stats_endpoint,
+    '/': index,
+}
+
+
+# --- Minimal HTTP/1.1 ---
+
+async def read_request(reader):
+    """Returns (method, target, version, headers), or None when the client closed."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, version = request_line.decode('latin-1').split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length'])) # Bodies are ignored
+    return method, target, version, headers
+
+
+def format_response(status, body, keep_alive):
+    if isinstance(body, str):
+        payload, content_type = body.encode('utf-8'), 'text/plain'
+    else:
+        payload, content_type = json.dumps(body).encode('utf-8'), 'application/json'
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + payload
+
+
+async def handle_client(reader, writer):
+    STATS['connections'] += 1
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except ValueError:
+                writer.write(format_response(400, {"status": "error", "error": "Malformed request"}, False))
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+            url = urlsplit(target)
+            handler = ROUTES.get(url.path)
+            if handler is None:
+                status, body = 404, {"status": "error", "error": f"No route {url.path}"}
+            elif method != 'GET':
+                status, body = 405, {"status": "error", "error": "Only GET is supported"}
+            else:
+                status, body = await handler(parse_qs(url.query))
+
+            writer.write(format_response(status, body, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        STATS['connections'] -= 1
+        writer.close()
+
+
+def raise_open_file_limit():
+    """Each in-flight request holds a socket; allow as many as the hard limit permits."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+async def main(host, port, backlog):
+    server = await asyncio.start_server(handle_client, host, port, backlog=backlog)
+    print(f"Asyncio I/O server listening on {host}:{port} (pid {os.getpid()}, "
+          f"open file limit {raise_open_file_limit()})")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Asyncio variant of the EXP4 I/O-bound apps.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--backlog", type=int, default=16384, help="Listen backlog for connection bursts.")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.host, args.port, args.backlog))
+    except KeyboardInterrupt:
+        print("\nServer shutting down.")
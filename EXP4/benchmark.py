@@ -0,0 +1,580 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import math
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlencode
+
+from werkzeug.serving import BaseWSGIServer
+
+HOST = '127.0.0.1'
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# --- App Registry ---
+# Ports and server settings match test.sh. 'threads' is how many requests the
+# app serves at once (gunicorn workers x threads); 'gunicorn' is the test.sh
+# command line, used with --gunicorn. 'pool_env' names the variable that sizes
+# the app's process pool; the scaling suite starts such an app once per
+# worker count with the pool set to that size.
+APPS = {
+    'io-thread': {'module': 'app_io_bound_threading', 'port': 8001, 'kind': 'io', 'path': '/io_task',
+                  'query': {}, 'threads': 4, 'gunicorn': ['-w', '1', '--threads', '4']},
+    'cpu-process': {'module': 'app_cpu_bound_processing', 'port': 8002, 'kind': 'cpu', 'path': '/cpu-task',
+                    'query': {'cache': '0'}, 'threads': 4, 'gunicorn': ['-w', '1', '--threads', '4'],
+                    'pool_env': 'PRIME_POOL_SIZE'},
+    'io-process': {'module': 'app_io_bound_processing', 'port': 8003, 'kind': 'io', 'path': '/io-process-task',
+                   'query': {}, 'threads': 4, 'gunicorn': ['-w', '4']},
+    'cpu-thread': {'module': 'app_cpu_bound_threading', 'port': 8004, 'kind': 'cpu', 'path': '/cpu-thread-task',
+                   'query': {'baseline': 'none'}, 'threads': 4, 'gunicorn': ['-w', '1', '--threads', '4']},
+    'io-async': {'module': 'app_io_bound_async', 'port': 8005, 'kind': 'io', 'path': '/io-async-task',
+                 'query': {}, 'threads': None, 'gunicorn': None},
+}
+SCALING_APPS = ('cpu-process', 'cpu-thread')
+CORES = os.cpu_count() or 1
+
+
+def int_list(text):
+    return [int(float(v)) for v in text.split(',') if v.strip()]
+
+
+def str_list(text):
+    return [v.strip() for v in text.split(',') if v.strip()]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+# --- CPU Accounting ---
+# CPU time of the server process and every live descendant (gunicorn workers,
+# pool processes), plus children that already exited and were reaped (the
+# per-request processes of io-process), read from /proc. Linux only; elsewhere
+# CPU columns are left empty.
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def process_cpu_seconds(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rpartition(')')[2].split()
+    except OSError:
+        return 0.0
+    # Fields after the command name start at 'state': utime, stime, cutime, cstime are 11..14
+    return sum(int(v) for v in fields[11:15]) / CLOCK_TICKS
+
+
+def child_pids(pid):
+    children = []
+    try:
+        tasks = os.listdir(f'/proc/{pid}/task')
+    except OSError:
+        return children
+    for task in tasks:
+        try:
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return children
+
+
+def tree_cpu_seconds(pid):
+    """Total user + system CPU seconds of pid and its descendants, or None without /proc."""
+    if not os.path.exists(f'/proc/{pid}/stat'):
+        return None
+    total, stack = 0.0, [pid]
+    while stack:
+        current = stack.pop()
+        total += process_cpu_seconds(current)
+        stack.extend(child_pids(current))
+    return total
+
+
+# --- Servers ---
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    Serves a WSGI app with a fixed number of handler threads, like gunicorn's
+    worker x thread slots: at most 'threads' requests run at once and the rest
+    wait in the listen backlog.
+    """
+    request_queue_size = 1024 # Bursts of concurrent clients wait here, as in gunicorn's backlog
+
+    def __init__(self, host, port, app, threads):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+        super().__init__(host, port, app)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def stop(self):
+        self.shutdown()
+        self.executor.shutdown(wait=True)
+        self.server_close()
+
+
+class InProcessApp:
+    """
+    Imports the app and serves it from a thread of this process. Quick, but the
+    load generator shares the process (and the GIL) with the app, so CPU numbers
+    include the client and thread-based apps look slower than they are.
+    """
+
+    def __init__(self, name, port, pool_size=None):
+        self.name = name
+        self.port = port
+        self.pool_size = pool_size
+        self.pid = os.getpid()
+        self.thread = None
+
+    def start(self):
+        spec = APPS[self.name]
+        module = __import__(spec['module'])
+        if spec.get('pool_env'):
+            # What the pool_env variable does for a fresh process
+            pool_size = self.pool_size or int(os.environ.get(spec['pool_env'], CORES))
+            if module.POOL_SIZE != pool_size:
+                module.POOL.shutdown(wait=True)
+                module.POOL = ProcessPoolExecutor(max_workers=pool_size)
+                module.POOL_SIZE = pool_size
+        if spec['threads'] is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self._run_async, args=(module,), daemon=True)
+        else:
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)
+            self.server = PooledWSGIServer(HOST, self.port, module.app, spec['threads'])
+            self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def _run_async(self, module):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(module.main(HOST, self.port, 16384))
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self):
+        if APPS[self.name]['threads'] is None:
+            for task in asyncio.all_tasks(self.loop):
+                self.loop.call_soon_threadsafe(task.cancel)
+        else:
+            self.server.stop()
+        self.thread.join(timeout=10)
+
+
+class LocalApp:
+    """Runs the app as its own local process (the built-in pooled server, or gunicorn as in test.sh)."""
+
+    def __init__(self, name, port, use_gunicorn, env=None):
+        self.name = name
+        self.port = port
+        self.use_gunicorn = use_gunicorn
+        self.env = env
+        self.process = None
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def command(self):
+        spec = APPS[self.name]
+        if spec['threads'] is None:
+            return [sys.executable, f"{spec['module']}.py", '--port', str(self.port)]
+        if self.use_gunicorn and spec['gunicorn']:
+            return ['gunicorn', *spec['gunicorn'], '-b', f'{HOST}:{self.port}', f"{spec['module']}:app"]
+        return [sys.executable, os.path.basename(__file__), '--serve', self.name, '--port', str(self.port)]
+
+    def start(self):
+        env = dict(os.environ, **self.env) if self.env else None
+        self.process = subprocess.Popen(self.command(), cwd=HERE, stdout=subprocess.DEVNULL, env=env)
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class ExternalApp:
+    """An app that is already running (--launch none); only its port is known."""
+
+    def __init__(self, name, port, pid=None):
+        self.name = name
+        self.port = port
+        self.pid = pid
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def serve(name, port):
+    """--serve: runs one app in this process until SIGTERM (used by LocalApp)."""
+    spec = APPS[name]
+    module = __import__(spec['module'])
+    server = PooledWSGIServer(HOST, port, module.app, spec['threads'])
+    logging.getLogger('werkzeug').setLevel(logging.WARNING) # No log line per request
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0)) # Unwinds so pool processes are shut down cleanly
+    print(f"[SERVE] {name} ({spec['module']}) on {HOST}:{port} with {spec['threads']} handler threads")
+    try:
+        server.serve_forever()
+    finally:
+        server.executor.shutdown(wait=False)
+        server.server_close()
+
+
+# --- HTTP Client ---
+# One new connection per request with 'Connection: close', like ab without -k.
+
+async def http_get(port, target, timeout):
+    """Returns (status, body bytes)."""
+    async def exchange():
+        reader, writer = await asyncio.open_connection(HOST, port)
+        try:
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {HOST}:{port}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            data = await reader.read()
+        finally:
+            writer.close()
+        head, _, body = data.partition(b'\r\n\r\n')
+        if not head:
+            raise ConnectionError("empty reply")
+        status = int(head.split(b' ', 2)[1])
+        if b'transfer-encoding: chunked' in head.lower():
+            body = decode_chunked(body)
+        return status, body
+    return await asyncio.wait_for(exchange(), timeout)
+
+
+def decode_chunked(body):
+    out, pos = [], 0
+    while True:
+        line_end = body.index(b'\r\n', pos)
+        size = int(body[pos:line_end].split(b';')[0], 16)
+        if size == 0:
+            return b''.join(out)
+        out.append(body[line_end + 2:line_end + 2 + size])
+        pos = line_end + 4 + size
+
+
+async def wait_until_ready(app, timeout=60.0):
+    """Polls '/' until the app answers; returns the seconds it took (process start + imports)."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if isinstance(app, LocalApp) and app.process.poll() is not None:
+            raise RuntimeError(f"{app.name} exited with code {app.process.returncode}")
+        try:
+            status, _ = await http_get(app.port, '/', 5)
+            if status == 200:
+                return time.perf_counter() - started
+        except (OSError, asyncio.TimeoutError, ValueError):
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{app.name} did not answer on port {app.port} within {timeout}s")
+
+
+# --- Scaling Suite ---
+# One request at a time, so each measurement is the app's own parallelism:
+# wall time, server-reported compute time and CPU seconds for every
+# (engine, n, workers). Speedup and efficiency are relative to the smallest
+# worker count measured for the same engine and n (workers=1 gives the
+# classic curves).
+
+async def run_scaling(app, args, worker_counts):
+    spec = APPS[app.name]
+    rows = []
+    for engine in args.engine:
+        for n in args.n:
+            for workers in worker_counts:
+                query = dict(spec['query'], n=n, workers=workers, engine=engine)
+                target = f"{spec['path']}?{urlencode(query)}"
+                walls, server_times, counts, failures, pool_size = [], [], set(), 0, None
+                cpu_before = tree_cpu_seconds(app.pid) if app.pid else None
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    try:
+                        status, body = await http_get(app.port, target, args.timeout)
+                    except (OSError, asyncio.TimeoutError, ValueError) as e:
+                        print(f"[{app.name}] {target} failed: {e!r}")
+                        failures += 1
+                        continue
+                    wall = time.perf_counter() - started
+                    if status != 200:
+                        print(f"[{app.name}] {target} -> {status}: {body[:200]!r}")
+                        failures += 1
+                        continue
+                    reply = json.loads(body)
+                    walls.append(wall)
+                    server_times.append(reply['execution_time_sec'])
+                    counts.add(reply['primes_found'])
+                    pool_size = reply.get('pool_size') # Reported by the process-pool app
+                cpu_after = tree_cpu_seconds(app.pid) if app.pid else None
+
+                row = {'app': app.name, 'engine': engine, 'n': n, 'workers': workers, 'pool_size': pool_size,
+                       'runs': len(walls), 'failures': failures,
+                       'primes_found': counts.pop() if len(counts) == 1 else None,
+                       'wall_sec': round(statistics.median(walls), 4) if walls else None,
+                       'server_sec': round(statistics.median(server_times), 4) if walls else None,
+                       'cpu_sec': None, 'cpu_cores_busy': None, 'cpu_util_pct': None}
+                if walls and cpu_before is not None and cpu_after is not None:
+                    cpu = (cpu_after - cpu_before) / len(walls)
+                    row['cpu_sec'] = round(cpu, 3)
+                    row['cpu_cores_busy'] = round(cpu / sum(walls) * len(walls), 3)
+                    row['cpu_util_pct'] = round(100 * row['cpu_cores_busy'] / CORES, 1)
+                rows.append(row)
+                print(f"[{app.name}] engine={engine} n={n} workers={workers}: wall={row['wall_sec']}s "
+                      f"cpu={row['cpu_sec']}s util={row['cpu_util_pct']}%")
+    return rows
+
+
+def add_speedup(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['app'], row['engine'], row['n']), []).append(row)
+    for group in groups.values():
+        measured = [r for r in group if r['wall_sec']]
+        if not measured:
+            continue
+        base = min(measured, key=lambda r: r['workers'])
+        for row in group:
+            row['baseline_workers'] = base['workers']
+            if row['wall_sec']:
+                row['speedup'] = round(base['wall_sec'] / row['wall_sec'], 3)
+                row['efficiency'] = round(row['speedup'] * base['workers'] / row['workers'], 3)
+            else:
+                row['speedup'] = row['efficiency'] = None
+
+
+# --- Throughput Suite ---
+# C closed-loop clients each send the next request as soon as the previous
+# reply arrives, for --duration seconds per concurrency level.
+
+async def run_throughput(app, args):
+    spec = APPS[app.name]
+    query = dict(spec['query'])
+    if spec['kind'] == 'cpu':
+        query.update(n=args.throughput_n, workers=args.throughput_workers, engine=args.throughput_engine)
+    target = f"{spec['path']}?{urlencode(query)}" if query else spec['path']
+    rows = []
+    for concurrency in args.concurrency:
+        latencies, errors = [], {}
+        deadline = time.perf_counter() + args.duration
+
+        async def client():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    status, _ = await http_get(app.port, target, args.timeout)
+                except (OSError, asyncio.TimeoutError, ValueError) as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    await asyncio.sleep(0.05) # Do not spin on a refused connection
+                    continue
+                if status == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+
+        cpu_before = tree_cpu_seconds(app.pid) if app.pid else None
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started # Includes the requests still running at the deadline
+        cpu_after = tree_cpu_seconds(app.pid) if app.pid else None
+
+        latencies.sort()
+        row = {'app': app.name, 'kind': spec['kind'], 'target': target, 'concurrency': concurrency,
+               'duration_sec': round(elapsed, 3), 'requests': len(latencies),
+               'errors': sum(errors.values()), 'error_kinds': json.dumps(errors) if errors else '',
+               'throughput_rps': round(len(latencies) / elapsed, 2),
+               'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+               'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+               'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+               'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+               'cpu_sec': None, 'cpu_util_pct': None}
+        if cpu_before is not None and cpu_after is not None:
+            row['cpu_sec'] = round(cpu_after - cpu_before, 3)
+            row['cpu_util_pct'] = round(100 * (cpu_after - cpu_before) / elapsed / CORES, 1)
+        rows.append(row)
+        print(f"[{app.name}] concurrency={concurrency}: {row['throughput_rps']} req/s, "
+              f"p50={row['p50_ms']}ms p99={row['p99_ms']}ms errors={row['errors']} util={row['cpu_util_pct']}%")
+    return rows
+
+
+# --- Reporting ---
+
+SCALING_COLUMNS = ['app', 'engine', 'n', 'workers', 'pool_size', 'wall_sec', 'server_sec', 'cpu_sec',
+                   'cpu_util_pct', 'speedup', 'efficiency']
+THROUGHPUT_COLUMNS = ['app', 'concurrency', 'requests', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms',
+                      'errors', 'cpu_util_pct']
+
+
+def print_table(title, rows, columns):
+    if not rows:
+        return
+    cells = [[('' if row.get(c) is None else str(row.get(c))) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print(f"\n=== {title} ===")
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join('-' * w for w in widths))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def write_csv(path, rows):
+    if not rows:
+        return
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"[INFO] Wrote {path}")
+
+
+def make_app(name, args, pool_size=None):
+    port = args.port_base + (APPS[name]['port'] - 8000) if args.port_base else APPS[name]['port']
+    if args.launch == 'inprocess':
+        return InProcessApp(name, port, pool_size)
+    if args.launch == 'local':
+        return LocalApp(name, port, args.gunicorn, {APPS[name]['pool_env']: str(pool_size)} if pool_size else None)
+    return ExternalApp(name, port, args.pid.get(name))
+
+
+async def start_app(name, args, pool_size=None):
+    """Starts the app and sends its first request; returns (app, start-up info)."""
+    app = make_app(name, args, pool_size)
+    app.start()
+    try:
+        startup = await wait_until_ready(app)
+        # The first task request pays for lazily started pool processes and
+        # cold imports; measured separately so the sweeps run warm.
+        started = time.perf_counter()
+        await http_get(app.port, APPS[name]['path'], args.timeout)
+        first_request = time.perf_counter() - started
+    except BaseException:
+        app.stop()
+        raise
+    info = {'port': app.port, 'pid': app.pid, 'launch': args.launch, 'pool_size': pool_size,
+            'startup_sec': round(startup, 3), 'first_request_sec': round(first_request, 3)}
+    print(f"[{name}] ready on port {app.port} after {startup:.2f}s, first request {first_request:.3f}s"
+          + (f" (pool of {pool_size})" if pool_size else ""))
+    return app, info
+
+
+async def main(args):
+    results = {'scaling': [], 'throughput': [], 'apps': {}}
+    names = args.app or list(APPS)
+    for name in names:
+        suites = [s for s in args.suite if s == 'throughput' or name in SCALING_APPS]
+        if not suites:
+            continue
+        if 'scaling' in suites and APPS[name].get('pool_env') and args.launch != 'none':
+            # ?workers= only caps the units in flight; the pool itself must match the worker count
+            suites.remove('scaling')
+            for workers in args.workers:
+                app, info = await start_app(name, args, pool_size=workers)
+                results['apps'][f"{name} (pool {workers})"] = info
+                try:
+                    results['scaling'].extend(await run_scaling(app, args, [workers]))
+                finally:
+                    app.stop()
+            if not suites:
+                continue
+        elif 'scaling' in suites and APPS[name].get('pool_env'):
+            print(f"[WARN] {name} is already running with its own {APPS[name]['pool_env']}; "
+                  f"the workers sweep only changes how many units it runs at once.")
+        app, info = await start_app(name, args)
+        results['apps'][name] = info
+        try:
+            if 'scaling' in suites:
+                results['scaling'].extend(await run_scaling(app, args, args.workers))
+            if 'throughput' in suites:
+                results['throughput'].extend(await run_throughput(app, args))
+        finally:
+            app.stop()
+    add_speedup(results['scaling'])
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scaling and throughput benchmark for the EXP4 apps.")
+    parser.add_argument("--suite", action="append", choices=['scaling', 'throughput'],
+                        help="Suite to run (repeat for both). Default: both.")
+    parser.add_argument("--app", action="append", choices=list(APPS),
+                        help="App to benchmark (repeat for several). Default: all; scaling only covers the CPU apps.")
+    parser.add_argument("--launch", choices=['local', 'inprocess', 'none'], default='local',
+                        help="local: start each app as its own process; inprocess: serve it from a thread of "
+                             "this process; none: use apps that are already running.")
+    parser.add_argument("--gunicorn", action="store_true", help="With --launch local, start the Flask apps with "
+                        "gunicorn exactly as test.sh does.")
+    parser.add_argument("--port-base", type=int, default=0,
+                        help="Shift every app's port by PORT_BASE - 8000 (default: the test.sh ports).")
+    parser.add_argument("--pid", action="append", default=[], metavar="APP=PID",
+                        help="With --launch none, the server PID to read CPU usage from.")
+    parser.add_argument("--n", type=int_list, default=[200000, 1000000], help="Scaling: comma-separated N values.")
+    parser.add_argument("--workers", type=int_list, default=[1, 2, 4, 8], help="Scaling: comma-separated worker counts.")
+    parser.add_argument("--engine", type=str_list, default=['trial', 'sieve'], help="Scaling: comma-separated engines.")
+    parser.add_argument("--repeat", type=int, default=3, help="Scaling: runs per point (the median is reported).")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 10, 100], help="Throughput: client counts.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Throughput: seconds per concurrency level.")
+    parser.add_argument("--throughput-n", type=int, default=1000000, help="Throughput: N for the CPU apps.")
+    parser.add_argument("--throughput-workers", type=int, default=4, help="Throughput: workers for the CPU apps.")
+    parser.add_argument("--throughput-engine", default='sieve', help="Throughput: engine for the CPU apps.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--output", help="Write PREFIX.json, PREFIX_scaling.csv and PREFIX_throughput.csv.")
+    parser.add_argument("--serve", choices=[n for n, s in APPS.items() if s['threads']], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port or APPS[args.serve]['port'])
+        sys.exit(0)
+
+    args.suite = args.suite or ['scaling', 'throughput']
+    try:
+        args.pid = {name: int(pid) for name, _, pid in (item.partition('=') for item in args.pid)}
+    except ValueError:
+        parser.error("--pid expects APP=PID")
+    if args.launch == 'none' and not args.pid:
+        print("[WARN] No --pid given: CPU columns will be empty.")
+
+    results = asyncio.run(main(args))
+
+    print(f"\nMachine: {CORES} cores. cpu_util_pct is the server's CPU time over wall time, as a share of all cores.")
+    print_table("Scaling (one request at a time)", results['scaling'], SCALING_COLUMNS)
+    print_table("Throughput (closed-loop clients)", results['throughput'], THROUGHPUT_COLUMNS)
+    print_table("Start-up", [dict(app=name, **info) for name, info in results['apps'].items()],
+                ['app', 'launch', 'pool_size', 'startup_sec', 'first_request_sec'])
+
+    if args.output:
+        config = {k: v for k, v in vars(args).items() if k not in ('serve', 'port')}
+        with open(f"{args.output}.json", 'w') as f:
+            json.dump({'timestamp': time.time(), 'cores': CORES, 'config': config, **results}, f, indent=2)
+        print(f"[INFO] Wrote {args.output}.json")
+        write_csv(f"{args.output}_scaling.csv", results['scaling'])
+        write_csv(f"{args.output}_throughput.csv", results['throughput'])
@@ -0,0 +1,289 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import socket
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pika
+
+import prime_engine
+
+RABBITMQ_HOST = os.environ.get('RABBITMQ_HOST', 'localhost')
+RABBITMQ_PORT = 5673 # Same broker as EXP5 (see EXP5/steps.md)
+SHARD_QUEUE = 'prime_shards_queue'
+
+SHARD_SIZE = 10**8 # Numbers per shard (about a second of sieving)
+MAX_SHARDS = 100000
+SHARD_TIMEOUT = 300.0 # Seconds a worker may spend on a shard before it is published again
+MAX_ATTEMPTS = 5 # Publications per shard before the whole count fails
+JOB_TTL = 3600.0 # Seconds a shard may wait in the queue when the count has no timeout
+POLL_INTERVAL = 0.5
+
+# --- Distributed Prime Counting ---
+# The requester splits [start, end) into shards and publishes each one as a
+# persistent message on a durable work queue, as EXP5's producer does. Any
+# number of workers, on any host, take shards from the queue (prefetch 1, so
+# fast workers take more). A worker tells the requester when it starts a
+# shard, counts it with prime_engine and publishes the count to the
+# requester's private reply queue, tagged with the job ID. The requester sums
+# the counts once every shard has answered.
+#
+# Failure handling:
+#   * A worker that dies holding a shard never acks it, so the broker hands
+#     it to another worker.
+#   * A shard that raises is nacked and requeued once. If it fails again, the
+#     error goes back to the requester, which publishes it again.
+#   * A shard still running SHARD_TIMEOUT after a worker started it is
+#     published again. Time spent waiting in the queue does not count, so a
+#     busy queue does not cause republishing.
+#   * Every shard message expires: after the count's timeout, or JOB_TTL
+#     without one, so the shards of an abandoned count do not stay queued.
+#     A shard that expired unstarted is published again if the count is
+#     still waiting for it.
+#   * A malformed shard message is acked and logged, not redelivered.
+# Shards may therefore be counted twice, so the reducer keeps only the first
+# answer per shard.
+
+
+class ShardFailed(Exception):
+    pass
+
+
+def connect():
+    return pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST, port=RABBITMQ_PORT))
+
+
+def declare_shard_queue(channel):
+    channel.queue_declare(queue=SHARD_QUEUE, durable=True)
+
+
+def plan_shards(start, end, shard_size):
+    return [(lo, min(lo + shard_size, end)) for lo in range(start, end, shard_size)]
+
+
+# --- Requester (producer + reducer) ---
+
+class DistributedCount:
+    """Counts the primes in [start, end) on the queue's workers; run() returns (count, stats)."""
+
+    def __init__(self, start, end, shard_size=SHARD_SIZE, engine='sieve',
+                 shard_timeout=SHARD_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+        if engine not in prime_engine.KERNELS:
+            raise ValueError(f"engine must be one of {', '.join(prime_engine.KERNELS)}")
+        if shard_size < 1:
+            raise ValueError("shard_size must be positive")
+        self.shards = plan_shards(start, end, shard_size)
+        if len(self.shards) > MAX_SHARDS:
+            raise ValueError(f"{len(self.shards)} shards; use a shard_size of at least {-(-(end - start) // MAX_SHARDS)}")
+        self.job_id = uuid.uuid4().hex
+        self.engine = engine
+        self.shard_timeout = shard_timeout
+        self.max_attempts = max_attempts
+        self.counts = {} # shard index -> prime count (first answer only)
+        self.attempts = [0] * len(self.shards)
+        self.sent_at = [0.0] * len(self.shards)
+        self.started_at = [None] * len(self.shards) # When a worker last reported starting the shard
+        self.failed = [] # Shard indexes whose worker reported an error, to publish again
+        self.workers = {} # worker name -> shards counted
+        self.duplicates = 0
+        self.republished = 0
+
+    def run(self, timeout=None, on_progress=None):
+        """
+        Publishes every shard and waits for all counts. 'on_progress(done, total)'
+        is called on every poll and may raise to abandon the count.
+        """
+        started = time.time()
+        connection = connect()
+        try:
+            channel = connection.channel()
+            declare_shard_queue(channel)
+            # Exclusive, server-named: deleted with this connection, so late answers are dropped
+            self.reply_queue = channel.queue_declare(queue='', exclusive=True).method.queue
+            channel.basic_consume(queue=self.reply_queue, on_message_callback=self._on_result, auto_ack=True)
+            for shard in range(len(self.shards)):
+                self._publish(channel, shard, timeout)
+            published = time.time()
+
+            while len(self.counts) < len(self.shards):
+                connection.process_data_events(time_limit=POLL_INTERVAL)
+                now = time.time()
+                if on_progress:
+                    on_progress(len(self.counts), len(self.shards))
+                if timeout and now - started > timeout:
+                    raise TimeoutError(f"{len(self.shards) - len(self.counts)} of {len(self.shards)} shards "
+                                       f"unanswered after {timeout}s")
+                retry, self.failed = self.failed, []
+                retry += [s for s in range(len(self.shards)) if s not in self.counts and s not in retry
+                          and self.started_at[s] is not None and now - self.started_at[s] > self.shard_timeout]
+                for shard in retry:
+                    if shard not in self.counts:
+                        self.republished += 1
+                        self._publish(channel, shard, timeout and timeout - (now - started))
+                if not timeout:
+                    # Not a failure: the message expired in the queue before any worker took it
+                    for shard in range(len(self.shards)):
+                        if (shard not in self.counts and self.started_at[shard] is None
+                                and now - self.sent_at[shard] > JOB_TTL):
+                            self._publish(channel, shard, None, count_attempt=False)
+        finally:
+            if connection.is_open:
+                connection.close()
+        finished = time.time()
+
+        return sum(self.counts.values()), {
+            "job_id": self.job_id,
+            "shards": len(self.shards),
+            "publish_sec": round(published - started, 4),
+            "total_sec": round(finished - started, 4),
+            "republished": self.republished,
+            "duplicate_answers": self.duplicates,
+            "workers": self.workers,
+        }
+
+    def _publish(self, channel, shard, ttl, count_attempt=True):
+        ttl = ttl or JOB_TTL
+        if count_attempt:
+            self.attempts[shard] += 1
+        if self.attempts[shard] > self.max_attempts:
+            raise ShardFailed(f"Shard {self.shards[shard]} failed {self.max_attempts} times")
+        start, end = self.shards[shard]
+        message = {'job_id': self.job_id, 'shard': shard, 'start': start, 'end': end,
+                   'engine': self.engine, 'attempt': self.attempts[shard]}
+        channel.basic_publish(
+            exchange='',
+            routing_key=SHARD_QUEUE,
+            body=json.dumps(message).encode(),
+            properties=pika.BasicProperties(
+                delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE,
+                reply_to=self.reply_queue,
+                correlation_id=self.job_id,
+                # Shards of a count that has timed out or been abandoned are not worth computing
+                expiration=str(max(1, int(ttl * 1000))),
+            )
+        )
+        self.sent_at[shard] = time.time()
+        self.started_at[shard] = None
+
+    def _on_result(self, ch, method, properties, body):
+        if properties.correlation_id != self.job_id:
+            return
+        result = json.loads(body.decode())
+        shard = result['shard']
+        if result.get('started'):
+            if shard not in self.counts:
+                self.started_at[shard] = time.time()
+        elif shard in self.counts:
+            self.duplicates += 1
+        elif result.get('error'):
+            print(f"[DISTRIBUTED] Shard {self.shards[shard]} failed on {result['worker']}: {result['error']}")
+            self.failed.append(shard)
+        else:
+            self.counts[shard] = result['count']
+            self.workers[result['worker']] = self.workers.get(result['worker'], 0) + 1
+
+
+def count_primes_distributed(start, end, shard_size=SHARD_SIZE, engine='sieve', timeout=None, on_progress=None):
+    return DistributedCount(start, end, shard_size, engine).run(timeout, on_progress)
+
+
+# --- Worker ---
+
+def count_shard(task):
+    t0 = time.time()
+    count = prime_engine.KERNELS[task['engine']](task['start'], task['end'])
+    return count, time.time() - t0
+
+
+def run_worker(prefetch=1):
+    """One worker process: counts shards until interrupted."""
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    compute = ThreadPoolExecutor(max_workers=1)
+    connection = connect()
+    channel = connection.channel()
+    declare_shard_queue(channel)
+    channel.basic_qos(prefetch_count=prefetch)
+
+    def send_reply(properties, message):
+        if properties.reply_to:
+            channel.basic_publish(exchange='', routing_key=properties.reply_to, body=json.dumps(message).encode(),
+                                  properties=pika.BasicProperties(correlation_id=properties.correlation_id))
+
+    def on_shard(ch, method, properties, body):
+        try:
+            task = json.loads(body.decode())
+            if (task['engine'] not in prime_engine.KERNELS
+                    or not all(isinstance(task[key], int) for key in ('shard', 'start', 'end'))):
+                raise ValueError("bad engine or shard bounds")
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[WORKER {name}] Dropping malformed shard message ({e!r})")
+            ch.basic_ack(delivery_tag=method.delivery_tag) # Redelivering it would fail the same way
+            return
+        send_reply(properties, {'shard': task['shard'], 'worker': name, 'started': True})
+        future = compute.submit(count_shard, task)
+        while not future.done():
+            connection.sleep(POLL_INTERVAL) # Keeps heartbeats flowing during a long shard
+        reply = {'shard': task['shard'], 'worker': name}
+        try:
+            reply['count'], elapsed = future.result()
+            print(f"[WORKER {name}] Shard [{task['start']}, {task['end']}) -> {reply['count']} primes in {elapsed:.3f}s")
+        except Exception as e:
+            if not method.redelivered:
+                print(f"[WORKER {name}] Shard [{task['start']}, {task['end']}) failed ({e}); requeued")
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+                return
+            reply['error'] = f"{type(e).__name__}: {e}"
+        send_reply(properties, reply)
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+        sys.stdout.flush()
+
+    print(f" [*] Prime worker {name} waiting for shards on '{SHARD_QUEUE}'. To exit press CTRL+C")
+    channel.basic_consume(queue=SHARD_QUEUE, on_message_callback=on_shard, auto_ack=False)
+    try:
+        channel.start_consuming()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if connection.is_open:
+            connection.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Distributed prime counting over the EXP5 RabbitMQ work queue.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    worker = sub.add_parser('worker', help="Count shards from the queue.")
+    worker.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Worker processes on this host.")
+    worker.add_argument("--prefetch", type=int, default=1, help="Unacked shards per worker process.")
+    count = sub.add_parser('count', help="Count the primes in [start, n) on the workers.")
+    count.add_argument("--start", type=int, default=0)
+    count.add_argument("--n", type=int, default=10**9)
+    count.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    count.add_argument("--engine", choices=list(prime_engine.KERNELS), default='sieve')
+    count.add_argument("--timeout", type=float, default=None, help="Give up after this many seconds.")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'worker':
+            if args.processes == 1:
+                run_worker(args.prefetch)
+            else:
+                procs = [mp.Process(target=run_worker, args=(args.prefetch,)) for _ in range(args.processes)]
+                for p in procs:
+                    p.start()
+                try:
+                    for p in procs:
+                        p.join()
+                except KeyboardInterrupt:
+                    for p in procs:
+                        p.join()
+        else:
+            total, stats = count_primes_distributed(args.start, args.n, args.shard_size, args.engine, args.timeout)
+            print(f"Primes in [{args.start}, {args.n}): {total}")
+            print(json.dumps(stats, indent=2))
+    except pika.exceptions.AMQPConnectionError:
+        print(f"ERROR: Could not connect to RabbitMQ on {RABBITMQ_HOST}:{RABBITMQ_PORT}. Ensure the Docker container is running.")
+        sys.exit(1)
@@ -0,0 +1,251 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from flask import jsonify, request
+
+# --- Asynchronous Job API ---
+# Long computations run as jobs instead of inside the HTTP request:
+#   POST   /jobs?n=...          -> 202 + job ID at once (or the ID of an identical in-flight job)
+#   GET    /jobs/<id>           -> state, progress, result
+#   DELETE /jobs/<id>           -> cancel
+#   GET    /jobs                -> every job still retained
+# At most 'max_running' jobs execute at a time and 'max_queued' more may wait;
+# beyond that submissions get 429, so the compute tier stays saturated without
+# an unbounded backlog and HTTP workers are never tied up by the computation.
+# Jobs live in the app process, so the app must be served by a single process
+# (e.g. gunicorn -w 1 --threads N); with several workers, GET /jobs/<id> would
+# land on a process that does not know the job.
+
+POLL_INTERVAL = 0.2 # How often a running job checks for cancellation / its deadline
+RETENTION = 600.0 # Seconds a finished job's result stays available
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key, params, deadline):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.params = params
+        self.state = 'queued' # queued -> running -> done | failed | cancelled | expired
+        self.done_units = 0
+        self.total_units = 0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = self.submitted_at + deadline if deadline else None
+        self.cancel_requested = threading.Event()
+
+    @property
+    def finished(self):
+        return self.state in ('done', 'failed', 'cancelled', 'expired')
+
+    def report(self, done_units, total_units):
+        self.done_units = done_units
+        self.total_units = total_units
+
+    def check(self):
+        """Called by runners between steps; raises if the job must stop."""
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+        if self.deadline is not None and time.time() > self.deadline:
+            raise DeadlineExceeded()
+
+    def as_dict(self):
+        now = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "params": self.params,
+            "progress": round(self.done_units / self.total_units, 4) if self.total_units else 0.0,
+            "units": f"{self.done_units}/{self.total_units}",
+            "queued_sec": round((self.started_at or now) - self.submitted_at, 4),
+            "running_sec": round(now - self.started_at, 4) if self.started_at else 0.0,
+            "deadline_in_sec": round(self.deadline - time.time(), 3) if self.deadline and not self.finished else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def iter_completed(job, futures):
+    """
+    Yields futures as they complete, checking the job between waits. If the
+    job is cancelled or expires, the futures that have not started are cancelled.
+    """
+    pending = set(futures)
+    try:
+        while pending:
+            job.check()
+            done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            yield from done
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class JobManager:
+    """
+    Runs 'runner(job)' for each submitted job on a bounded thread pool. The runner
+    fans the work out to the app's compute executor, calls job.report() as units
+    finish and returns the job's JSON-serializable result.
+    """
+
+    def __init__(self, runner, max_running=2, max_queued=32, retention=RETENTION):
+        self.runner = runner
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.retention = retention
+        self.executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix="job")
+        self.lock = threading.Lock()
+        self.jobs = {} # id -> Job
+        self.in_flight = {} # params key -> queued or running Job (for deduplication)
+        self.counts = {'submitted': 0, 'deduplicated': 0, 'rejected': 0}
+
+    def submit(self, params, deadline=None):
+        """Returns (job, deduplicated). Raises JobQueueFull when the queue is at capacity."""
+        key = tuple(sorted(params.items()))
+        with self.lock:
+            self._forget_old_jobs()
+            self._expire_queued()
+            job = self.in_flight.get(key)
+            if job is not None:
+                self.counts['deduplicated'] += 1
+                return job, True
+            if len(self.in_flight) >= self.max_running + self.max_queued:
+                self.counts['rejected'] += 1
+                raise JobQueueFull(f"{len(self.in_flight)} jobs already queued or running")
+            job = Job(key, params, deadline)
+            self.jobs[job.id] = job
+            self.in_flight[key] = job
+            self.counts['submitted'] += 1
+        self.executor.submit(self._run, job)
+        return job, False
+
+    def _run(self, job):
+        with self.lock:
+            if job.state != 'queued':
+                return # Expired or cancelled while it waited for a runner thread
+            job.state = 'running'
+            job.started_at = time.time()
+        try:
+            job.check()
+            job.result = self.runner(job)
+            job.state = 'done'
+        except JobCancelled:
+            job.state = 'cancelled'
+        except DeadlineExceeded:
+            job.state = 'expired'
+            job.error = "Deadline exceeded"
+        except Exception as e:
+            job.state = 'failed'
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = time.time()
+            with self.lock:
+                if self.in_flight.get(job.key) is job:
+                    del self.in_flight[job.key]
+
+    def get(self, job_id):
+        with self.lock:
+            self._expire_queued()
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_requested.set()
+            if job.state == 'queued':
+                self._finish_queued(job, 'cancelled')
+            # An identical request submitted from now on starts a fresh job
+            if self.in_flight.get(job.key) is job:
+                del self.in_flight[job.key]
+            return job
+
+    def stats(self):
+        with self.lock:
+            self._expire_queued()
+            states = {}
+            for job in self.jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return dict(self.counts, states=states, max_running=self.max_running, max_queued=self.max_queued)
+
+    # --- Housekeeping (lock held) ---
+
+    def _expire_queued(self):
+        """Queued jobs past their deadline expire now rather than when a runner thread frees up."""
+        now = time.time()
+        for job in list(self.in_flight.values()):
+            if job.state == 'queued' and job.deadline is not None and now > job.deadline:
+                self._finish_queued(job, 'expired', "Deadline exceeded")
+
+    def _finish_queued(self, job, state, error=None):
+        job.state = state
+        job.error = error
+        job.finished_at = time.time()
+        if self.in_flight.get(job.key) is job:
+            del self.in_flight[job.key]
+
+    def _forget_old_jobs(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+
+def register_job_routes(app, manager, parse_params, prefix="/jobs"):
+    """
+    Adds the job endpoints to a Flask app. 'parse_params(args)' turns the query
+    string into a dict of job parameters or raises ValueError.
+    """
+
+    def submit_job():
+        try:
+            params = parse_params(request.args)
+            deadline = request.args.get('deadline', None, type=float)
+            if deadline is not None and deadline <= 0:
+                raise ValueError("deadline must be a positive number of seconds")
+        except ValueError as e:
+            return jsonify({"status": "error", "error": str(e)}), 400
+        try:
+            job, deduplicated = manager.submit(params, deadline)
+        except JobQueueFull as e:
+            return jsonify({"status": "error", "error": f"Job queue is full ({e}); retry later"}), 429
+        body = job.as_dict()
+        body.update({"deduplicated": deduplicated, "status_url": f"{prefix}/{job.id}"})
+        return jsonify(body), 202
+
+    def job_status(job_id):
+        job = manager.get(job_id)
+        if job is None:
+            return jsonify({"status": "error", "error": f"Unknown job {job_id}"}), 404
+        return jsonify(job.as_dict())
+
+    def cancel_job(job_id):
+        job = manager.cancel(job_id)
+        if job is None:
+            return jsonify({"status": "error", "error": f"Unknown job {job_id}"}), 404
+        return jsonify(job.as_dict()), 202 if not job.finished else 200
+
+    def list_jobs():
+        stats = manager.stats() # Expires overdue queued jobs first
+        return jsonify({"jobs": [job.as_dict() for job in list(manager.jobs.values())], "stats": stats})
+
+    app.add_url_rule(prefix, "submit_job", submit_job, methods=["POST"])
+    app.add_url_rule(prefix, "list_jobs", list_jobs, methods=["GET"])
+    app.add_url_rule(f"{prefix}/<job_id>", "job_status", job_status, methods=["GET"])
+    app.add_url_rule(f"{prefix}/<job_id>", "cancel_job", cancel_job, methods=["DELETE"])
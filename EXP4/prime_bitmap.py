@@ -0,0 +1,91 @@
+import math
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import prime_engine
+
+# --- Shared-Memory Prime Bitmap ---
+# A bitmap of the odd numbers in [start, end): bit i (little-endian within
+# each byte) is set iff first + 2*i is prime, where first = start | 1. The
+# prime 2 is not in the bitmap. The bitmap lives in one SharedMemory block
+# and pool workers sieve their units straight into it. Units cover whole
+# bytes, so workers never share a byte and nothing is sent back but a count.
+
+UNIT_ODDS = 8 * prime_engine.SEGMENT_ODDS # Odd numbers per work unit (multiple of 8)
+STREAM_ODDS = 1 << 16 # Odd numbers decoded per chunk when streaming primes
+MAX_SPAN = 1 << 30 # Largest end - start (a 64 MB bitmap)
+
+
+class PrimeBitmap:
+    """Owns the shared bitmap for one [start, end) request; close() frees it."""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.first = start | 1
+        self.bits = max(0, (end - self.first + 1) // 2)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, (self.bits + 7) // 8))
+        self.array = np.ndarray(((self.bits + 7) // 8,), dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def has_two(self):
+        return self.start <= 2 < self.end
+
+    def units(self):
+        """(first_bit, last_bit) work units, each covering whole bytes."""
+        return [(lo, min(lo + UNIT_ODDS, self.bits)) for lo in range(0, self.bits, UNIT_ODDS)]
+
+    def unit_args(self, unit):
+        """Arguments for fill_unit() in a worker process."""
+        lo, hi = unit
+        return self.shm.name, self.first + 2 * lo, min(self.first + 2 * hi, self.end), lo // 8
+
+    def iter_primes(self, lo_bit=0, hi_bit=None):
+        """Yields NumPy arrays of the primes encoded by bits [lo_bit, hi_bit) (lo_bit a multiple of 8)."""
+        hi_bit = self.bits if hi_bit is None else hi_bit
+        for bit in range(lo_bit, hi_bit, STREAM_ODDS):
+            stop = min(bit + STREAM_ODDS, hi_bit)
+            flags = np.unpackbits(self.array[bit // 8:(stop + 7) // 8], count=stop - bit, bitorder='little')
+            yield self.first + 2 * (bit + np.flatnonzero(flags))
+
+    def iter_compressed(self, lo_bit=0, hi_bit=None, compressor=None):
+        """zlib-compresses the bitmap bytes for bits [lo_bit, hi_bit) straight from shared memory."""
+        hi_bit = self.bits if hi_bit is None else hi_bit
+        compressor = compressor or zlib.compressobj()
+        view = self.shm.buf[lo_bit // 8:(hi_bit + 7) // 8]
+        try:
+            for offset in range(0, len(view), 1 << 20):
+                data = compressor.compress(view[offset:offset + (1 << 20)])
+                if data:
+                    yield data
+        finally:
+            view.release()
+
+    def close(self):
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+def fill_unit(shm_name, lo, hi, byte_offset):
+    """
+    Worker side: sieves the odd numbers in [lo, hi) (lo odd) into the shared
+    bitmap starting at byte_offset. Returns the number of primes found.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        bitmap = np.ndarray((shm.size,), dtype=np.uint8, buffer=shm.buf)
+        base_primes = prime_engine.small_primes(math.isqrt(max(hi - 1, 0)))
+        offset = byte_offset
+        count = 0
+        for _, flags in prime_engine.iter_segments(lo, hi, base_primes):
+            packed = np.packbits(flags, bitorder='little')
+            bitmap[offset:offset + len(packed)] = packed
+            offset += len(packed) # Segments hold a multiple of 8 odds except the unit's last
+            count += int(np.count_nonzero(flags))
+        del bitmap
+        return count
+    finally:
+        shm.close()
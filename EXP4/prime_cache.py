@@ -0,0 +1,179 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import prime_engine
+
+# --- Prime-Count Cache ---
+# Remembers pi(x), the number of primes below x, at every queried x and at the
+# block boundaries k * BLOCK between them. pi(x) is counted from the nearest
+# known point, below x or above it (pi(x) = pi(q) - primes in [x, q)), so a
+# repeated query is a hit and a nearby one only sieves the short gap. Gaps are
+# cut at block boundaries, which keeps each work unit bounded and lets later
+# queries reuse them. A range [a, b) is pi(b) - pi(a). At most
+# 'max_checkpoints' points are kept; the least recently used go first (pi(0)
+# is implicit), and evicting one only makes a later gap longer. An optional
+# JSON file keeps the points across restarts; it is rewritten at most every
+# SAVE_INTERVAL seconds and once more at exit.
+
+BLOCK = 1 << 20
+MAX_CHECKPOINTS = 100000
+SAVE_INTERVAL = 5.0 # Seconds between cache file rewrites
+
+
+def count_sequential(ranges):
+    return [prime_engine.count_primes(start, end) for start, end in ranges]
+
+
+class PrimeCountCache:
+    def __init__(self, block=BLOCK, max_checkpoints=MAX_CHECKPOINTS, path=None):
+        self.block = block
+        self.max_checkpoints = max_checkpoints
+        self.path = path
+        self.lock = threading.Lock()
+        self.checkpoints = OrderedDict() # x -> pi(x), in LRU order
+        self.keys = [] # The same x values, sorted
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False # Points not yet written to 'path'
+        self.save_timer = None
+        self.save_lock = threading.Lock() # One writer of the file at a time
+        if path:
+            if os.path.exists(path):
+                self._load()
+            atexit.register(self.flush)
+
+    # --- Queries ---
+
+    def count_range(self, start, end, count_ranges=count_sequential):
+        """
+        Primes in [start, end) and the number of integers that had to be sieved.
+        'count_ranges' maps a list of (start, end) gaps to their prime counts, so
+        callers can count the gaps in parallel.
+        """
+        if end <= start:
+            return 0, 0
+        (pi_start, pi_end), computed = self.prefixes([start, end], count_ranges)
+        return pi_end - pi_start, computed
+
+    def prefixes(self, points, count_ranges=count_sequential):
+        """[pi(x) for x in points] and the number of integers sieved to get them."""
+        plan = [] # (x, known point, pi(known point), gap segments)
+        with self.lock:
+            for x in points:
+                known, pi = self._nearest(x)
+                lo, hi = min(known, x), max(known, x)
+                plan.append((x, known, pi, self._segments(lo, hi)))
+
+        ranges = sorted(set(r for _, _, _, segments in plan for r in segments))
+        counts = dict(zip(ranges, count_ranges(ranges))) if ranges else {}
+
+        results = []
+        new_points = {}
+        for x, known, pi, segments in plan:
+            if known <= x:
+                # Walk up from the known point, recording pi at every segment end
+                for start, end in segments:
+                    pi += counts[(start, end)]
+                    new_points[end] = pi
+            else:
+                # Walk down from the known point above x
+                for start, end in reversed(segments):
+                    pi -= counts[(start, end)]
+                    new_points[start] = pi
+            results.append(pi)
+
+        with self.lock:
+            if ranges:
+                self.misses += 1
+            else:
+                self.hits += 1
+            for x, pi in new_points.items():
+                self._store(x, pi)
+            if new_points and self.path:
+                self._save_later()
+        return results, sum(end - start for start, end in ranges)
+
+    def stats(self):
+        with self.lock:
+            return {"checkpoints": len(self.checkpoints), "hits": self.hits, "misses": self.misses,
+                    "covered_up_to": self.keys[-1] if self.keys else 0}
+
+    # --- Checkpoint table (lock held) ---
+
+    def _nearest(self, x):
+        """(point, pi(point)) for the cached point closest to x (0 is always known: pi(0) = 0)."""
+        i = bisect.bisect_right(self.keys, x)
+        below = self.keys[i - 1] if i else 0
+        above = self.keys[i] if i < len(self.keys) else None
+        nearest = above if above is not None and above - x < x - below else below
+        if nearest == 0:
+            return 0, 0
+        self.checkpoints.move_to_end(nearest)
+        return nearest, self.checkpoints[nearest]
+
+    def _segments(self, lo, hi):
+        """[lo, hi) cut at block boundaries."""
+        cuts = [lo, *range((lo // self.block + 1) * self.block, hi, self.block), hi]
+        return [(start, end) for start, end in zip(cuts, cuts[1:]) if start < end]
+
+    def _store(self, x, pi):
+        if x == 0:
+            return
+        if x in self.checkpoints:
+            self.checkpoints.move_to_end(x)
+            return
+        self.checkpoints[x] = pi
+        bisect.insort(self.keys, x)
+        self.dirty = True
+        while len(self.checkpoints) > self.max_checkpoints:
+            old, _ = self.checkpoints.popitem(last=False)
+            del self.keys[bisect.bisect_left(self.keys, old)]
+
+    # --- Persistence ---
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[CACHE] Ignoring unreadable cache file {self.path}: {e}")
+            return
+        if saved.get('block') != self.block or 'prefixes' not in saved:
+            print(f"[CACHE] Ignoring {self.path}: written with another block size or format")
+            return
+        for x, pi in saved['prefixes']:
+            self._store(x, pi)
+        self.dirty = False
+        print(f"[CACHE] Loaded {len(self.checkpoints)} points from {self.path}")
+
+    def _save_later(self):
+        """Batches file writes: the first new point since the last write starts a timer."""
+        if self.save_timer is None:
+            self.save_timer = threading.Timer(SAVE_INTERVAL, self.flush)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def flush(self):
+        """Writes the points now if any are unsaved."""
+        with self.lock:
+            if self.save_timer is not None:
+                self.save_timer.cancel()
+                self.save_timer = None
+            if not self.dirty:
+                return
+            self.dirty = False
+        self.save()
+
+    def save(self):
+        """Writes the points atomically (temp file + rename)."""
+        with self.save_lock:
+            with self.lock:
+                snapshot = {'block': self.block, 'prefixes': list(self.checkpoints.items())}
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,121 @@
+import math
+import numpy as np
+
+# --- Segmented Sieve of Eratosthenes ---
+# Counts primes in [start, end) one segment at a time. A segment holds only
+# odd numbers, one byte each, and is sized to stay in the CPU cache, so memory
+# use is independent of N and any (start, end) chunk can be sieved on its own.
+# That keeps the chunked fan-out of the EXP4 apps working unchanged.
+
+SEGMENT_ODDS = 1 << 19 # Odd numbers per segment (512 KB of flags)
+VECTOR_BLOCK = 1 << 15 # Odd candidates per block of the vectorized kernel
+
+ENGINES = ('sieve', 'vector', 'trial') # 'trial' is the original is_prime loop, kept as the baseline
+MAX_N = 10**12
+MAX_WORKERS = 256
+
+
+def small_primes(limit):
+    """All primes <= limit (plain sieve; only used up to sqrt(N))."""
+    if limit < 2:
+        return np.zeros(0, dtype=np.int64)
+    flags = np.ones(limit + 1, dtype=bool)
+    flags[:2] = False
+    flags[4::2] = False
+    for p in range(3, math.isqrt(limit) + 1, 2):
+        if flags[p]:
+            flags[p * p::2 * p] = False
+    return np.flatnonzero(flags)
+
+
+def odd_segment(lo, hi, base_primes):
+    """
+    Flags for the odd numbers lo, lo+2, ... below hi (lo must be odd):
+    flags[i] is True iff lo + 2*i is prime. base_primes must cover sqrt(hi).
+    """
+    flags = np.ones((hi - lo + 1) // 2, dtype=bool)
+    if lo == 1:
+        flags[0] = False
+    for p in base_primes:
+        p = int(p)
+        if p == 2:
+            continue
+        if p * p >= hi:
+            break
+        first = max(p * p, (lo + p - 1) // p * p)
+        if first % 2 == 0:
+            first += p # Even multiples are not stored
+        flags[(first - lo) // 2::p] = False
+    return flags
+
+
+def iter_segments(start, end, base_primes=None):
+    """Yields (lo, flags) for consecutive odd-only segments covering [start, end)."""
+    if base_primes is None:
+        base_primes = small_primes(math.isqrt(max(end - 1, 0)))
+    lo = start | 1 # First odd number >= start
+    while lo < end:
+        hi = min(lo + 2 * SEGMENT_ODDS, end)
+        yield lo, odd_segment(lo, hi, base_primes)
+        lo = hi | 1
+
+
+def count_primes(start, end, base_primes=None):
+    """Number of primes n with start <= n < end."""
+    start = max(start, 0)
+    count = 1 if start <= 2 < end else 0
+    for _, flags in iter_segments(start, end, base_primes):
+        count += int(np.count_nonzero(flags))
+    return count
+
+
+# --- Vectorized Trial Division ---
+# The same test as is_prime, but applied to a whole block of candidates per
+# NumPy call: 'candidates % p != 0' for every base prime p. Each call works on
+# a large array with the GIL released, so threads running this kernel execute
+# in parallel, unlike the pure-Python loop.
+
+def count_primes_vectorized(start, end, base_primes=None):
+    """Number of primes n with start <= n < end, by vectorized divisibility tests."""
+    start = max(start, 0)
+    if base_primes is None:
+        base_primes = small_primes(math.isqrt(max(end - 1, 0)))
+    odd_primes = base_primes[1:] if len(base_primes) else base_primes
+    count = 1 if start <= 2 < end else 0
+    dtype = np.uint32 if end <= 1 << 32 else np.int64 # 32-bit division is much cheaper
+    remainders = np.empty(VECTOR_BLOCK, dtype=dtype)
+    lo = max(start | 1, 3) # 1 is not prime; 2 was counted above
+    while lo < end:
+        hi = min(lo + 2 * VECTOR_BLOCK, end)
+        candidates = np.arange(lo, hi, 2, dtype=dtype)
+        is_candidate = np.ones(len(candidates), dtype=bool)
+        rem = remainders[:len(candidates)]
+        used = odd_primes[:np.searchsorted(odd_primes, math.isqrt(hi - 1), side='right')]
+        for p in used.astype(dtype):
+            np.remainder(candidates, p, out=rem)
+            is_candidate &= rem != 0
+        # Base primes inside the block divide themselves; add them back
+        count += int(np.count_nonzero(is_candidate))
+        count += int(np.count_nonzero((used >= lo) & (used < hi)))
+        lo = hi
+    return count
+
+
+KERNELS = {
+    'sieve': count_primes,
+    'vector': count_primes_vectorized,
+}
+
+
+def parse_task_args(args, default_n, default_workers):
+    """Reads ?n=, ?workers= and ?engine= from a request's query args; raises ValueError."""
+    N = args.get('n', default_n, type=int)
+    workers = args.get('workers', default_workers, type=int)
+    engine = args.get('engine', 'sieve')
+    if not 0 < N <= MAX_N:
+        raise ValueError(f"n must be between 1 and {MAX_N}")
+    if not 0 < workers <= MAX_WORKERS:
+        raise ValueError(f"workers must be between 1 and {MAX_WORKERS}")
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+    return N, workers, engine
@@ -5,6 +5,7 @@ IO_PORT_THREAD=8001
 IO_PORT_PROCESS=8003
 CPU_PORT_PROCESS=8002
 CPU_PORT_THREAD=8004
+IO_PORT_ASYNC=8005
 
 echo "========================================================"
 echo " Starting Full Concurrency Comparison Lab (Cores: $WORKERS)"
@@ -19,8 +20,11 @@ sleep 2
 
 # --- 2. Start CPU-Bound Server (Multiprocessing - TRUE PARALLELISM) ---
 # Goal: Processes bypass GIL, utilizing $WORKERS cores for calculation.
-echo -e "\n--- 2. Starting CPU-PROCESS Server on :$CPU_PORT_PROCESS (4 Procs) ---"
-gunicorn -w 4 -b 127.0.0.1:$CPU_PORT_PROCESS app_cpu_bound_processing:app &
+# One gunicorn worker: the app owns a process pool of one process per core, so
+# -w 4 would start 4 pools and oversubscribe the cores 4x. Threads accept requests.
+# The /jobs table also lives in this one process (as in the CPU-THREAD server).
+echo -e "\n--- 2. Starting CPU-PROCESS Server on :$CPU_PORT_PROCESS (1 Proc + Process Pool, 4 Threads) ---"
+gunicorn -w 1 --threads 4 -b 127.0.0.1:$CPU_PORT_PROCESS app_cpu_bound_processing:app &
 CPU_PROCESS_PID=$!
 sleep 2
 
@@ -38,32 +42,54 @@ gunicorn -w 1 --threads 4 -b 127.0.0.1:$CPU_PORT_THREAD app_cpu_bound_threading:
 CPU_THREAD_PID=$!
 sleep 2
 
+# --- 5. Start I/O-Bound Server (Asyncio - ONE PROCESS, NO THREAD PER REQUEST) ---
+# Goal: Every request and its 4 concurrent waits are coroutines on one event loop.
+echo -e "\n--- 5. Starting I/O-ASYNC Server on :$IO_PORT_ASYNC (1 Proc, 1 Thread, Event Loop) ---"
+python app_io_bound_async.py --port $IO_PORT_ASYNC &
+IO_ASYNC_PID=$!
+sleep 2
+
 # --- Benchmark Execution ---
 echo -e "\n==================== BENCHMARK RESULTS ===================="
 
 # --- TEST A: I/O-Bound Task Comparison (Concurrency vs. Overhead) ---
 echo -e "\n--- A. I/O-BOUND CONCURRENCY (40 requests, 10 clients) ---"
 echo "A1: THREADING (Low Overhead, Expected High RPS)"
-ab -n 40 -c 10 http://127.0.0.1:$IO_PORT_THREAD/io-task | grep -E "Requests per second:|Time per request:|Failed requests:"
+ab -n 40 -c 10 http://127.0.0.1:$IO_PORT_THREAD/io_task | grep -E "Requests per second:|Time per request:|Failed requests:"
 
 echo "A2: MULTIPROCESSING (High Overhead, Expected Lower RPS)"
 ab -n 40 -c 10 http://127.0.0.1:$IO_PORT_PROCESS/io-process-task | grep -E "Requests per second:|Time per request:|Failed requests:"
 
+echo "A3: ASYNCIO (4 concurrent waits per request, no thread or process per request)"
+ab -n 40 -c 10 http://127.0.0.1:$IO_PORT_ASYNC/io-async-task | grep -E "Requests per second:|Time per request:|Failed requests:"
+
+echo "A4: 1000 CONCURRENT CLIENTS (threads: 4 at a time; asyncio: all at once)"
+ab -n 5000 -c 1000 http://127.0.0.1:$IO_PORT_THREAD/io_task | grep -E "Requests per second:|Time per request:|Failed requests:"
+ab -n 5000 -c 1000 http://127.0.0.1:$IO_PORT_ASYNC/io-async-task | grep -E "Requests per second:|Time per request:|Failed requests:"
+
 
 # --- TEST B: CPU-Bound Task Comparison (Parallelism vs. GIL) ---
 echo -e "\n--- B. CPU-BOUND PARALLELISM (10 requests, 10 clients) ---"
 
 # B1: MULTIPROCESSING (True Parallelism) - Expected FASTEST execution time
 echo "B1: MULTIPROCESSING (Fastest Time - Bypasses GIL)"
-ab -n 10 -c 10 http://127.0.0.1:$CPU_PORT_PROCESS/cpu-task | grep -E "Requests per second:|Time per request:|Failed requests:"
+ab -n 10 -c 10 "http://127.0.0.1:$CPU_PORT_PROCESS/cpu-task?engine=trial" | grep -E "Requests per second:|Time per request:|Failed requests:"
 
 # B2: MULTITHREADING (GIL Bottleneck) - Expected SLOWEST execution time
 echo "B2: MULTITHREADING (Slowest Time - GIL Enforces Sequential)"
-ab -n 10 -c 10 http://127.0.0.1:$CPU_PORT_THREAD/cpu-thread-task | grep -E "Requests per second:|Time per request:|Failed requests:"
+ab -n 10 -c 10 "http://127.0.0.1:$CPU_PORT_THREAD/cpu-thread-task?engine=trial" | grep -E "Requests per second:|Time per request:|Failed requests:"
+
+# B3: SEGMENTED SIEVE - Same fan-out, algorithmic speedup on top of the parallelism
+echo "B3: MULTIPROCESSING + SEGMENTED SIEVE (N = 100,000,000)"
+ab -n 10 -c 10 "http://127.0.0.1:$CPU_PORT_PROCESS/cpu-task?n=100000000" | grep -E "Requests per second:|Time per request:|Failed requests:"
+
+# B4: MULTITHREADING + VECTORIZED KERNEL - NumPy releases the GIL, so threads scale
+echo "B4: MULTITHREADING + VECTORIZED KERNEL (GIL released inside NumPy)"
+ab -n 10 -c 10 "http://127.0.0.1:$CPU_PORT_THREAD/cpu-thread-task?engine=vector" | grep -E "Requests per second:|Time per request:|Failed requests:"
 
 
 # --- Cleanup ---
 echo -e "\n--- Cleaning up all servers ---"
-kill $IO_THREAD_PID $CPU_PROCESS_PID $IO_PROCESS_PID $CPU_THREAD_PID
-wait $IO_THREAD_PID $CPU_PROCESS_PID $IO_PROCESS_PID $CPU_THREAD_PID 2>/dev/null
+kill $IO_THREAD_PID $CPU_PROCESS_PID $IO_PROCESS_PID $CPU_THREAD_PID $IO_ASYNC_PID
+wait $IO_THREAD_PID $CPU_PROCESS_PID $IO_PROCESS_PID $CPU_THREAD_PID $IO_ASYNC_PID 2>/dev/null
 echo "Cleanup complete. Deactivate your virtual environment when done."
\ No newline at end of file
@@ -2,51 +2,191 @@ import pika
 import json
 import sys
 import os
-from heavy_computation import perform_heavy_task 
+import time
+import signal
+import argparse
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from heavy_computation import perform_heavy_task
 
 RABBITMQ_HOST = os.environ.get('RABBITMQ_HOST', 'localhost')
 RABBITMQ_PORT = 5673
 WORKER_QUEUE = 'heavy_tasks_queue'
 
-def worker_callback(ch, method, properties, body):
+POLL_INTERVAL = 0.5 # Seconds between checks for a shutdown signal
+DRAIN_TIMEOUT = 60.0 # Seconds to wait for running tasks on shutdown
+
+# --- Concurrent Consumer Runtime ---
+# The connection thread only receives and acknowledges messages. Each task
+# runs on a thread pool (I/O-style waits, like the 5s sleep) or a process
+# pool (CPU-bound work, not limited by the GIL). With prefetch N, the broker
+# keeps up to N unacked tasks in this process, so N pool workers are busy at
+# once.
+#
+# pika connections are not thread-safe, so a finished task never acks from
+# the pool thread. Its done-callback hands the ack to the connection thread
+# with connection.add_callback_threadsafe().
+#
+# If a pool process dies, the process pool is broken and every task on it
+# fails. Those tasks are requeued once (a task that was already redelivered is
+# acked as failed, in case it is what kills the process) and a new pool
+# replaces the broken one.
+#
+# On SIGINT/SIGTERM the runtime stops consuming and cancels tasks that have
+# not started yet; they are nacked back to the queue for other workers. It
+# then waits for running tasks and acks them. Anything still unacked when
+# the connection closes goes back to the queue. If tasks are still running
+# after the drain timeout, the process exits at once (killing its pool
+# processes), since those tasks are already requeued and would otherwise
+# run twice.
+
+def ignore_sigint():
+    """Pool processes leave Ctrl+C to the runtime, which drains them instead."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ConsumerRuntime:
+    def __init__(self, pool='thread', workers=4, prefetch=None, queue=WORKER_QUEUE, drain_timeout=DRAIN_TIMEOUT):
+        self.pool = pool
+        self.workers = workers
+        self.prefetch = prefetch or workers
+        self.queue = queue
+        self.drain_timeout = drain_timeout
+        self.in_flight = {} # delivery tag -> future
+        self.stopping = False
+        self.stats = {'received': 0, 'completed': 0, 'failed': 0, 'requeued': 0}
+
+    def make_executor(self):
+        if self.pool == 'process':
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=ignore_sigint)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="task")
+
+    def replace_executor(self, broken):
+        """Swaps in a new pool once per broken one; its other failed tasks find it already replaced."""
+        if self.executor is broken:
+            print(" [*] Process pool broke (a worker process died); starting a new one")
+            self.executor = self.make_executor()
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        self.executor = self.make_executor()
+        self.connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST, port=RABBITMQ_PORT))
+        try:
+            self.channel = self.connection.channel()
+            self.channel.queue_declare(queue=self.queue, durable=True)
+
+            # Load Balancing: at most 'prefetch' unacked tasks are pushed to this process
+            self.channel.basic_qos(prefetch_count=self.prefetch)
+            consumer_tag = self.channel.basic_consume(queue=self.queue, on_message_callback=self.on_message, auto_ack=False)
+
+            print(f" [*] Worker runtime ({self.workers} {self.pool} workers, prefetch {self.prefetch}) "
+                  f"is waiting for heavy tasks. To exit press CTRL+C")
+            signal.signal(signal.SIGINT, self.request_stop)
+            signal.signal(signal.SIGTERM, self.request_stop)
+            while not self.stopping:
+                self.connection.process_data_events(time_limit=POLL_INTERVAL)
+
+            self.drain(consumer_tag)
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if self.connection.is_open:
+                self.connection.close()
+        print(f" [*] Worker runtime stopped: {self.stats}")
+        if self.in_flight:
+            # Pool threads are not daemons and would keep the process alive, running
+            # tasks the broker has already handed to other workers
+            for child in multiprocessing.active_children():
+                child.terminate()
+            sys.stdout.flush()
+            os._exit(1)
+
+    def request_stop(self, signum, frame):
+        # Runs between pika calls on the main thread; the loop above does the work
+        self.stopping = True
+
+    def drain(self, consumer_tag):
+        print(f" [*] Draining: {len(self.in_flight)} tasks in flight")
+        self.channel.basic_cancel(consumer_tag) # No new deliveries
+        for future in list(self.in_flight.values()):
+            future.cancel() # Only succeeds for tasks that have not started; they are requeued
+        deadline = time.time() + self.drain_timeout
+        while self.in_flight and time.time() < deadline:
+            self.connection.process_data_events(time_limit=POLL_INTERVAL)
+        if self.in_flight:
+            print(f" [*] Drain timed out; {len(self.in_flight)} unacked tasks return to the queue")
+
+    # --- Connection thread ---
+
+    def on_message(self, ch, method, properties, body):
+        self.stats['received'] += 1
+        try:
+            task = json.loads(body.decode())
+            data = task['data']
+        except (ValueError, KeyError) as e:
+            print(f"FATAL ERROR in worker: malformed task ({e})")
+            ch.basic_ack(delivery_tag=method.delivery_tag) # Redelivering it would fail the same way
+            return
+
+        print(f"--- [Worker] Received task for: {data}. Queued on the {self.pool} pool ({len(self.in_flight) + 1} in flight) ---")
+        executor = self.executor
+        try:
+            future = executor.submit(perform_heavy_task, data)
+        except BrokenProcessPool:
+            self.replace_executor(executor)
+            self.stats['requeued'] += 1
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            return
+        self.in_flight[method.delivery_tag] = future
+        future.add_done_callback(functools.partial(self.on_done, method.delivery_tag, method.redelivered, executor))
+        sys.stdout.flush()
+
+    def finish(self, delivery_tag, redelivered, executor, future):
+        self.in_flight.pop(delivery_tag, None)
+        if not self.channel.is_open:
+            return # The broker requeues everything unacked on this channel
+        if future.cancelled():
+            self.stats['requeued'] += 1
+            self.channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+            return
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self.replace_executor(executor)
+            if not redelivered:
+                print("--- [Worker] Task lost with the broken pool; requeued ---")
+                self.stats['requeued'] += 1
+                self.channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+                return
+        if error is not None:
+            print(f"FATAL ERROR in worker: {error}")
+            self.stats['failed'] += 1
+        else:
+            task_id, result_message = future.result()
+            print(f"--- [Worker] Task {task_id[:8]} Finished. Result: {result_message} ---")
+            self.stats['completed'] += 1
+        # Acknowledge the message (crucial for reliability)
+        self.channel.basic_ack(delivery_tag=delivery_tag)
+        sys.stdout.flush()
+
+    # --- Pool threads ---
+
+    def on_done(self, delivery_tag, redelivered, executor, future):
+        self.connection.add_callback_threadsafe(functools.partial(self.finish, delivery_tag, redelivered, executor, future))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Background worker for the heavy task queue.")
+    parser.add_argument("--pool", choices=['thread', 'process'], default='thread',
+                        help="thread for waiting tasks, process for CPU-bound ones.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Pool size.")
+    parser.add_argument("--prefetch", type=int, default=None, help="Unacked tasks held at once (default: --workers).")
+    parser.add_argument("--drain-timeout", type=float, default=DRAIN_TIMEOUT,
+                        help="Seconds to let running tasks finish on shutdown.")
+    args = parser.parse_args()
+
     try:
-        task = json.loads(body.decode())
-        data = task['data']
-        
-        print(f"--- [Worker] Received task for: {data}. Starting heavy work (5s)... ---")
-        
-        # 1. Execute the heavy task (THIS BLOCKS THE WORKER, not the Producer)
-        task_id, result_message = perform_heavy_task(data)
-        
-        # 2. Print result for verification (no reply needed in this simple non-RPC setup)
-        print(f"--- [Worker] Task {task_id[:8]} Finished. Result: {result_message} ---")
-        
-        # 3. Acknowledge the message (crucial for reliability)
-        ch.basic_ack(delivery_tag=method.delivery_tag) 
-        
-    except Exception as e:
-        print(f"FATAL ERROR in worker: {e}")
-        ch.basic_ack(delivery_tag=method.delivery_tag) 
-    
-    sys.stdout.flush()
-
-try:
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST, port=RABBITMQ_PORT))
-    channel = connection.channel()
-
-    channel.queue_declare(queue=WORKER_QUEUE, durable=True)
-    
-    # Load Balancing: Prefetch count of 1 ensures the worker only gets one task at a time.
-    channel.basic_qos(prefetch_count=1) 
-
-    print(' [*] Background Worker is waiting for heavy tasks. To exit press CTRL+C')
-    channel.basic_consume(queue=WORKER_QUEUE, on_message_callback=worker_callback, auto_ack=False)
-    channel.start_consuming()
-
-except pika.exceptions.AMQPConnectionError:
-    print(f"ERROR: Could not connect to RabbitMQ on {RABBITMQ_HOST}:{RABBITMQ_PORT}. Ensure the Docker container is running.")
-    sys.exit(1)
-
-finally:
-    if 'connection' in locals() and connection.is_open:
-        connection.close()
\ No newline at end of file
+        ConsumerRuntime(args.pool, args.workers, args.prefetch, drain_timeout=args.drain_timeout).run()
+    except pika.exceptions.AMQPConnectionError:
+        print(f"ERROR: Could not connect to RabbitMQ on {RABBITMQ_HOST}:{RABBITMQ_PORT}. Ensure the Docker container is running.")
+        sys.exit(1)
@@ -4,44 +4,172 @@ import json
 import uuid
 import sys
 import os
+import argparse
+import threading
 
 RABBITMQ_HOST = os.environ.get('RABBITMQ_HOST', 'localhost')
 RABBITMQ_PORT = 5673
 WORKER_QUEUE = 'heavy_tasks_queue'
 
-def send_task_to_queue(task_data):
-    try:
-        connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST, port=RABBITMQ_PORT))
-        channel = connection.channel()
-        
-        # Declare a durable queue for work tasks
-        channel.queue_declare(queue=WORKER_QUEUE, durable=True)
-        
+BATCH_SIZE = 500 # Messages per broker round trip
+MAX_RETRIES = 3 # Reconnect attempts per batch
+RETRY_DELAY = 0.5 # Seconds, doubled on every retry
+
+# --- Long-Lived Publisher ---
+# Opening a connection costs several round trips (TCP, AMQP handshake,
+# channel, queue declare), which is far more than one publish. TaskPublisher
+# opens the connection and channel once and reuses them for every task.
+#
+# The channel is in transaction mode. Every batch of up to BATCH_SIZE
+# messages ends in one tx_commit. The commit returns once the broker has
+# taken responsibility for the whole batch (persistent messages on a durable
+# queue are on disk), so there is one confirmation round trip per batch, not
+# one per message.
+#
+# If the connection drops, the broker discards the uncommitted batch. The
+# publisher reconnects and sends the whole batch again, so nothing is lost
+# or half-sent. The one exception: if the commit-ok reply itself is lost,
+# the batch may be delivered twice.
+#
+# A BlockingConnection only answers heartbeats while it is in use, so an
+# idle publisher usually finds its connection closed. The first reconnect is
+# therefore immediate, and only later ones back off.
+
+class TaskPublisher:
+    def __init__(self, host=RABBITMQ_HOST, port=RABBITMQ_PORT, queue=WORKER_QUEUE,
+                 batch_size=BATCH_SIZE, max_retries=MAX_RETRIES):
+        self.parameters = pika.ConnectionParameters(host, port=port)
+        self.queue = queue
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.lock = threading.Lock() # A pika BlockingConnection must only be used by one thread at a time
+        self.connection = None
+        self.channel = None
+        self.stats = {'published': 0, 'batches': 0, 'connections': 0, 'reconnects': 0}
+
+    def enqueue(self, task_data):
+        """Publishes one task; returns its task ID."""
+        return self.enqueue_many([task_data])[0]
+
+    def enqueue_many(self, items):
+        """Publishes every task in batches; returns their task IDs once all are committed."""
+        messages = [self._make_message(data) for data in items]
+        with self.lock:
+            for i in range(0, len(messages), self.batch_size):
+                self._publish_batch(messages[i:i + self.batch_size])
+        return [task_id for task_id, _ in messages]
+
+    def close(self):
+        with self.lock:
+            self._disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Internals (lock held) ---
+
+    def _make_message(self, task_data):
         task_id = str(uuid.uuid4())
-        task_message = json.dumps({'task_id': task_id, 'data': task_data, 'timestamp': time.time()})
+        body = json.dumps({'task_id': task_id, 'data': task_data, 'timestamp': time.time()}).encode()
+        return task_id, body
+
+    def _ensure_channel(self):
+        if self.channel is None or not self.channel.is_open:
+            self._disconnect()
+            self.connection = pika.BlockingConnection(self.parameters)
+            self.channel = self.connection.channel()
+            self.channel.queue_declare(queue=self.queue, durable=True)
+            self.channel.tx_select()
+            self.stats['connections'] += 1
+        return self.channel
 
+    def _disconnect(self):
+        if self.connection is not None and self.connection.is_open:
+            try:
+                self.connection.close()
+            except pika.exceptions.AMQPError:
+                pass
+        self.connection = self.channel = None
+
+    def _publish_batch(self, batch):
+        delay = RETRY_DELAY
+        for attempt in range(self.max_retries + 1):
+            try:
+                channel = self._ensure_channel()
+                for _, body in batch:
+                    channel.basic_publish(
+                        exchange='',
+                        routing_key=self.queue,
+                        body=body,
+                        properties=pika.BasicProperties(
+                            delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE # Durable message
+                        )
+                    )
+                channel.tx_commit()
+                self.stats['published'] += len(batch)
+                self.stats['batches'] += 1
+                return
+            except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError) as e:
+                # The uncommitted batch died with the channel; reconnect and send all of it again
+                self._disconnect()
+                if attempt == self.max_retries:
+                    raise
+                self.stats['reconnects'] += 1
+                if attempt == 0:
+                    continue # Usually a connection the broker closed while idle (no heartbeats); reconnect at once
+                print(f"[Producer] Publish failed ({e!r}); reconnecting in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+def get_publisher():
+    """The process-wide publisher, created on first use."""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = TaskPublisher()
+        return _publisher
+
+def send_task_to_queue(task_data):
+    try:
         start_time = time.time()
-        
-        # Publish the message (task) to the queue
-        channel.basic_publish(
-            exchange='',  # Default exchange
-            routing_key=WORKER_QUEUE, 
-            body=task_message.encode(),
-            properties=pika.BasicProperties(
-                delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE # Durable message
-            )
-        )
+
+        # Publish the task on the shared, already-open connection
+        task_id = get_publisher().enqueue(task_data)
+
         end_time = time.time()
-        
+
         print(f"*** [API Server/Producer] Task ID {task_id[:8]} published successfully! ***")
         print(f"*** [API Server/Producer] Immediate wait time: {end_time - start_time:.4f} seconds ***\n")
-
-        connection.close()
+        return task_id
 
     except pika.exceptions.AMQPConnectionError:
         print(f"ERROR: Could not connect to RabbitMQ on {RABBITMQ_HOST}:{RABBITMQ_PORT}. Ensure the Docker container is running.")
         sys.exit(1)
 
 if __name__ == "__main__":
-    task_name = sys.argv[1] if len(sys.argv) > 1 else "Default Task"
-    send_task_to_queue(task_name)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Publishes tasks to the heavy task queue.")
+    parser.add_argument("task", nargs='?', default="Default Task")
+    parser.add_argument("--count", type=int, default=1, help="Publish this many tasks with enqueue_many.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Messages per transaction commit.")
+    args = parser.parse_args()
+
+    if args.count == 1:
+        send_task_to_queue(args.task)
+    else:
+        try:
+            with TaskPublisher(batch_size=args.batch_size) as publisher:
+                start_time = time.time()
+                task_ids = publisher.enqueue_many(f"{args.task} #{i}" for i in range(args.count))
+                elapsed = time.time() - start_time
+            print(f"*** [Producer] {len(task_ids)} tasks published in {elapsed:.3f}s "
+                  f"({len(task_ids) / elapsed:.0f} tasks/s, {publisher.stats['batches']} batches) ***")
+        except pika.exceptions.AMQPConnectionError:
+            print(f"ERROR: Could not connect to RabbitMQ on {RABBITMQ_HOST}:{RABBITMQ_PORT}. Ensure the Docker container is running.")
+            sys.exit(1)